@@ -4,6 +4,7 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import List, Optional
 import os
+import asyncio
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -50,7 +51,17 @@ async def health_check():
     return {"status": "healthy"}
 
 # Include routers from other modules
-from app.routers import nlp, chatbot, analytics, contact, whatsapp, testimonials
+from app.routers import nlp, chatbot, analytics, contact, whatsapp, testimonials, jobs
+from app.utils.admin_auth import require_admin_key
+from app.utils.groq_client import groq_client
+from app.utils.answer_precompute import answer_precomputer
+from app.utils.job_queue import job_queue
+
+# LLM client metrics (model routes, rate limiting, request coalescing); admin
+# only, since they expose backend URLs, error messages and the trace log path
+@app.get("/metrics/llm", dependencies=[Depends(require_admin_key)])
+async def llm_metrics():
+    return groq_client.get_stats()
 
 app.include_router(nlp.router, prefix="/nlp", tags=["Natural Language Processing"])
 app.include_router(chatbot.router, prefix="/chatbot", tags=["Chatbot"])
@@ -58,6 +69,18 @@ app.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
 app.include_router(contact.router, prefix="/contact", tags=["Contact"])
 app.include_router(whatsapp.router, prefix="/whatsapp", tags=["WhatsApp Integration"])
 app.include_router(testimonials.router, prefix="/testimonials", tags=["Testimonials"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
+
+# Background workers for queued jobs
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+    # Nightly refresh of the chatbot's precomputed answers
+    await asyncio.to_thread(answer_precomputer.ensure_scheduled)
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,19 +1,58 @@
 from fastapi import APIRouter, HTTPException, Depends, Body
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
 import os
 import time
 
+from app.utils.admin_auth import require_admin_key
+from app.utils.answer_cache import answer_cache
+from app.utils.answer_precompute import PRECOMPUTE_OPERATION, answer_precomputer, question_log
+from app.utils.content_index import content_index
+from app.utils.conversation_store import conversation_store
+from app.utils.faq_retriever import faq_retriever
 from app.utils.groq_client import groq_client
+from app.utils.intent_engine import intent_engine
+from app.utils.job_queue import job_queue
+from app.utils.language_id import language_identifier, language_name
+from app.utils.llm_metrics import llm_metrics
+from app.utils.retry import deadline_after
+from app.utils.token_budget import token_budget, truncate_to_tokens
 
 router = APIRouter()
 
+# Latency budget for a chat turn; upstream retries never run past it
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", "10"))
+# How long a visitor waits for Groq before getting the best local answer instead
+CHAT_LATENCY_BUDGET_SECONDS = float(os.getenv("CHAT_LATENCY_BUDGET_SECONDS", "1.5"))
+# Keep Groq answers that arrive after the budget for the next visitor asking the same question
+CHAT_CACHE_LATE_ANSWERS = os.getenv("CHAT_CACHE_LATE_ANSWERS", "true").lower() == "true"
+# Degraded answers quote the best published excerpt when it scores at least this
+DEGRADED_EXCERPT_SCORE = float(os.getenv("DEGRADED_EXCERPT_SCORE", "0.15"))
+DEGRADED_EXCERPT_TOKENS = 80
+
+# System prompt sent with every chat turn
+CHAT_SYSTEM_PROMPT = (
+    "You are an AI assistant for SynapseIQ, a company that provides AI solutions for African businesses. "
+    "Your responses should be helpful, concise, and focused on African business contexts. "
+    "SynapseIQ offers services in NLP for local languages, predictive analytics, custom chatbots, "
+    "and AI consulting. The company focuses on the African market and understands local business needs."
+)
+
+# Published blog and testimonial excerpts added to the prompt: how many, how
+# many tokens at most, and the similarity they need to be worth including
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+RETRIEVAL_CONTEXT_TOKENS = int(os.getenv("RETRIEVAL_CONTEXT_TOKENS", "600"))
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.05"))
+
 class ChatMessage(BaseModel):
     role: str  # user or assistant
     content: str
 
 class ChatRequest(BaseModel):
-    messages: List[ChatMessage]
+    messages: List[ChatMessage] = []
+    message: Optional[str] = None  # new user turn when continuing a stored conversation
+    conversation_id: Optional[str] = None
     user_id: Optional[str] = None
     language: Optional[str] = "en"
     context: Optional[dict] = None
@@ -22,6 +61,7 @@ class ChatResponse(BaseModel):
     response: str
     processing_time: float
     conversation_id: str
+    metadata: Optional[dict] = None
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
@@ -31,113 +71,297 @@ async def chat(request: ChatRequest):
     - Understands business terminology in African contexts
     - Can respond to queries about SynapseIQ services
     - Supports multiple languages including English and major African languages
+    - Keeps the conversation server-side: send the returned conversation_id with
+      just the new `message` on later turns instead of the whole transcript
     """
     try:
         start_time = time.time()
+        deadline = deadline_after(CHAT_DEADLINE_SECONDS)
         
-        # Extract the last user message
-        last_message = next((msg.content for msg in reversed(request.messages) 
-                            if msg.role == "user"), "")
-        
-        # Define intelligent responses based on common queries
-        responses = {
-            "services": [
-                "SynapseIQ offers AI solutions tailored for African businesses, including NLP for local languages, predictive analytics, and custom chatbots.",
-                "Our AI services include natural language processing for African languages, predictive analytics for business intelligence, and custom chatbot development.",
-                "We specialize in AI solutions designed specifically for the African market, including language processing, data analytics, and intelligent automation."
-            ],
-            "pricing": [
-                "Our pricing is customized based on your business needs. We offer flexible packages starting from $500 for small businesses.",
-                "SynapseIQ provides tailored pricing models based on your specific requirements. Our starter packages begin at $500 for small businesses.",
-                "We believe in making AI accessible to African businesses of all sizes. Our pricing is flexible and starts from $500 for small businesses."
-            ],
-            "contact": [
-                "I'd be happy to connect you with our team for a demo. Please provide your email or contact us via WhatsApp at +265996873573.",
-                "You can reach our team via WhatsApp at +265996873573 or email us at info@synapseiq.com to schedule a demo.",
-                "For a personalized demonstration of our AI solutions, please contact us via WhatsApp at +265996873573 or through our website contact form."
-            ],
-            "default": [
-                "Thank you for your interest in SynapseIQ. Our AI team specializes in creating custom solutions for African businesses. How can I assist you today?",
-                "Welcome to SynapseIQ! We're focused on bringing cutting-edge AI solutions to African businesses. What specific information are you looking for?",
-                "SynapseIQ is dedicated to empowering African businesses with AI technology. How can we help your business today?"
-            ]
-        }
-        
-        import random
+        # Continue a stored conversation, or start one seeded with whatever transcript was sent
+        conversation = None
+        if request.conversation_id:
+            conversation = await asyncio.to_thread(conversation_store.get, request.conversation_id)
+        conversation_id = conversation["id"] if conversation else conversation_store.new_id()
         
-        # Try to use Groq for AI-powered responses
-        try:
-            # Convert the messages to the format expected by Groq
-            groq_messages = []
-            for msg in request.messages:
-                groq_messages.append({"role": msg.role, "content": msg.content})
-            
-            # Add context about SynapseIQ if not present
-            if len(groq_messages) <= 3:  # Only add context for new conversations
-                groq_messages.insert(0, {
-                    "role": "system",
-                    "content": "You are an AI assistant for SynapseIQ, a company that provides AI solutions for African businesses. "
-                               "Your responses should be helpful, concise, and focused on African business contexts. "
-                               "SynapseIQ offers services in NLP for local languages, predictive analytics, custom chatbots, "
-                               "and AI consulting. The company focuses on the African market and understands local business needs."
-                })
-            
-            # Get response from Groq - with timeout to prevent long waits
-            import asyncio
-            try:
-                # Set a timeout for the Groq API call
-                response = groq_client.chat_completion(
-                    messages=groq_messages,
-                    temperature=0.7,
-                    max_tokens=500,
-                    stream=False
-                )
-                
-                # If we get a valid response, use it
-                if response and len(response.strip()) > 0:
-                    return ChatResponse(
-                        response=response,
-                        processing_time=time.time() - start_time,
-                        conversation_id=str(uuid.uuid4())
-                    )
-            except Exception as e:
-                print(f"Groq API call failed: {str(e)}")
-                # Continue to fallback responses
-                pass
-                
-        except Exception as e:
-            print(f"Error in Groq setup: {str(e)}")
-            # Continue to fallback responses
-            pass
-            
-        # Intelligent fallback response selection
-        response_category = "default"
+        sent = [{"role": msg.role, "content": msg.content} for msg in request.messages if msg.role in ("user", "assistant")]
+        if request.message is not None:
+            last_message = request.message
+            new_turns = [] if conversation else sent
+        else:
+            # Clients that still send the full transcript: the last user message is the new turn
+            last_index = next((index for index in range(len(sent) - 1, -1, -1) if sent[index]["role"] == "user"), None)
+            last_message = sent[last_index]["content"] if last_index is not None else ""
+            new_turns = [] if conversation else sent[:last_index]
+        if not last_message.strip():
+            raise HTTPException(status_code=400, detail="No user message to answer")
         
-        # Determine the appropriate response category based on the message
-        if "services" in last_message.lower() or "offer" in last_message.lower() or "provide" in last_message.lower():
-            response_category = "services"
-        elif "pricing" in last_message.lower() or "cost" in last_message.lower() or "price" in last_message.lower() or "package" in last_message.lower():
-            response_category = "pricing"
-        elif "contact" in last_message.lower() or "demo" in last_message.lower() or "reach" in last_message.lower() or "call" in last_message.lower() or "email" in last_message.lower():
-            response_category = "contact"
-            
-        # Select a random response from the appropriate category
-        response = random.choice(responses[response_category])
+        history = (conversation["turns"] if conversation else []) + new_turns
+        summary = conversation["summary"] if conversation else ""
         
-        processing_time = time.time() - start_time
+        response, metadata = await _answer(last_message, history, summary, request.language, deadline)
         
-        # Generate a simple conversation ID
-        import uuid
-        conversation_id = str(uuid.uuid4())
+        await asyncio.to_thread(
+            conversation_store.append,
+            conversation_id,
+            new_turns + [{"role": "user", "content": last_message}, {"role": "assistant", "content": response}]
+        )
         
         return ChatResponse(
             response=response,
-            processing_time=processing_time,
-            conversation_id=conversation_id
+            processing_time=time.time() - start_time,
+            conversation_id=conversation_id,
+            metadata=metadata
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat processing failed: {str(e)}")
 
+async def _answer(last_message: str, history: List[dict], summary: str, requested_language: Optional[str], deadline: float):
+    """
+    Reply to a user message: FAQ, precomputed and cached answers, then Groq with retrieved content
+    
+    Groq gets CHAT_LATENCY_BUDGET_SECONDS to answer. After that the best local
+    answer (a published excerpt or the intent fallback) is
+    returned with metadata["degraded"] set, and Groq's late answer is cached for
+    the next visitor who asks the same stand-alone question.
+    
+    Returns:
+        Tuple of (response text, metadata)
+    """
+    metadata = None
+    
+    # Answer in the language the visitor writes in, falling back to the
+    # requested language when the message is too short to tell. The lookups
+    # below are CPU-bound or read SQLite, so they run off the event loop
+    detection = await asyncio.to_thread(language_identifier.detect, last_message)
+    language = detection["language"] if detection["reliable"] else (requested_language or "en")
+    match_language = language if detection["reliable"] else None
+    
+    # Only questions asked without earlier context can share an answer; they
+    # are logged so the most frequent ones get precomputed answers
+    standalone = not history and not summary
+    if standalone:
+        question_log.record(last_message, "chat", language)
+    
+    # Recurring questions are answered from the FAQ index without a model call
+    faq_match = await asyncio.to_thread(faq_retriever.lookup, last_message, language=match_language)
+    llm_metrics.record_cache("faq", faq_match is not None)
+    if faq_match:
+        return faq_match["answer"], {"source": "faq", "faq_id": faq_match["id"], "faq_score": faq_match["score"], "language": language}
+    
+    if standalone:
+        # Frequent questions from recent traffic, answered off-peak
+        precomputed = await asyncio.to_thread(answer_cache.lookup_precomputed, last_message, match_language)
+        llm_metrics.record_cache("precomputed", precomputed is not None)
+        if precomputed:
+            return precomputed["answer"], dict(precomputed["metadata"], source="precomputed", language=language)
+        
+        cached = answer_cache.get(last_message, language)
+        llm_metrics.record_cache("answer_cache", cached is not None)
+        if cached:
+            return cached["answer"], dict(cached["metadata"], source="answer_cache", language=language)
+    
+    # Ground the answer in our published content
+    system_prompt, excerpts, sources = await asyncio.to_thread(_grounded_prompt, last_message, language)
+    
+    # Turns older than the stored history were folded into a summary
+    if summary:
+        system_prompt = f"{system_prompt}\n\n{summary}"
+    
+    degraded_reason = "llm_unavailable"
+    if groq_client.api_available:
+        # Convert the messages to the format expected by Groq, keeping the
+        # system prompt and the most recent turns within the model's token budget
+        groq_messages, metadata = token_budget.fit_messages(
+            history + [{"role": "user", "content": last_message}],
+            system_prompt=system_prompt,
+            model=groq_client.chat_model
+        )
+        
+        # Run the blocking client call in a worker thread so concurrent
+        # visitors overlap and identical questions can share one upstream call;
+        # it keeps running (up to the deadline) if we stop waiting for it
+        llm_call = asyncio.create_task(asyncio.to_thread(
+            groq_client.chat_completion,
+            messages=groq_messages,
+            temperature=0.7,
+            max_tokens=500,
+            stream=False,
+            deadline=deadline,
+            fallback=False
+        ))
+        done, _ = await asyncio.wait({llm_call}, timeout=CHAT_LATENCY_BUDGET_SECONDS)
+        
+        if done:
+            try:
+                response = llm_call.result()
+                if response and response.strip():
+                    return response, dict(metadata or {}, language=language, sources=sources)
+                degraded_reason = "llm_empty"
+            except Exception as e:
+                print(f"Groq API call failed: {str(e)}")
+                degraded_reason = "llm_error"
+        else:
+            degraded_reason = "llm_timeout"
+            if standalone and CHAT_CACHE_LATE_ANSWERS:
+                llm_call.add_done_callback(
+                    lambda call: _cache_late_answer(call, last_message, language, sources)
+                )
+            else:
+                llm_call.add_done_callback(_discard_late_answer)
+    
+    llm_metrics.record_fallback("chat", degraded_reason)
+    response, local_metadata = _local_answer(last_message, excerpts)
+    metadata = dict(metadata or {}, **local_metadata, language=language, degraded=True, degraded_reason=degraded_reason)
+    return response, metadata
+
+def _grounded_prompt(question: str, language: str):
+    """
+    System prompt for a question, with the most relevant published excerpts
+    
+    Returns:
+        Tuple of (system prompt, excerpts found, sources used in the prompt)
+    """
+    system_prompt = CHAT_SYSTEM_PROMPT
+    if language != "en":
+        system_prompt = f"{CHAT_SYSTEM_PROMPT} Reply in {language_name(language)}."
+    
+    sources = []
+    excerpts = content_index.search(question, top_k=RETRIEVAL_TOP_K, min_score=RETRIEVAL_MIN_SCORE)
+    if excerpts:
+        context, used = content_index.build_context(excerpts, RETRIEVAL_CONTEXT_TOKENS)
+        if context:
+            system_prompt = f"{system_prompt}\n\nUse these excerpts from SynapseIQ's published content when relevant:\n{context}"
+            sources = [{"source": item["source"], "id": item["source_id"], "title": item["title"], "score": item["score"]} for item in used]
+    return system_prompt, excerpts, sources
+
+def _local_answer(last_message: str, excerpts: List[dict]):
+    """Best answer without the model (the FAQ already missed): a published excerpt, or the intent fallback"""
+    if excerpts and excerpts[0]["score"] >= DEGRADED_EXCERPT_SCORE:
+        best = excerpts[0]
+        excerpt = truncate_to_tokens(best["text"], DEGRADED_EXCERPT_TOKENS)
+        if len(excerpt) < len(best["text"]):
+            excerpt = excerpt.rsplit(" ", 1)[0] + "..."
+        source = {"source": best["source"], "id": best["source_id"], "title": best["title"], "score": best["score"]}
+        return f"Here is what we have published on this: {excerpt}", {"source": "retrieval", "sources": [source]}
+    
+    fallback = intent_engine.respond(last_message)
+    return fallback["response"], {"source": "intent", "intent": fallback["intent"], "intent_confidence": fallback["confidence"]}
+
+def _discard_late_answer(call: asyncio.Future):
+    """Collect the outcome of a Groq call nobody is waiting for, so its error is logged rather than left unretrieved"""
+    if not call.cancelled() and call.exception() is not None:
+        print(f"Late Groq API call failed: {str(call.exception())}")
+
+def _cache_late_answer(call: asyncio.Future, question: str, language: str, sources: List[dict]):
+    """Keep a Groq answer that arrived after its visitor got a local one"""
+    if call.cancelled() or call.exception() is not None:
+        return
+    response = call.result()
+    if response and response.strip():
+        answer_cache.put(question, response, language, {"sources": sources})
+
+def _generate_precomputed_answer(question: str, language: str, deadline: Optional[float] = None):
+    """Canonical answer to a frequent question, grounded like a live chat turn"""
+    system_prompt, _, sources = _grounded_prompt(question, language)
+    answer = groq_client.chat_completion(
+        messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": question}],
+        temperature=0.3,
+        max_tokens=500,
+        deadline=deadline,
+        fallback=False
+    )
+    return answer, sources
+
+def refresh_precomputed_answers(top_n: Optional[int] = None, deadline: Optional[float] = None):
+    """Regenerate the precomputed answers, then schedule the next off-peak run"""
+    try:
+        return answer_precomputer.refresh(_generate_precomputed_answer, deadline, top_n)
+    finally:
+        answer_precomputer.ensure_scheduled()
+
+job_queue.register(PRECOMPUTE_OPERATION, refresh_precomputed_answers)
+
+@router.get("/faq/stats")
+async def faq_stats():
+    """FAQ index hit rate, lookup latency and size"""
+    return faq_retriever.get_stats()
+
+@router.post("/faq/reload", dependencies=[Depends(require_admin_key)])
+async def reload_faq():
+    """
+    Rebuild the FAQ index from data/faq.json (admin endpoint)
+    
+    - The previous index keeps serving until the new one is ready
+    - Requires the X-Admin-Key header when ADMIN_API_KEY is set
+    """
+    try:
+        return await asyncio.to_thread(faq_retriever.reload)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"FAQ reload failed: {str(e)}")
+
+@router.get("/cache/stats")
+async def answer_cache_stats():
+    """Hit rate and size of the cache of Groq answers"""
+    return answer_cache.get_stats()
+
+@router.get("/precomputed")
+async def list_precomputed_answers():
+    """Frequent questions with precomputed answers, most asked first, and the last refresh"""
+    entries = sorted(answer_cache.precomputed_entries().values(), key=lambda entry: -entry["asked"])
+    return {"entries": entries, "last_run": answer_precomputer.last_run}
+
+@router.post("/precomputed/refresh", dependencies=[Depends(require_admin_key)], status_code=202)
+async def refresh_precomputed(top_n: Optional[int] = None):
+    """
+    Queue a refresh of the precomputed answers now instead of at the next off-peak run (admin endpoint)
+    
+    - Returns the job; poll GET /jobs/{id} for the result
+    - Requires the X-Admin-Key header when ADMIN_API_KEY is set
+    """
+    params = {"top_n": top_n} if top_n else {}
+    return await asyncio.to_thread(job_queue.submit, PRECOMPUTE_OPERATION, params, "high")
+
+@router.get("/retrieval/stats")
+async def retrieval_stats():
+    """Size and search latency of the published-content index"""
+    return content_index.get_stats()
+
+@router.post("/retrieval/rebuild", dependencies=[Depends(require_admin_key)])
+async def rebuild_retrieval_index():
+    """
+    Re-chunk every published blog post and testimonial (admin endpoint)
+    
+    - Normally not needed: blog and testimonial writes update the index as they happen
+    - Requires the X-Admin-Key header when ADMIN_API_KEY is set
+    """
+    try:
+        return await asyncio.to_thread(content_index.rebuild)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Retrieval index rebuild failed: {str(e)}")
+
+@router.get("/conversations/stats")
+async def conversation_stats():
+    """Conversation cache size and hit rate"""
+    return conversation_store.get_stats()
+
+@router.get("/conversations/{conversation_id}")
+async def get_conversation(conversation_id: str):
+    """Stored summary and recent turns of a conversation"""
+    conversation = await asyncio.to_thread(conversation_store.get, conversation_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversation not found or expired")
+    return conversation
+
+@router.delete("/conversations/{conversation_id}")
+async def delete_conversation(conversation_id: str):
+    """Forget a conversation"""
+    if not await asyncio.to_thread(conversation_store.delete, conversation_id):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return {"success": True}
+
 class WhatsAppMessage(BaseModel):
     from_number: str
     to_number: str
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, HttpUrl
+from typing import Any, Dict, List, Optional
+import asyncio
+
+# Registers the blog translation jobs queued by simple_server.py, so workers here run them
+from app.utils import blog_translations
+from app.utils.groq_client import groq_client
+from app.utils.job_queue import job_queue
+
+router = APIRouter()
+
+
+def chat_completion_job(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    deadline: Optional[float] = None
+) -> str:
+    """Non-streaming chat completion; API errors fail the attempt instead of completing with a canned reply"""
+    return groq_client.chat_completion(
+        messages=messages,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=False,
+        deadline=deadline,
+        fallback=False
+    )
+
+
+def analyze_batch_job(
+    texts: List[str],
+    analysis_type: str = "sentiment",
+    model: Optional[str] = None,
+    deadline: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """Analyze texts with token-budgeted multi-item prompts, one pack at a time"""
+    results = {}
+    for pack in groq_client.pack_texts(texts):
+        results.update(groq_client.analyze_text_pack(
+            [(index, texts[index]) for index in pack],
+            analysis_type,
+            model=model,
+            deadline=deadline
+        ))
+    return [results[index] for index in range(len(texts))]
+
+
+# GroqAIClient operations that can run as jobs
+job_queue.register("chat_completion", chat_completion_job)
+job_queue.register("analyze_text", groq_client.analyze_text)
+job_queue.register("analyze_batch", analyze_batch_job)
+job_queue.register("translate_text", groq_client.translate_text)
+
+# Operations clients may submit; the rest of the registry (WhatsApp sends,
+# blog translation, answer precompute) is internal and only queued by the app
+PUBLIC_OPERATIONS = ("chat_completion", "analyze_text", "analyze_batch", "translate_text")
+
+
+class JobRequest(BaseModel):
+    operation: str
+    params: Dict[str, Any] = {}
+    priority: str = "normal"  # high, normal or bulk
+    callback_url: Optional[HttpUrl] = None
+
+@router.post("", status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Queue a long-running AI operation
+
+    - Returns immediately with the job id; poll GET /jobs/{id} for the result
+    - `callback_url`, if given, receives the finished job as a JSON POST; it must
+      be a public host, or one listed in JOB_CALLBACK_HOSTS
+    - Operations: chat_completion, analyze_text, analyze_batch, translate_text
+      (params are the keyword arguments of the matching GroqAIClient method)
+    """
+    if request.operation not in PUBLIC_OPERATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown operation '{request.operation}'. Available: {', '.join(PUBLIC_OPERATIONS)}"
+        )
+    callback_url = str(request.callback_url) if request.callback_url else None
+    try:
+        return await asyncio.to_thread(job_queue.submit, request.operation, request.params, request.priority, callback_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/metrics")
+async def job_metrics():
+    """Queue depth, outcomes, wait and run times"""
+    return await asyncio.to_thread(job_queue.get_stats)
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Job status, and its result or error once finished"""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a job that hasn't started yet"""
+    if not await asyncio.to_thread(job_queue.cancel, job_id):
+        raise HTTPException(status_code=409, detail="Job not found or already started")
+    return {"success": True}
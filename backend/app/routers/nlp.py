@@ -1,16 +1,45 @@
 from fastapi import APIRouter, HTTPException, Body
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Literal, Optional
+import asyncio
+import json
+import os
 import time
 
 from app.utils.groq_client import groq_client
+from app.utils.language_id import language_identifier
+from app.utils.llm_metrics import llm_metrics
+from app.utils.retry import deadline_after
 
 router = APIRouter()
 
+# Batch analysis limits
+BATCH_MAX_TEXTS = int(os.getenv("NLP_BATCH_MAX_TEXTS", "10000"))
+BATCH_PACK_TOKENS = int(os.getenv("NLP_BATCH_PACK_TOKENS", "2000"))
+BATCH_PACK_MAX_ITEMS = int(os.getenv("NLP_BATCH_PACK_MAX_ITEMS", "50"))
+BATCH_CONCURRENCY = int(os.getenv("NLP_BATCH_CONCURRENCY", "4"))
+# Texts per chunk when a batch is scored locally ("fast" mode)
+BATCH_LOCAL_CHUNK = int(os.getenv("NLP_BATCH_LOCAL_CHUNK", "1000"))
+
+# Batch translation limits; strings a pack didn't return are retried in smaller
+# packs up to NLP_TRANSLATE_BATCH_RETRIES times
+TRANSLATE_BATCH_MAX_STRINGS = int(os.getenv("NLP_TRANSLATE_BATCH_MAX_STRINGS", "2000"))
+TRANSLATE_BATCH_MAX_TARGETS = int(os.getenv("NLP_TRANSLATE_BATCH_MAX_TARGETS", "10"))
+TRANSLATE_BATCH_PACK_TOKENS = int(os.getenv("NLP_TRANSLATE_BATCH_PACK_TOKENS", "1500"))
+TRANSLATE_BATCH_PACK_MAX_ITEMS = int(os.getenv("NLP_TRANSLATE_BATCH_PACK_MAX_ITEMS", "60"))
+TRANSLATE_BATCH_RETRIES = int(os.getenv("NLP_TRANSLATE_BATCH_RETRIES", "2"))
+
+# Latency budgets; upstream retries and rate-limit queueing never run past them
+ANALYZE_DEADLINE_SECONDS = float(os.getenv("NLP_ANALYZE_DEADLINE_SECONDS", "10"))
+TRANSLATE_DEADLINE_SECONDS = float(os.getenv("NLP_TRANSLATE_DEADLINE_SECONDS", "20"))
+BATCH_DEADLINE_SECONDS = float(os.getenv("NLP_BATCH_DEADLINE_SECONDS", "120"))
+
 class TextAnalysisRequest(BaseModel):
     text: str
-    language: Optional[str] = "en"
-    analysis_type: str  # sentiment, entity, classification
+    language: Optional[str] = None  # hint, used when the text is too short to detect reliably
+    analysis_type: str  # sentiment, entity, classification, keywords (adds a keyword list)
+    mode: Optional[str] = "llm"  # llm, or fast for offline engines (lexicon sentiment, gazetteer entities, TF-IDF/RAKE keywords)
 
 class TextAnalysisResponse(BaseModel):
     result: dict
@@ -23,74 +52,179 @@ async def analyze_text(request: TextAnalysisRequest):
     Analyze text for African languages and English
     
     - Supports sentiment analysis, entity recognition, and text classification
+    - analysis_type="keywords" also returns the text's key phrases
     - Optimized for multiple African languages
     - Returns analysis results with detected language
     """
     try:
         start_time = time.time()
+        deadline = deadline_after(ANALYZE_DEADLINE_SECONDS)
+        
+        # Detect the language locally; it picks prompts and models for the calls below
+        detection = language_identifier.detect(request.text)
+        if not detection["reliable"] and request.language:
+            language = request.language
+        else:
+            language = detection["language"]
+        language_info = {
+            "detected": language,
+            "confidence": detection["confidence"],
+            "reliable": detection["reliable"]
+        }
+        
+        wants_keywords = request.analysis_type == "keywords"
         
         try:
-            # Use Groq for sentiment analysis
-            sentiment_result = groq_client.analyze_text(
-                text=request.text,
-                analysis_type="sentiment",
-                language=request.language
-            )
-            
-            # Use Groq for entity extraction
-            entity_result = groq_client.analyze_text(
-                text=request.text,
-                analysis_type="entity",
-                language=request.language
-            )
+            keyword_result = None
+            if request.mode == "fast":
+                # Offline engines only: no model round trip
+                sentiment_result = groq_client.analyze_text_local([(0, request.text)], "sentiment")[0]
+                entity_result = groq_client.analyze_text_local([(0, request.text)], "entities")[0]
+                if wants_keywords:
+                    keyword_result = groq_client.analyze_text_local([(0, request.text)], "keywords")[0]
+            else:
+                # Use Groq for sentiment analysis; the client can wait out rate
+                # limits and retry backoff, so it runs off the event loop
+                sentiment_result = await asyncio.to_thread(
+                    groq_client.analyze_text,
+                    text=request.text,
+                    analysis_type="sentiment",
+                    deadline=deadline,
+                    language=language
+                )
+                
+                # Use Groq for entity extraction
+                entity_result = await asyncio.to_thread(
+                    groq_client.analyze_text,
+                    text=request.text,
+                    analysis_type="entities",
+                    deadline=deadline,
+                    language=language
+                )
+                
+                if wants_keywords:
+                    keyword_result = await asyncio.to_thread(
+                        groq_client.analyze_text,
+                        text=request.text,
+                        analysis_type="keywords",
+                        deadline=deadline,
+                        language=language
+                    )
             
             # Combine results
             result = {
                 "sentiment": sentiment_result,
-                "entities": entity_result if isinstance(entity_result, list) else [],
-                "language": {
-                    "detected": request.language,
-                    "confidence": 0.98  # Placeholder confidence
-                },
+                "entities": entity_result.get("entities", []) if isinstance(entity_result, dict) else [],
+                "language": language_info,
                 "processing_time": time.time() - start_time
             }
+            if wants_keywords:
+                result["keywords"] = keyword_result.get("keywords", []) if isinstance(keyword_result, dict) else []
             
             return TextAnalysisResponse(
                 result=result,
-                language_detected=request.language,
+                language_detected=language,
                 processing_time=result["processing_time"]
             )
         except Exception as e:
             print(f"Error in text analysis: {str(e)}")
-            # Fallback to mock results if Groq fails
+            # Fallback to the offline engines if Groq fails
             result = {
-                "sentiment": {
-                    "score": 0.8,
-                    "label": "positive",
-                    "explanation": "The text contains positive language about business growth and opportunities."
-                },
-                "entities": [
-                    {"text": "Africa", "type": "LOCATION", "start": request.text.lower().find("africa"), "end": request.text.lower().find("africa") + 6},
-                    {"text": "business", "type": "TOPIC", "start": request.text.lower().find("business"), "end": request.text.lower().find("business") + 8}
-                ],
-                "language": {
-                    "detected": request.language,
-                    "confidence": 0.98
-                },
+                "sentiment": groq_client.analyze_text_local([(0, request.text)], "sentiment")[0],
+                "entities": groq_client.analyze_text_local([(0, request.text)], "entities")[0]["entities"],
+                "language": language_info,
                 "processing_time": time.time() - start_time
             }
+            if wants_keywords:
+                result["keywords"] = groq_client.analyze_text_local([(0, request.text)], "keywords")[0]["keywords"]
             
             return TextAnalysisResponse(
                 result=result,
-                language_detected=request.language,
+                language_detected=language,
                 processing_time=result["processing_time"]
             )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+class BatchTextAnalysisRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1)
+    language: Optional[str] = None  # hint, used for texts too short to detect reliably
+    analysis_type: str = "sentiment"  # sentiment, entities, keywords
+    mode: Literal["llm", "fast"] = "llm"  # llm, or fast for offline engines only
+
+@router.post("/analyze/batch")
+async def analyze_text_batch(request: BatchTextAnalysisRequest):
+    """
+    Analyze many texts in one request
+    
+    - Packs texts into token-budgeted multi-item prompts
+    - Runs packs concurrently with a bounded number of in-flight model calls
+    - mode="fast" scores everything with the offline engines instead
+    - Streams one NDJSON line per text ({"index", "result"}) in input order as
+      packs finish, followed by a final summary line; each line also carries
+      the text's detected language (the request's language hint when the text
+      is too short to detect)
+    """
+    if len(request.texts) > BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TEXTS} texts can be analyzed per batch")
+    
+    start_time = time.time()
+    deadline = deadline_after(BATCH_DEADLINE_SECONDS)
+    texts = request.texts
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    if request.mode == "fast":
+        packs = [list(range(i, min(i + BATCH_LOCAL_CHUNK, len(texts)))) for i in range(0, len(texts), BATCH_LOCAL_CHUNK)]
+    else:
+        packs = groq_client.pack_texts(texts, token_budget=BATCH_PACK_TOKENS, max_items=BATCH_PACK_MAX_ITEMS)
+    
+    async def run_pack(pack):
+        async with semaphore:
+            if request.mode == "fast":
+                return await asyncio.to_thread(
+                    groq_client.analyze_text_local,
+                    [(index, texts[index]) for index in pack],
+                    request.analysis_type
+                )
+            return await asyncio.to_thread(
+                groq_client.analyze_text_pack,
+                [(index, texts[index]) for index in pack],
+                request.analysis_type,
+                deadline=deadline
+            )
+    
+    async def stream_results():
+        tasks = [asyncio.create_task(run_pack(pack)) for pack in packs]
+        try:
+            # Packs are consecutive runs of texts, so taking them in order keeps input order
+            for pack, task in zip(packs, tasks):
+                results = await task
+                languages = language_identifier.detect_batch([texts[index] for index in pack])
+                for index, detection in zip(pack, languages):
+                    if not detection["reliable"] and request.language:
+                        language = request.language
+                    else:
+                        language = detection["language"]
+                    yield json.dumps({"index": index, "result": results[index], "language": language}) + "\n"
+        finally:
+            # Stop outstanding packs if the client disconnects mid-stream
+            for task in tasks:
+                task.cancel()
+        
+        elapsed = time.time() - start_time
+        yield json.dumps({
+            "summary": {
+                "total": len(texts),
+                "packs": len(packs),
+                "processing_time": elapsed,
+                "texts_per_second": len(texts) / elapsed if elapsed > 0 else None
+            }
+        }) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 class TranslationRequest(BaseModel):
     text: str
-    source_language: str
+    source_language: Optional[str] = "auto"  # auto detects the language of the text
     target_language: str
 
 class TranslationResponse(BaseModel):
@@ -106,21 +240,28 @@ async def translate_text(request: TranslationRequest):
     
     - Supports major African languages including Swahili, Yoruba, Zulu, etc.
     - Preserves cultural context and nuances
+    - source_language "auto" (the default) detects it locally; text already in
+      the target language is returned without a model call
     """
     try:
         start_time = time.time()
+        source_language = request.source_language or "auto"
+        if source_language == "auto":
+            source_language = language_identifier.detect(request.text)["language"]
         
         try:
             # Use Groq for translation
-            translated_text = groq_client.translate_text(
+            translated_text = await asyncio.to_thread(
+                groq_client.translate_text,
                 text=request.text,
-                source_language=request.source_language,
-                target_language=request.target_language
+                source_language=source_language,
+                target_language=request.target_language,
+                deadline=deadline_after(TRANSLATE_DEADLINE_SECONDS)
             )
             
             return TranslationResponse(
                 translated_text=translated_text,
-                source_language=request.source_language,
+                source_language=source_language,
                 target_language=request.target_language,
                 processing_time=time.time() - start_time
             )
@@ -137,16 +278,97 @@ async def translate_text(request: TranslationRequest):
             }
             
             # Generate a key for the mock translations
-            translation_key = f"{request.source_language}_to_{request.target_language}"
+            translation_key = f"{source_language}_to_{request.target_language}"
             
             # Return mock translation or original text if language pair not supported
             translated_text = translations.get(translation_key, request.text)
             
             return TranslationResponse(
                 translated_text=translated_text,
-                source_language=request.source_language,
+                source_language=source_language,
                 target_language=request.target_language,
                 processing_time=time.time() - start_time
             )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Translation failed: {str(e)}")
+
+class BatchTranslationRequest(BaseModel):
+    strings: Dict[str, str] = Field(..., min_length=1)  # key -> text, e.g. UI strings of a page
+    target_languages: List[str] = Field(..., min_length=1)
+    source_language: Optional[str] = "auto"  # auto detects the language of the strings
+
+class BatchTranslationResponse(BaseModel):
+    translations: Dict[str, Dict[str, str]]  # target language -> key -> translation
+    untranslated: Dict[str, List[str]]  # target language -> keys left in the source language
+    source_language: str
+    processing_time: float
+    stats: Dict[str, Any]
+
+@router.post("/translate/batch", response_model=BatchTranslationResponse)
+async def translate_text_batch(request: BatchTranslationRequest):
+    """
+    Translate a set of keyed strings into several languages
+    
+    - Packs strings into token-budgeted prompts, each string wrapped in a
+      numbered delimiter so translations map back to their keys
+    - Translates into all target languages concurrently, with a bounded
+      number of in-flight model calls per language
+    - Checks that every key came back and retries only the missing ones;
+      keys still missing keep their source text and are listed in `untranslated`
+    """
+    if len(request.strings) > TRANSLATE_BATCH_MAX_STRINGS:
+        raise HTTPException(status_code=400, detail=f"At most {TRANSLATE_BATCH_MAX_STRINGS} strings can be translated per batch")
+    targets = list(dict.fromkeys(language.strip().lower() for language in request.target_languages if language.strip()))
+    if not targets or len(targets) > TRANSLATE_BATCH_MAX_TARGETS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {TRANSLATE_BATCH_MAX_TARGETS} target languages are required")
+    
+    start_time = time.time()
+    deadline = deadline_after(BATCH_DEADLINE_SECONDS)
+    strings = request.strings
+    source_language = request.source_language or "auto"
+    if source_language == "auto":
+        # UI strings are short; detect them together rather than one by one
+        source_language = language_identifier.detect(" ".join(strings.values()))["language"]
+    
+    stats = {"calls": 0, "retried_strings": 0}
+    
+    async def translate_into(target):
+        if target == source_language.lower():
+            return target, dict(strings), []
+        result = await asyncio.to_thread(
+            groq_client.translate_strings,
+            strings,
+            source_language,
+            target,
+            deadline=deadline,
+            pack_tokens=TRANSLATE_BATCH_PACK_TOKENS,
+            max_items=TRANSLATE_BATCH_PACK_MAX_ITEMS,
+            retries=TRANSLATE_BATCH_RETRIES,
+            concurrency=BATCH_CONCURRENCY
+        )
+        stats["calls"] += result["calls"]
+        stats["retried_strings"] += result["retried"]
+        pending = result["missing"]
+        if pending:
+            llm_metrics.record_fallback("batch_translation", "missing_items" if groq_client.api_available else "unavailable", len(pending))
+        translated = result["translations"]
+        return target, {key: translated.get(key, text) for key, text in strings.items()}, pending
+    
+    try:
+        outcomes = await asyncio.gather(*[translate_into(target) for target in targets])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Translation failed: {str(e)}")
+    
+    elapsed = time.time() - start_time
+    stats.update({
+        "strings": len(strings),
+        "targets": len(targets),
+        "strings_per_second": len(strings) * len(targets) / elapsed if elapsed > 0 else None
+    })
+    return BatchTranslationResponse(
+        translations={target: translated for target, translated, _ in outcomes},
+        untranslated={target: pending for target, _, pending in outcomes if pending},
+        source_language=source_language,
+        processing_time=elapsed,
+        stats=stats
+    )
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends, Form, File, UploadFile
 from pydantic import BaseModel, Field
 from typing import Optional, List
+import asyncio
 import os
 import json
 from datetime import datetime
@@ -8,6 +9,8 @@ import sqlite3
 from pathlib import Path
 import shutil
 
+from app.utils.content_index import content_index
+
 # Initialize router
 router = APIRouter()
 
@@ -136,6 +139,7 @@ async def create_testimonial(testimonial: TestimonialCreate):
         
         testimonial_id = cursor.lastrowid
         conn.commit()
+        await asyncio.to_thread(content_index.sync_testimonial, testimonial_id)
         
         # Fetch the created testimonial
         cursor.execute("SELECT * FROM testimonials WHERE id = ?", (testimonial_id,))
@@ -178,6 +182,7 @@ async def update_testimonial(testimonial_id: int, testimonial_update: Testimonia
         
         cursor.execute(f"UPDATE testimonials SET {set_clause} WHERE id = ?", values)
         conn.commit()
+        await asyncio.to_thread(content_index.sync_testimonial, testimonial_id)
         
         # Fetch the updated testimonial
         cursor.execute("SELECT * FROM testimonials WHERE id = ?", (testimonial_id,))
@@ -209,6 +214,7 @@ async def delete_testimonial(testimonial_id: int):
         cursor.execute("DELETE FROM testimonials WHERE id = ?", (testimonial_id,))
         conn.commit()
         conn.close()
+        await asyncio.to_thread(content_index.sync_testimonial, testimonial_id)
         
         # Delete the image file if it exists
         if testimonial['image']:
@@ -1,17 +1,35 @@
-from fastapi import APIRouter, HTTPException, Depends, Request, Form, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Form, BackgroundTasks
 from pydantic import BaseModel, Field
 from typing import Optional, List
+import asyncio
 import json
 from datetime import datetime
 import os
+from app.utils.answer_precompute import question_log
+from app.utils.conversation_store import whatsapp_conversation_store
 from app.utils.twilio_client import twilio_client
-from app.utils.groq_client import GroqAIClient
+from app.utils.groq_client import groq_client
+from app.utils.job_queue import job_queue
+from app.utils.retry import deadline_after
+from app.utils.token_budget import token_budget
+from app.utils.whatsapp_queue import REPLY_OPERATION, whatsapp_queue
 
 # Initialize router
 router = APIRouter()
 
-# Initialize Groq client for AI responses
-groq_client = GroqAIClient()
+# Budget for producing an AI reply to an inbound message, and for delivering it
+WHATSAPP_REPLY_DEADLINE_SECONDS = float(os.getenv("WHATSAPP_REPLY_DEADLINE_SECONDS", "20"))
+WHATSAPP_SEND_DEADLINE_SECONDS = float(os.getenv("WHATSAPP_SEND_DEADLINE_SECONDS", "15"))
+# Bulk sends to more recipients than this run as a background job instead of inside the request
+WHATSAPP_BULK_SYNC_MAX = int(os.getenv("WHATSAPP_BULK_SYNC_MAX", "50"))
+
+# Prompt tokens given to the system prompt, earlier turns and the new message of a reply
+WHATSAPP_CONTEXT_TOKENS = int(os.getenv("WHATSAPP_CONTEXT_TOKENS", "2000"))
+
+WHATSAPP_SYSTEM_PROMPT = "You are SynapseIQ's AI assistant. Provide helpful, concise responses about SynapseIQ's AI services for African businesses. Keep responses under 3 paragraphs."
+
+# Job operation for bulk sends
+BULK_SEND_OPERATION = "send_bulk_whatsapp"
 
 # Pydantic models for request validation
 class WhatsAppMessage(BaseModel):
@@ -21,6 +39,17 @@ class WhatsAppMessage(BaseModel):
 class BulkWhatsAppMessage(BaseModel):
     to_numbers: List[str] = Field(..., description="List of recipient WhatsApp numbers")
     message: str = Field(..., description="Message content to send to all recipients")
+    background: bool = Field(False, description="Queue the send as a job even for short lists")
+
+def send_bulk_job(to_numbers: List[str], message: str):
+    """Bulk send run by the job queue; the result omits per-recipient successes to stay small"""
+    summary = twilio_client.send_bulk_whatsapp_messages(to_numbers, message)
+    summary["results"] = [entry for entry in summary["results"] if entry["result"]["status"] == "error"]
+    return summary
+
+# Run once only: a rerun would message every recipient again, including those
+# already reached before a failure or worker crash
+job_queue.register(BULK_SEND_OPERATION, send_bulk_job, max_attempts=1)
 
 # Send a single WhatsApp message
 @router.post("/send")
@@ -28,9 +57,11 @@ async def send_whatsapp_message(message_data: WhatsAppMessage):
     """
     Send a WhatsApp message to a single recipient
     """
-    result = twilio_client.send_whatsapp_message(
+    result = await asyncio.to_thread(
+        twilio_client.send_whatsapp_message,
         message_data.to_number, 
-        message_data.message
+        message_data.message,
+        deadline_after(WHATSAPP_SEND_DEADLINE_SECONDS)
     )
     
     if result["status"] == "error":
@@ -40,27 +71,36 @@ async def send_whatsapp_message(message_data: WhatsAppMessage):
 
 # Send bulk WhatsApp messages
 @router.post("/send-bulk")
-async def send_bulk_whatsapp_messages(message_data: BulkWhatsAppMessage):
+async def send_bulk_whatsapp_messages(message_data: BulkWhatsAppMessage, response: Response):
     """
     Send the same WhatsApp message to multiple recipients
+    
+    - Messages are sent concurrently, paced by TWILIO_MESSAGES_PER_SECOND
+    - Lists longer than WHATSAPP_BULK_SYNC_MAX (or background=true) are queued
+      as a bulk job: returns 202 with the job; GET /jobs/{id} has the counts,
+      throughput and failed recipients once it finishes
     """
-    results = twilio_client.send_bulk_whatsapp_messages(
+    if message_data.background or len(message_data.to_numbers) > WHATSAPP_BULK_SYNC_MAX:
+        job = await asyncio.to_thread(
+            job_queue.submit,
+            BULK_SEND_OPERATION,
+            {"to_numbers": message_data.to_numbers, "message": message_data.message},
+            "bulk"
+        )
+        response.status_code = 202
+        return {"status": "queued", "total": len(message_data.to_numbers), "job": job}
+    
+    summary = await asyncio.to_thread(
+        twilio_client.send_bulk_whatsapp_messages,
         message_data.to_numbers,
         message_data.message
     )
     
     # Check if all messages failed
-    all_failed = all(r["result"]["status"] == "error" for r in results)
-    if all_failed:
+    if summary["total"] and summary["successful"] == 0:
         raise HTTPException(status_code=500, detail="All messages failed to send")
     
-    return {
-        "status": "completed",
-        "total": len(message_data.to_numbers),
-        "successful": sum(1 for r in results if r["result"]["status"] == "success"),
-        "failed": sum(1 for r in results if r["result"]["status"] == "error"),
-        "results": results
-    }
+    return dict(summary, status="completed")
 
 # Webhook for incoming WhatsApp messages from Twilio
 @router.post("/webhook")
@@ -70,20 +110,43 @@ async def twilio_webhook(
     From: str = Form(...),
     Body: str = Form(...),
     ProfileName: Optional[str] = Form(None),
-    WaId: Optional[str] = Form(None)
+    WaId: Optional[str] = Form(None),
+    MessageSid: Optional[str] = Form(None)
 ):
     """
     Handle incoming WhatsApp messages from Twilio webhook
+    
+    - Each MessageSid is processed once; Twilio's retries of a webhook are acknowledged and ignored
+    - The reply is produced and sent by durable jobs, so it survives a restart
+    - Replies see the sender's earlier turns, keyed by WaId (or the phone number)
     """
     try:
         # Extract the actual phone number from the WhatsApp format
         from_number = From.replace("whatsapp:", "")
         
+        if MessageSid and not await asyncio.to_thread(whatsapp_queue.first_delivery, MessageSid, from_number):
+            print(f"Ignoring repeated WhatsApp message {MessageSid} from {from_number}")
+            return {"status": "duplicate"}
+        
         # Log the incoming message
         print(f"Received WhatsApp message from {from_number} ({ProfileName}): {Body}")
         
-        # Process the message with AI in the background
-        background_tasks.add_task(process_incoming_message, from_number, Body, ProfileName)
+        # Feed the frequent-question miner behind the chatbot's precomputed answers
+        question_log.record(Body, "whatsapp")
+        
+        # Process the message with AI on the job queue
+        params = {
+            "from_number": from_number,
+            "message_body": Body,
+            "profile_name": ProfileName,
+            "message_sid": MessageSid,
+            "wa_id": WaId
+        }
+        try:
+            await asyncio.to_thread(job_queue.submit, REPLY_OPERATION, params, "high")
+        except Exception as e:
+            print(f"Could not queue WhatsApp reply, answering in the background instead: {str(e)}")
+            background_tasks.add_task(process_incoming_message, **params)
         
         # Return 200 OK immediately to acknowledge receipt
         return {"status": "received"}
@@ -92,22 +155,48 @@ async def twilio_webhook(
         # Still return 200 OK to Twilio to prevent retries
         return {"status": "error", "message": str(e)}
 
-async def process_incoming_message(from_number: str, message_body: str, profile_name: Optional[str] = None):
+async def process_incoming_message(
+    from_number: str,
+    message_body: str,
+    profile_name: Optional[str] = None,
+    message_sid: Optional[str] = None,
+    wa_id: Optional[str] = None
+):
     """
-    Process an incoming WhatsApp message and send an AI response
+    Process an incoming WhatsApp message and queue an AI response for delivery
+    
+    The sender's recent turns (and a summary of older ones) go into the
+    prompt, trimmed to WHATSAPP_CONTEXT_TOKENS, and the exchange is stored
+    for their next message. The job may run again after a crash; once a
+    reply to message_sid is queued, a rerun does nothing.
     """
+    if message_sid and await asyncio.to_thread(whatsapp_queue.replied, message_sid):
+        print(f"WhatsApp message {message_sid} already answered")
+        return
+    conversation_id = f"whatsapp:{wa_id or from_number}"
     try:
-        # Get AI response using Groq client
-        ai_response = groq_client.chat_completion(
-            messages=[
-                {"role": "system", "content": "You are SynapseIQ's AI assistant. Provide helpful, concise responses about SynapseIQ's AI services for African businesses. Keep responses under 3 paragraphs."},
-                {"role": "user", "content": message_body}
-            ]
+        conversation = await asyncio.to_thread(whatsapp_conversation_store.get, conversation_id)
+        history = conversation["turns"] if conversation else []
+        system_prompt = WHATSAPP_SYSTEM_PROMPT
+        if conversation and conversation["summary"]:
+            system_prompt = f"{system_prompt}\n\n{conversation['summary']}"
+        groq_messages, _ = token_budget.fit_messages(
+            history + [{"role": "user", "content": message_body}],
+            system_prompt=system_prompt,
+            model=groq_client.chat_model,
+            budget=min(WHATSAPP_CONTEXT_TOKENS, token_budget.budget_for(groq_client.chat_model))
+        )
+        
+        # Get AI response using the shared Groq client (off the event loop)
+        ai_response = await asyncio.to_thread(
+            groq_client.chat_completion,
+            messages=groq_messages,
+            deadline=deadline_after(WHATSAPP_REPLY_DEADLINE_SECONDS)
         )
         
         # If AI response is available, send it back via WhatsApp
-        if ai_response and "content" in ai_response:
-            response_text = ai_response["content"]
+        if ai_response and ai_response.strip():
+            response_text = ai_response
             
             # Add personalized greeting if profile name is available
             if profile_name:
@@ -116,15 +205,35 @@ async def process_incoming_message(from_number: str, message_body: str, profile_
             # Add signature
             response_text += "\n\n- SynapseIQ AI Assistant"
             
-            # Send response via WhatsApp
-            twilio_client.send_whatsapp_message(from_number, response_text)
+            # Queue the response for delivery via WhatsApp
+            await asyncio.to_thread(whatsapp_queue.enqueue, from_number, response_text, message_sid)
+            
+            # Remember the exchange without the greeting and signature; only
+            # after queueing, so a rerun of this job can't store it twice
+            try:
+                await asyncio.to_thread(
+                    whatsapp_conversation_store.append,
+                    conversation_id,
+                    [{"role": "user", "content": message_body}, {"role": "assistant", "content": ai_response}]
+                )
+            except Exception as e:
+                print(f"Could not store WhatsApp conversation {conversation_id}: {str(e)}")
         else:
             # Send fallback response if AI fails
             fallback_message = "Thank you for contacting SynapseIQ. Our team will get back to you shortly."
-            twilio_client.send_whatsapp_message(from_number, fallback_message)
+            await asyncio.to_thread(whatsapp_queue.enqueue, from_number, fallback_message, message_sid)
     
     except Exception as e:
         print(f"Error processing message: {str(e)}")
         # Send error message
         error_message = "Sorry, we're experiencing technical difficulties. Please try again later or contact us at dongobbinshombo@gmail.com."
-        twilio_client.send_whatsapp_message(from_number, error_message)
+        await asyncio.to_thread(whatsapp_queue.enqueue, from_number, error_message, message_sid)
+
+job_queue.register(REPLY_OPERATION, process_incoming_message)
+
+@router.get("/metrics")
+async def whatsapp_metrics():
+    """Reply and outbound queue depth, delivery latency, repeated webhooks ignored, and conversation cache use"""
+    stats = await asyncio.to_thread(whatsapp_queue.get_stats)
+    stats["conversations"] = whatsapp_conversation_store.get_stats()
+    return stats
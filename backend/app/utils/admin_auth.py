@@ -0,0 +1,16 @@
+import os
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+# Shared secret for admin endpoints; when unset they stay open (local development)
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+
+
+async def require_admin_key(x_admin_key: Optional[str] = Header(None)):
+    """FastAPI dependency that checks the X-Admin-Key header against ADMIN_API_KEY"""
+    if not ADMIN_API_KEY:
+        return
+    if not x_admin_key or not hmac.compare_digest(x_admin_key, ADMIN_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid or missing admin key")
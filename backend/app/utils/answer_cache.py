@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.utils.faq_retriever import FAQRetriever
+
+logger = logging.getLogger(__name__)
+
+# Answers kept in memory, and how long one stays valid
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "500"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+# Precomputed answers to frequent questions live in the precomputed_answers table
+ANSWER_DB_PATH = os.getenv("ANSWER_DB_PATH", str(Path(__file__).resolve().parent.parent.parent / "data" / "synapseiq.db"))
+# Cosine similarity a question must reach to get a precomputed answer
+PRECOMPUTED_MATCH_THRESHOLD = float(os.getenv("PRECOMPUTED_MATCH_THRESHOLD", "0.6"))
+# How often the table is checked for answers generated by another process
+PRECOMPUTED_REFRESH_SECONDS = float(os.getenv("PRECOMPUTED_REFRESH_SECONDS", "60"))
+
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]+")
+
+
+def question_key(text: str, language: Optional[str] = None) -> str:
+    """Cache key for a question: language plus casefolded words, punctuation ignored"""
+    words = PUNCTUATION_PATTERN.sub(" ", (text or "").casefold()).split()
+    return f"{language or ''}:{' '.join(words)}"
+
+
+class AnswerCache:
+    """Model answers to stand-alone questions, served without a model call
+
+    Two tiers: a TTL-bounded LRU of answers that arrived for earlier visitors,
+    and a hot set of answers precomputed for the most frequent questions. The
+    hot set is stored in the precomputed_answers table and held in memory as
+    a nearest-neighbour index, so paraphrases of a frequent question match too.
+    """
+
+    def __init__(
+        self,
+        capacity: int = ANSWER_CACHE_SIZE,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        db_path: str = ANSWER_DB_PATH
+    ):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0}
+
+        self.precomputed = FAQRetriever(faq_path=None, threshold=PRECOMPUTED_MATCH_THRESHOLD, name="Precomputed answers")
+        self._precomputed_entries: Dict[str, Dict[str, Any]] = {}
+        self._precomputed_version = None
+        self._precomputed_checked = 0.0
+        try:
+            self._ensure_table()
+            self.load_precomputed()
+        except Exception as e:
+            logger.error(f"Precomputed answers not loaded: {str(e)}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_table(self):
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS precomputed_answers (
+                    id TEXT PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    alternates TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    asked INTEGER NOT NULL,
+                    sources TEXT NOT NULL,
+                    generated_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _table_version(self, conn: sqlite3.Connection):
+        return tuple(conn.execute("SELECT COUNT(*), MAX(generated_at) FROM precomputed_answers").fetchone())
+
+    def get(self, question: str, language: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Cached answer for a question
+
+        Returns:
+            {'answer', 'metadata', 'stored_at'} or None when missing or expired
+        """
+        key = question_key(question, language)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry["stored_at"] > self.ttl_seconds:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return dict(entry)
+
+    def put(self, question: str, answer: str, language: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None):
+        """Store an answer, evicting the least recently used one when full"""
+        key = question_key(question, language)
+        with self._lock:
+            self._entries[key] = {"answer": answer, "metadata": metadata or {}, "stored_at": time.time()}
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def load_precomputed(self) -> int:
+        """Load the precomputed_answers table into the in-memory hot set; returns its size"""
+        conn = self._connect()
+        try:
+            version = self._table_version(conn)
+            rows = conn.execute("SELECT * FROM precomputed_answers ORDER BY asked DESC").fetchall()
+        finally:
+            conn.close()
+
+        entries = [{
+            "id": row["id"],
+            "question": row["question"],
+            "alternates": json.loads(row["alternates"]),
+            "language": row["language"],
+            "answer": row["answer"],
+            "asked": row["asked"],
+            "sources": json.loads(row["sources"]),
+            "generated_at": row["generated_at"],
+        } for row in rows]
+        if entries:
+            self.precomputed.load_entries(entries, source="precomputed_answers table")
+        else:
+            self.precomputed.clear()
+        with self._lock:
+            self._precomputed_entries = {entry["id"]: entry for entry in entries}
+            self._precomputed_version = version
+            self._precomputed_checked = time.monotonic()
+        return len(entries)
+
+    def precomputed_entries(self) -> Dict[str, Dict[str, Any]]:
+        """Current precomputed answers by id"""
+        with self._lock:
+            return dict(self._precomputed_entries)
+
+    def store_precomputed(self, entries: List[Dict[str, Any]]) -> int:
+        """
+        Replace the precomputed answers and reload the hot set
+
+        Args:
+            entries: {'id', 'question', 'alternates', 'language', 'answer',
+                'asked', 'sources'} per frequent question
+        """
+        generated_at = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM precomputed_answers")
+                conn.executemany(
+                    "INSERT INTO precomputed_answers (id, question, alternates, language, answer, asked, sources, generated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(
+                        entry["id"], entry["question"], json.dumps(entry.get("alternates", []), ensure_ascii=False),
+                        entry.get("language", "en"), entry["answer"], entry.get("asked", 0),
+                        json.dumps(entry.get("sources", []), ensure_ascii=False), entry.get("generated_at", generated_at)
+                    ) for entry in entries]
+                )
+        finally:
+            conn.close()
+        return self.load_precomputed()
+
+    def _refresh_precomputed(self):
+        """Pick up answers another process wrote, at most every PRECOMPUTED_REFRESH_SECONDS"""
+        with self._lock:
+            if time.monotonic() - self._precomputed_checked < PRECOMPUTED_REFRESH_SECONDS:
+                return
+            self._precomputed_checked = time.monotonic()
+        try:
+            conn = self._connect()
+            try:
+                version = self._table_version(conn)
+            finally:
+                conn.close()
+            if version != self._precomputed_version:
+                self.load_precomputed()
+        except Exception as e:
+            logger.error(f"Could not refresh precomputed answers: {str(e)}")
+
+    def lookup_precomputed(self, question: str, language: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Precomputed answer for a question close to a frequent one
+
+        Returns:
+            {'answer', 'metadata'} or None when no frequent question is close enough
+        """
+        self._refresh_precomputed()
+        match = self.precomputed.lookup(question, language=language)
+        if match is None:
+            return None
+        entry = self._precomputed_entries.get(match["id"], {})
+        return {
+            "answer": match["answer"],
+            "metadata": {"precomputed_id": match["id"], "precomputed_score": match["score"], "sources": entry.get("sources", [])}
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate and size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["capacity"] = self.capacity
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["precomputed"] = self.precomputed.get_stats()
+        return stats
+
+
+# Create a singleton instance for easy import
+answer_cache = AnswerCache()
@@ -0,0 +1,371 @@
+import os
+import re
+import queue
+import sqlite3
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.answer_cache import ANSWER_DB_PATH, answer_cache, question_key
+from app.utils.faq_retriever import faq_retriever
+from app.utils.job_queue import job_queue
+from app.utils.keyword_extractor import keyword_extractor
+from app.utils.language_id import language_identifier
+from app.utils.retry import time_remaining
+
+# scikit-learn vectorizes questions for clustering; without it nothing is precomputed
+SKLEARN_AVAILABLE = True
+try:
+    from scipy.sparse import hstack
+    from sklearn.feature_extraction.text import TfidfVectorizer
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Job operation that refreshes the precomputed answers
+PRECOMPUTE_OPERATION = "refresh_precomputed_answers"
+
+# Set to false to stop scheduling the nightly refresh
+PRECOMPUTE_ENABLED = os.getenv("PRECOMPUTE_ENABLED", "true").lower() == "true"
+# Server-local hour at which the refresh runs (off-peak)
+PRECOMPUTE_OFF_PEAK_HOUR = int(os.getenv("PRECOMPUTE_OFF_PEAK_HOUR", "2"))
+# Questions asked in this many days are mined
+PRECOMPUTE_WINDOW_DAYS = float(os.getenv("PRECOMPUTE_WINDOW_DAYS", "14"))
+# How many frequent questions get an answer, and how often one must have been asked
+PRECOMPUTE_TOP_N = int(os.getenv("PRECOMPUTE_TOP_N", "50"))
+PRECOMPUTE_MIN_ASKED = int(os.getenv("PRECOMPUTE_MIN_ASKED", "3"))
+# Cosine similarity at which two questions count as the same question
+PRECOMPUTE_CLUSTER_THRESHOLD = float(os.getenv("PRECOMPUTE_CLUSTER_THRESHOLD", "0.6"))
+# Answers generated at once (kept low so the refresh doesn't crowd out live traffic)
+PRECOMPUTE_CONCURRENCY = int(os.getenv("PRECOMPUTE_CONCURRENCY", "2"))
+# Set to false to stop logging visitor questions (off whenever precompute is off,
+# since nothing else reads or purges the log)
+QUESTION_LOG_ENABLED = PRECOMPUTE_ENABLED and os.getenv("QUESTION_LOG_ENABLED", "true").lower() == "true"
+# Logged questions older than this are deleted; only the mining window is needed
+QUESTION_LOG_RETENTION_DAYS = float(os.getenv("QUESTION_LOG_RETENTION_DAYS", str(PRECOMPUTE_WINDOW_DAYS)))
+
+# At most this many recent questions are read per refresh
+MAX_MINED_QUESTIONS = 20000
+# Phrasings kept per cluster as alternates of its canonical question
+MAX_ALTERNATES = 10
+# Longer messages are not questions worth precomputing
+MAX_QUESTION_CHARS = 300
+
+# Word and character n-gram spaces are weighted equally, as in the FAQ index
+SPACE_WEIGHT = np.sqrt(0.5)
+
+# A cluster leader is only compared with questions sharing one of its
+# highest-weighted terms, so clustering stays near-linear in the log size
+CLUSTER_LEADER_TERMS = 3
+
+# Contact details are replaced before a question is logged
+SCRUB_PATTERNS = [
+    (re.compile(r"\S+@\S+\.\w+"), "[email]"),
+    (re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE), "[link]"),
+    # Phone numbers: international (+ and 7 or more digits), local (0 and 8 or
+    # more digits) or a bare run of 9 or more digits; prices, years and their
+    # ranges ("500-1000", "2023-2024") are kept
+    (re.compile(r"\+\d(?:[\s().-]{0,2}\d){6,}|(?<!\w)\(?0\d(?:[\s().-]{0,2}\d){7,}|\b\d{9,}\b"), "[number]"),
+]
+
+
+def scrub_question(text: str) -> str:
+    """Question text as it is logged: whitespace collapsed, emails, links and phone numbers replaced"""
+    text = " ".join((text or "").split())
+    for pattern, replacement in SCRUB_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class QuestionLog:
+    """Append-only log of visitor questions from the chatbot and WhatsApp
+
+    record() only queues the question; a background thread inserts queued
+    questions in batches, so the request path never waits on SQLite. Only the
+    scrubbed question text is kept (no sender), and only for the mining window.
+    """
+
+    def __init__(self, db_path: str = ANSWER_DB_PATH):
+        self.db_path = db_path
+        self._queue: "queue.Queue[Tuple[str, str, Optional[str], float]]" = queue.Queue(maxsize=10000)
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+        try:
+            self._ensure_table()
+        except Exception as e:
+            logger.error(f"Question log table not created: {str(e)}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_table(self):
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS question_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    language TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_question_log_created ON question_log (created_at)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, question: str, channel: str, language: Optional[str] = None):
+        """
+        Queue a question for the log
+
+        Args:
+            question: Visitor message (only stand-alone questions are useful)
+            channel: chat or whatsapp
+            language: Detected language, when the caller already knows it
+        """
+        if not QUESTION_LOG_ENABLED:
+            return
+        question = scrub_question(question)
+        if not question or len(question) > MAX_QUESTION_CHARS:
+            return
+        if self._writer is None:
+            with self._start_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write, name="question-log-writer", daemon=True)
+                    self._writer.start()
+        try:
+            self._queue.put_nowait((channel, question, language, time.time()))
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                conn = self._connect()
+                try:
+                    conn.executemany(
+                        "INSERT INTO question_log (channel, question, language, created_at) VALUES (?, ?, ?, ?)", batch
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Could not write {len(batch)} questions to the log: {str(e)}")
+
+    def recent(self, since: float, limit: int = MAX_MINED_QUESTIONS) -> List[Dict[str, Any]]:
+        """Newest questions logged after `since` (time.time())"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT channel, question, language, created_at FROM question_log "
+                "WHERE created_at >= ? ORDER BY created_at DESC LIMIT ?",
+                (since, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def purge(self, before: float) -> int:
+        """Delete questions logged before `before` (time.time())"""
+        conn = self._connect()
+        try:
+            deleted = conn.execute("DELETE FROM question_log WHERE created_at < ?", (before,)).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        return deleted
+
+
+class AnswerPrecomputer:
+    """Finds the most frequent recent questions and pre-generates their answers
+
+    Questions from the log are grouped by language, exact repeats are
+    counted, and near-duplicates ("how much is a chatbot", "chatbot price?")
+    are clustered greedily around the most-asked phrasing by TF-IDF cosine
+    similarity. The top clusters, minus questions the FAQ already answers,
+    get a canonical answer from the model, and the answers replace the hot
+    set in answer_cache.
+    """
+
+    def __init__(self, log: QuestionLog):
+        self.log = log
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def mine(self, top_n: int = PRECOMPUTE_TOP_N, window_days: float = PRECOMPUTE_WINDOW_DAYS) -> Dict[str, Any]:
+        """
+        Cluster recent questions and rank the clusters by how often they were asked
+
+        Returns:
+            {'questions': rows scanned, 'clusters': [{'id', 'question',
+            'alternates', 'language', 'asked'}, ...] best first}
+        """
+        if not SKLEARN_AVAILABLE:
+            raise RuntimeError("scikit-learn is required to cluster questions")
+
+        rows = self.log.recent(time.time() - window_days * 86400)
+        missing = [row for row in rows if not row["language"]]
+        for row, detection in zip(missing, language_identifier.detect_batch([row["question"] for row in missing])):
+            row["language"] = detection["language"] if detection["reliable"] else "en"
+
+        # Exact repeats (ignoring case and punctuation) collapse to one phrasing
+        counts: Dict[str, Counter] = {}
+        for row in rows:
+            key = question_key(row["question"], row["language"])
+            counts.setdefault(key, Counter())[row["question"]] += 1
+
+        by_language: Dict[str, List[Tuple[str, int]]] = {}
+        for key, phrasings in counts.items():
+            language = key.split(":", 1)[0]
+            text = phrasings.most_common(1)[0][0]
+            best_faq = faq_retriever.search(text, top_k=1)
+            if best_faq and best_faq[0]["score"] >= faq_retriever.threshold:
+                continue
+            if keyword_extractor.words(text):
+                by_language.setdefault(language, []).append((text, sum(phrasings.values())))
+
+        clusters = []
+        for language, questions in by_language.items():
+            clusters.extend(self._cluster(questions, language))
+        clusters = [cluster for cluster in clusters if cluster["asked"] >= PRECOMPUTE_MIN_ASKED]
+        clusters.sort(key=lambda cluster: -cluster["asked"])
+        return {"questions": len(rows), "clusters": clusters[:top_n]}
+
+    def _cluster(self, questions: List[Tuple[str, int]], language: str) -> List[Dict[str, Any]]:
+        """
+        Greedy leader clustering: the most-asked unassigned question gathers everything close to it
+
+        Candidates for a leader are the questions containing one of its
+        CLUSTER_LEADER_TERMS highest-weighted words or word pairs; only those
+        are scored, instead of every question in the log.
+        """
+        questions.sort(key=lambda item: -item[1])
+        content = [" ".join(keyword_extractor.words(text)) for text, _ in questions]
+        word_vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, strip_accents="unicode")
+        char_vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True, strip_accents="unicode")
+        words = word_vectorizer.fit_transform(content).tocsr()
+        matrix = hstack([
+            words * SPACE_WEIGHT,
+            char_vectorizer.fit_transform(content) * SPACE_WEIGHT,
+        ]).tocsr()
+        postings = words.tocsc()
+
+        assigned = np.zeros(len(questions), dtype=bool)
+        clusters = []
+        for leader in range(len(questions)):
+            if assigned[leader]:
+                continue
+            row = words.getrow(leader)
+            terms = row.indices[np.argsort(-row.data)[:CLUSTER_LEADER_TERMS]]
+            candidates = np.unique(postings[:, terms].indices) if len(terms) else np.array([], dtype=int)
+            candidates = candidates[~assigned[candidates]]
+            members = np.array([], dtype=int)
+            if len(candidates):
+                similarities = (matrix[candidates] @ matrix[leader].T).toarray().ravel()
+                members = candidates[similarities >= PRECOMPUTE_CLUSTER_THRESHOLD]
+            members = np.union1d(members, [leader]).astype(int)
+            assigned[members] = True
+            question = questions[leader][0]
+            clusters.append({
+                "id": hashlib.sha1(question_key(question, language).encode("utf-8")).hexdigest()[:16],
+                "question": question,
+                "alternates": [questions[member][0] for member in members if member != leader][:MAX_ALTERNATES],
+                "language": language,
+                "asked": int(sum(questions[member][1] for member in members)),
+            })
+        return clusters
+
+    def refresh(
+        self,
+        generate: Callable[[str, str, Optional[float]], Tuple[str, List[Dict[str, Any]]]],
+        deadline: Optional[float] = None,
+        top_n: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Regenerate the hot set of precomputed answers
+
+        Args:
+            generate: Called with (question, language, deadline); returns
+                (answer, sources) or raises
+            deadline: time.monotonic() value after which no new answer is
+                generated; questions left over keep their previous answer
+            top_n: Number of frequent questions to answer (PRECOMPUTE_TOP_N by default)
+
+        Returns:
+            Counts of scanned questions, clusters, and generated, reused and
+            failed answers
+        """
+        mined = self.mine(top_n or PRECOMPUTE_TOP_N)
+        clusters = mined["clusters"]
+        previous = answer_cache.precomputed_entries()
+        summary = {"questions": mined["questions"], "clusters": len(clusters), "generated": 0, "reused": 0, "failed": 0}
+
+        def answer(cluster):
+            remaining = time_remaining(deadline)
+            if remaining is not None and remaining <= 0:
+                return cluster, None, None
+            try:
+                return cluster, *generate(cluster["question"], cluster["language"], deadline)
+            except Exception as e:
+                logger.warning(f"Could not precompute an answer for '{cluster['question']}': {str(e)}")
+                return cluster, None, None
+
+        entries = []
+        with ThreadPoolExecutor(max_workers=max(1, PRECOMPUTE_CONCURRENCY)) as pool:
+            for cluster, text, sources in pool.map(answer, clusters):
+                if text and text.strip():
+                    entries.append(dict(cluster, answer=text.strip(), sources=sources or []))
+                    summary["generated"] += 1
+                elif cluster["id"] in previous:
+                    # Keep yesterday's answer rather than dropping a frequent question
+                    old = previous[cluster["id"]]
+                    entries.append(dict(cluster, answer=old["answer"], sources=old["sources"], generated_at=old["generated_at"]))
+                    summary["reused"] += 1
+                else:
+                    summary["failed"] += 1
+
+        if entries or not clusters:
+            summary["stored"] = answer_cache.store_precomputed(entries)
+        summary["purged_questions"] = self.log.purge(time.time() - QUESTION_LOG_RETENTION_DAYS * 86400)
+        summary["finished_at"] = datetime.now().isoformat()
+        self.last_run = summary
+        logger.info(f"Precomputed answers refreshed: {summary}")
+        return summary
+
+    def next_off_peak(self, now: Optional[datetime] = None) -> float:
+        """time.time() of the next PRECOMPUTE_OFF_PEAK_HOUR:00, server-local time"""
+        now = now or datetime.now()
+        run_at = now.replace(hour=PRECOMPUTE_OFF_PEAK_HOUR, minute=0, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        return run_at.timestamp()
+
+    def ensure_scheduled(self) -> Optional[Dict[str, Any]]:
+        """Queue the next off-peak refresh unless one is already waiting; returns the new job"""
+        if not PRECOMPUTE_ENABLED or PRECOMPUTE_OPERATION not in job_queue.operations():
+            return None
+        if job_queue.pending(PRECOMPUTE_OPERATION):
+            return None
+        return job_queue.submit(PRECOMPUTE_OPERATION, {}, priority="bulk", available_at=self.next_off_peak())
+
+
+# Create singleton instances for easy import
+question_log = QuestionLog()
+answer_precomputer = AnswerPrecomputer(question_log)
@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.utils.content_index import CONTENT_DB_PATH
+from app.utils.job_queue import job_queue
+from app.utils.language_id import language_identifier
+
+logger = logging.getLogger(__name__)
+
+# Job operation that translates a published blog post
+BLOG_TRANSLATION_OPERATION = "translate_blog_post"
+
+# Set to false to stop translating posts when they are published or edited
+BLOG_TRANSLATION_ENABLED = os.getenv("BLOG_TRANSLATION_ENABLED", "true").lower() == "true"
+# Languages every published post is translated into (comma-separated codes)
+BLOG_TRANSLATION_LANGUAGES = [
+    language.strip().lower()
+    for language in os.getenv("BLOG_TRANSLATION_LANGUAGES", "fr,sw,ny,ln,ar").split(",")
+    if language.strip()
+]
+# Languages translated at once per post, and packs in flight per language
+BLOG_TRANSLATION_CONCURRENCY = int(os.getenv("BLOG_TRANSLATION_CONCURRENCY", "2"))
+# Prompt size per pack of paragraphs
+BLOG_TRANSLATION_PACK_TOKENS = int(os.getenv("BLOG_TRANSLATION_PACK_TOKENS", "1500"))
+
+# Paragraph breaks are kept verbatim so markdown structure survives translation
+PARAGRAPH_BREAK = re.compile(r"(\n\s*\n)")
+
+
+def content_hash(title: str, excerpt: str, content: str) -> str:
+    """Identity of the translatable text of a post; any edit to it changes the hash"""
+    payload = json.dumps([title or "", excerpt or "", content or ""], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class BlogTranslator:
+    """Translates published blog posts ahead of time and serves the stored translations
+
+    Translations live in the blog_post_translations table keyed by post,
+    language and content hash. simple_server.py queues a translation job when
+    a post is published or edited; the job runs on the API's job workers and
+    only translates languages that have no translation for the post's current
+    hash, so an unchanged post is never translated twice. Each job is for one
+    version (hash) of the post: saving the same text again doesn't queue a
+    second job while one is waiting or running, and a job whose version was
+    edited away stops without translating or storing anything. Readers get
+    the stored translation, never a live model call.
+    """
+
+    def __init__(self, db_path: str = CONTENT_DB_PATH, languages: List[str] = BLOG_TRANSLATION_LANGUAGES):
+        self.db_path = db_path
+        self.languages = languages
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS blog_post_translations (
+                        post_id INTEGER NOT NULL,
+                        language TEXT NOT NULL,
+                        content_hash TEXT NOT NULL,
+                        title TEXT NOT NULL,
+                        excerpt TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        source_language TEXT NOT NULL,
+                        created_at TEXT NOT NULL,
+                        PRIMARY KEY (post_id, language, content_hash)
+                    )
+                """)
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Blog translations table not created in {db_path}: {str(e)}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _read_post(self, conn: sqlite3.Connection, post_id: int) -> Optional[sqlite3.Row]:
+        return conn.execute(
+            "SELECT id, title, excerpt, content, published FROM blog_posts WHERE id = ?", (post_id,)
+        ).fetchone()
+
+    def _missing_languages(self, conn: sqlite3.Connection, post: sqlite3.Row, source_language: str) -> List[str]:
+        """Configured languages without a translation of the post's current text"""
+        digest = content_hash(post["title"], post["excerpt"], post["content"])
+        done = {
+            row["language"]
+            for row in conn.execute(
+                "SELECT language FROM blog_post_translations WHERE post_id = ? AND content_hash = ?",
+                (post["id"], digest)
+            )
+        }
+        return [language for language in self.languages if language != source_language and language not in done]
+
+    def _source_language(self, post: sqlite3.Row) -> str:
+        detection = language_identifier.detect(f"{post['title']}\n{post['excerpt']}\n{post['content'][:2000]}")
+        return detection["language"] if detection["reliable"] else "en"
+
+    def enqueue(self, post_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Queue translation of a published post if any configured language lacks it
+
+        Called by the blog write endpoints; failures are logged and never
+        raised, so translation can't break a save.
+
+        Returns:
+            The queued job, or None when there is nothing to translate
+        """
+        if not BLOG_TRANSLATION_ENABLED or not self.languages:
+            return None
+        try:
+            conn = self._connect()
+            try:
+                post = self._read_post(conn, post_id)
+                if not post or not post["published"]:
+                    return None
+                if not self._missing_languages(conn, post, self._source_language(post)):
+                    return None
+            finally:
+                conn.close()
+            params = {"post_id": post_id, "queued_hash": content_hash(post["title"], post["excerpt"], post["content"])}
+            return job_queue.submit(BLOG_TRANSLATION_OPERATION, params, priority="bulk", dedupe=params)
+        except Exception as e:
+            logger.error(f"Could not queue translation of blog post {post_id}: {str(e)}")
+            return None
+
+    def translate_post(
+        self,
+        post_id: int,
+        queued_hash: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Translate a post into every configured language it lacks (job handler)
+
+        Title, excerpt and each paragraph of the content are translated as
+        keyed strings, so a language is only stored once all of them came
+        back. Languages that failed make the job fail, and its retry picks up
+        just those. The job does nothing if the post's content hash is no
+        longer queued_hash (it was edited after the job was queued), since a
+        newer job covers the new text.
+
+        Returns:
+            {'post_id', 'content_hash', 'translated': [...], 'skipped': reason}
+        """
+        # Imported here so simple_server.py, which only queues jobs, doesn't set up an LLM client
+        from app.utils.groq_client import groq_client
+
+        conn = self._connect()
+        try:
+            post = self._read_post(conn, post_id)
+            if not post or not post["published"]:
+                return {"post_id": post_id, "translated": [], "skipped": "not published"}
+            digest = content_hash(post["title"], post["excerpt"], post["content"])
+            if queued_hash and queued_hash != digest:
+                return {"post_id": post_id, "translated": [], "skipped": "superseded by an edit"}
+            source_language = self._source_language(post)
+            languages = self._missing_languages(conn, post, source_language)
+        finally:
+            conn.close()
+
+        parts = PARAGRAPH_BREAK.split(post["content"] or "")
+        strings = {"title": post["title"] or "", "excerpt": post["excerpt"] or ""}
+        for position, part in enumerate(parts):
+            if not PARAGRAPH_BREAK.fullmatch(part):
+                strings[f"content.{position}"] = part
+
+        def translate(language):
+            result = groq_client.translate_strings(
+                strings,
+                source_language,
+                language,
+                deadline=deadline,
+                pack_tokens=BLOG_TRANSLATION_PACK_TOKENS,
+                concurrency=BLOG_TRANSLATION_CONCURRENCY
+            )
+            return language, result
+
+        translated, failed, superseded = [], [], []
+        with ThreadPoolExecutor(max_workers=max(1, BLOG_TRANSLATION_CONCURRENCY)) as executor:
+            for language, result in executor.map(translate, languages):
+                if result["missing"]:
+                    failed.append(language)
+                    continue
+                texts = result["translations"]
+                content = "".join(
+                    texts[f"content.{position}"] if f"content.{position}" in strings else part
+                    for position, part in enumerate(parts)
+                )
+                if self._store(post_id, language, digest, texts["title"], texts["excerpt"], content, source_language):
+                    translated.append(language)
+                else:
+                    superseded.append(language)
+
+        if superseded:
+            logger.info(f"Blog post {post_id} was edited while translating; dropped {', '.join(superseded)}")
+            return {"post_id": post_id, "content_hash": digest, "translated": translated, "skipped": "superseded by an edit"}
+        if failed:
+            raise RuntimeError(f"Blog post {post_id} not translated into {', '.join(failed)}")
+        logger.info(f"Blog post {post_id} translated into {translated or 'no new languages'}")
+        return {"post_id": post_id, "content_hash": digest, "translated": translated}
+
+    def _store(self, post_id: int, language: str, digest: str, title: str, excerpt: str, content: str, source_language: str) -> bool:
+        """
+        Save a translation, replacing the ones of earlier versions of the post
+
+        Returns:
+            False, storing nothing, if the post has been edited or unpublished
+            since it was translated
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            post = self._read_post(conn, post_id)
+            if not post or not post["published"] or content_hash(post["title"], post["excerpt"], post["content"]) != digest:
+                conn.rollback()
+                return False
+            conn.execute("DELETE FROM blog_post_translations WHERE post_id = ? AND language = ?", (post_id, language))
+            conn.execute(
+                "INSERT INTO blog_post_translations "
+                "(post_id, language, content_hash, title, excerpt, content, source_language, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (post_id, language, digest, title, excerpt, content, source_language, datetime.now().isoformat())
+            )
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+
+    def get(self, post_id: int, language: str, digest: str) -> Optional[Dict[str, Any]]:
+        """Stored translation of a post's current text (by content hash), or None"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT title, excerpt, content, source_language, created_at FROM blog_post_translations "
+                "WHERE post_id = ? AND language = ? AND content_hash = ?",
+                (post_id, language.lower(), digest)
+            ).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    def delete_post(self, post_id: int):
+        """Drop all translations of a deleted post"""
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM blog_post_translations WHERE post_id = ?", (post_id,))
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Could not delete translations of blog post {post_id}: {str(e)}")
+
+
+# Create a singleton instance for easy import
+blog_translator = BlogTranslator()
+
+# Registered on import, so both simple_server.py (which queues the jobs) and
+# the API (whose workers run them) know the operation
+job_queue.register(BLOG_TRANSLATION_OPERATION, blog_translator.translate_post)
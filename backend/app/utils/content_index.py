@@ -0,0 +1,487 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# scikit-learn/scipy hash and store the chunk vectors; without them search returns nothing
+SKLEARN_AVAILABLE = True
+try:
+    from scipy.sparse import csr_matrix, vstack
+    from sklearn.feature_extraction.text import HashingVectorizer
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+from app.utils.keyword_extractor import keyword_extractor
+from app.utils.token_budget import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Same database the blog and testimonial endpoints write to
+CONTENT_DB_PATH = os.getenv("CONTENT_DB_PATH", str(Path(__file__).resolve().parent.parent.parent / "data" / "synapseiq.db"))
+# Words per chunk; long posts are split at paragraph boundaries
+CHUNK_WORDS = int(os.getenv("RETRIEVAL_CHUNK_WORDS", "120"))
+# How often a search checks the change log for writes made by other processes
+REFRESH_SECONDS = float(os.getenv("RETRIEVAL_REFRESH_SECONDS", "2"))
+
+# Hashed feature space; large enough that collisions don't matter for ranking
+N_FEATURES = 2 ** 20
+# Rows added since the last compaction are scored separately until this many pile up
+DELTA_LIMIT = 512
+
+MARKUP_PATTERN = re.compile(r"<[^>]+>|[#*_`>]+")
+PARAGRAPH_PATTERN = re.compile(r"\n\s*\n|\n(?=#)")
+
+
+def chunk_text(text: str, chunk_words: int = CHUNK_WORDS) -> List[str]:
+    """Split text into chunks of about chunk_words words, keeping paragraphs together"""
+    chunks: List[str] = []
+    current: List[str] = []
+    for paragraph in PARAGRAPH_PATTERN.split(text or ""):
+        words = MARKUP_PATTERN.sub(" ", paragraph).split()
+        while words:
+            room = chunk_words - len(current)
+            if current and room < len(words) <= chunk_words:
+                # The paragraph fits in a chunk of its own; don't split it
+                chunks.append(" ".join(current))
+                current = []
+                continue
+            current.extend(words[:room])
+            words = words[room:]
+            if len(current) >= chunk_words:
+                chunks.append(" ".join(current))
+                current = []
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class ContentIndex:
+    """Retrieval index over published blog posts and testimonials
+
+    Chunks are hashed into sparse term-frequency vectors (content words and
+    word bigrams), so new chunks never require refitting a vocabulary.
+    Document frequencies are kept per hashed feature and applied to the query
+    as IDF weights. The bulk of the rows live in a CSC matrix, so scoring only
+    touches the posting lists of the query's terms; rows added since the last
+    compaction sit in a small CSR delta matrix, and removed rows are masked
+    until the next compaction.
+
+    Chunks are also stored in the content_chunks table with a change log, so
+    a write made by one process (e.g. simple_server.py publishing a post) is
+    picked up incrementally by the chatbot process on its next search.
+    """
+
+    def __init__(self, db_path: str = CONTENT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._vectorizer = HashingVectorizer(
+            n_features=N_FEATURES,
+            analyzer=self._terms,
+            alternate_sign=False,
+            norm="l2"
+        ) if SKLEARN_AVAILABLE else None
+        self._reset()
+        self._last_seq = 0
+        self._last_refresh = 0.0
+        self._stats = {"searches": 0, "total_latency": 0.0, "max_latency": 0.0, "updates": 0, "compactions": 0}
+
+        if SKLEARN_AVAILABLE:
+            try:
+                self.load()
+            except sqlite3.Error as e:
+                logger.error(f"Content index not loaded from {db_path}: {str(e)}")
+        else:
+            logger.warning("scikit-learn not available; chatbot answers will not use retrieved content")
+
+    def _reset(self):
+        self._chunks: List[Optional[Dict[str, Any]]] = []
+        self._documents: Dict[Tuple[str, int], List[int]] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._df = np.zeros(N_FEATURES, dtype=np.int64)
+        self._live_rows = 0
+        self._main = None
+        self._main_rows = 0
+        self._delta_vectors = []
+        self._delta = None
+
+    def _terms(self, text: str) -> List[str]:
+        words = keyword_extractor.words(text)
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_tables(self, conn: sqlite3.Connection):
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS content_chunks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            source_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            title TEXT,
+            text TEXT NOT NULL
+        )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_content_chunks_document ON content_chunks (source, source_id)")
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS content_index_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            source_id INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        ''')
+
+    def load(self):
+        """Load stored chunks, building them from the source tables on first run"""
+        conn = self._connect()
+        try:
+            self._ensure_tables(conn)
+            conn.commit()
+            stored = conn.execute("SELECT COUNT(*) FROM content_chunks").fetchone()[0]
+        finally:
+            conn.close()
+
+        if stored == 0:
+            self.rebuild()
+            return
+
+        conn = self._connect()
+        try:
+            last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM content_index_log").fetchone()[0]
+            documents: Dict[Tuple[str, int], List[Tuple[str, str]]] = {}
+            for row in conn.execute("SELECT source, source_id, title, text FROM content_chunks ORDER BY source, source_id, position"):
+                documents.setdefault((row["source"], row["source_id"]), []).append((row["title"], row["text"]))
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._reset()
+            self._add_rows([(key, title, text) for key, chunks in documents.items() for title, text in chunks])
+            self._compact()
+            self._last_seq = last_seq
+        logger.info(f"Content index loaded: {self._live_rows} chunks from {len(documents)} documents")
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Re-chunk every published blog post and testimonial"""
+        conn = self._connect()
+        try:
+            self._ensure_tables(conn)
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            keys = []
+            if "blog_posts" in tables:
+                keys += [("blog_post", row[0]) for row in conn.execute("SELECT id FROM blog_posts WHERE published = 1")]
+            if "testimonials" in tables:
+                keys += [("testimonial", row[0]) for row in conn.execute("SELECT id FROM testimonials")]
+
+            documents = {key: self._read_document(conn, *key) for key in keys}
+            conn.execute("DELETE FROM content_chunks")
+            for (source, source_id), chunks in documents.items():
+                self._store_chunks(conn, source, source_id, chunks)
+            conn.execute(
+                "INSERT INTO content_index_log (source, source_id, updated_at) VALUES ('*', 0, ?)",
+                (datetime.now().isoformat(),)
+            )
+            last_seq = conn.execute("SELECT MAX(seq) FROM content_index_log").fetchone()[0]
+            conn.commit()
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._reset()
+            self._add_rows([(key, title, text) for key, chunks in documents.items() for title, text in chunks])
+            self._compact()
+            self._last_seq = last_seq
+        logger.info(f"Content index rebuilt: {self._live_rows} chunks from {len(documents)} documents")
+        return {"documents": len(documents), "chunks": self._live_rows}
+
+    def _read_document(self, conn: sqlite3.Connection, source: str, source_id: int) -> List[Tuple[str, str]]:
+        """Current (title, chunk) list for a source row; empty if it is gone or unpublished"""
+        if source == "blog_post":
+            row = conn.execute(
+                "SELECT title, excerpt, content, category FROM blog_posts WHERE id = ? AND published = 1",
+                (source_id,)
+            ).fetchone()
+            if row is None:
+                return []
+            title = row["title"]
+            body = f"{row['excerpt'] or ''}\n\n{row['content'] or ''}"
+            return [(title, f"{title}: {chunk}") for chunk in chunk_text(body)]
+
+        if source == "testimonial":
+            row = conn.execute(
+                "SELECT name, company, position, content FROM testimonials WHERE id = ?",
+                (source_id,)
+            ).fetchone()
+            if row is None or not row["content"]:
+                return []
+            title = f"Testimonial from {row['name']}, {row['position']} at {row['company']}"
+            return [(title, f"{title}: {chunk}") for chunk in chunk_text(row["content"])]
+
+        return []
+
+    def _store_chunks(self, conn: sqlite3.Connection, source: str, source_id: int, chunks: List[Tuple[str, str]]):
+        conn.execute("DELETE FROM content_chunks WHERE source = ? AND source_id = ?", (source, source_id))
+        conn.executemany(
+            "INSERT INTO content_chunks (source, source_id, position, title, text) VALUES (?, ?, ?, ?, ?)",
+            [(source, source_id, position, title, text) for position, (title, text) in enumerate(chunks)]
+        )
+
+    def sync_document(self, source: str, source_id: int):
+        """
+        Re-index one blog post or testimonial after it was written
+
+        Called by the write endpoints; failures are logged and never raised, so
+        indexing can't break a save.
+
+        Args:
+            source: "blog_post" or "testimonial"
+            source_id: Row id in the source table
+        """
+        if not SKLEARN_AVAILABLE:
+            return
+        try:
+            conn = self._connect()
+            try:
+                self._ensure_tables(conn)
+                chunks = self._read_document(conn, source, source_id)
+                self._store_chunks(conn, source, source_id, chunks)
+                seq = conn.execute(
+                    "INSERT INTO content_index_log (source, source_id, updated_at) VALUES (?, ?, ?)",
+                    (source, source_id, datetime.now().isoformat())
+                ).lastrowid
+                conn.commit()
+            finally:
+                conn.close()
+            self._apply(source, source_id, chunks)
+            with self._lock:
+                # Skip our own log entry on the next refresh unless another process wrote before it
+                if seq == self._last_seq + 1:
+                    self._last_seq = seq
+        except Exception as e:
+            logger.error(f"Could not index {source} {source_id}: {str(e)}")
+
+    def sync_blog_post(self, post_id: int):
+        """Re-index a blog post (drops it when unpublished or deleted)"""
+        self.sync_document("blog_post", post_id)
+
+    def sync_testimonial(self, testimonial_id: int):
+        """Re-index a testimonial (drops it when deleted)"""
+        self.sync_document("testimonial", testimonial_id)
+
+    def refresh(self, force: bool = False):
+        """Apply changes other processes logged since the last refresh"""
+        now = time.monotonic()
+        if not SKLEARN_AVAILABLE or (not force and now - self._last_refresh < REFRESH_SECONDS):
+            return
+        self._last_refresh = now
+        try:
+            conn = self._connect()
+            try:
+                changes = conn.execute(
+                    "SELECT seq, source, source_id FROM content_index_log WHERE seq > ? ORDER BY seq",
+                    (self._last_seq,)
+                ).fetchall()
+                if not changes:
+                    return
+                if any(change["source"] == "*" for change in changes):
+                    # Another process rebuilt the whole index
+                    conn.close()
+                    conn = None
+                    self.load()
+                    return
+                updates = {}
+                for change in changes:
+                    key = (change["source"], change["source_id"])
+                    updates[key] = [
+                        (row["title"], row["text"])
+                        for row in conn.execute(
+                            "SELECT title, text FROM content_chunks WHERE source = ? AND source_id = ? ORDER BY position",
+                            key
+                        )
+                    ]
+                last_seq = changes[-1]["seq"]
+            finally:
+                if conn is not None:
+                    conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Content index refresh failed: {str(e)}")
+            return
+
+        for (source, source_id), chunks in updates.items():
+            self._apply(source, source_id, chunks)
+        with self._lock:
+            self._last_seq = max(self._last_seq, last_seq)
+
+    def _apply(self, source: str, source_id: int, chunks: List[Tuple[str, str]]):
+        """Replace a document's rows in memory"""
+        key = (source, source_id)
+        with self._lock:
+            for row in self._documents.pop(key, []):
+                chunk = self._chunks[row]
+                if chunk is not None:
+                    self._df[chunk["features"]] -= 1
+                    self._chunks[row] = None
+                    self._alive[row] = False
+                    self._live_rows -= 1
+            self._add_rows([(key, title, text) for title, text in chunks])
+            self._stats["updates"] += 1
+            if len(self._delta_vectors) > DELTA_LIMIT:
+                self._compact()
+
+    def _add_rows(self, rows: List[Tuple[Tuple[str, int], str, str]]):
+        """Append chunks as delta rows (lock held)"""
+        if not rows:
+            return
+        vectors = self._vectorizer.transform([text for _, _, text in rows])
+        start = len(self._chunks)
+        for offset, (key, title, text) in enumerate(rows):
+            vector = vectors[offset]
+            self._chunks.append({
+                "source": key[0],
+                "source_id": key[1],
+                "title": title,
+                "text": text,
+                "features": vector.indices.copy(),
+            })
+            self._documents.setdefault(key, []).append(start + offset)
+            self._df[vector.indices] += 1
+        self._alive = np.concatenate((self._alive, np.ones(len(rows), dtype=bool)))
+        self._live_rows += len(rows)
+        self._delta_vectors.append(vectors)
+        self._delta = vstack(self._delta_vectors).tocsr()
+
+    def _compact(self):
+        """Fold the delta rows into the main matrix and drop removed rows (lock held)"""
+        parts = []
+        if self._main is not None:
+            parts.append(self._main.tocsr())
+        if self._delta is not None:
+            parts.append(self._delta)
+        keep = np.flatnonzero(self._alive)
+        if parts:
+            matrix = vstack(parts).tocsr()[keep]
+        else:
+            matrix = csr_matrix((0, N_FEATURES))
+
+        chunks = [self._chunks[row] for row in keep]
+        documents: Dict[Tuple[str, int], List[int]] = {}
+        for row, chunk in enumerate(chunks):
+            documents.setdefault((chunk["source"], chunk["source_id"]), []).append(row)
+
+        self._chunks = chunks
+        self._documents = documents
+        self._alive = np.ones(len(chunks), dtype=bool)
+        self._main = matrix.tocsc()
+        self._main_rows = len(chunks)
+        self._delta_vectors = []
+        self._delta = None
+        self._stats["compactions"] += 1
+
+    def search(self, query: str, top_k: int = 4, min_score: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Chunks most relevant to a query, best first
+
+        Args:
+            query: Visitor message
+            top_k: Maximum number of chunks
+            min_score: Drop chunks scoring below this
+
+        Returns:
+            List of {'source', 'source_id', 'title', 'text', 'score'}
+        """
+        if not SKLEARN_AVAILABLE or not query or not query.strip():
+            return []
+        self.refresh()
+
+        start = time.perf_counter()
+        vector = self._vectorizer.transform([query])
+        with self._lock:
+            main, delta, alive, chunks = self._main, self._delta, self._alive, self._chunks
+            live_rows = self._live_rows
+            features = vector.indices
+            idf = np.log((live_rows + 1) / (self._df[features] + 1)) + 1.0
+
+        results = []
+        if len(features) and live_rows:
+            # IDF-weighted query, unit length, so scores are cosines in [0, 1]
+            weights = vector.data * idf
+            weights /= np.linalg.norm(weights)
+            scores = np.zeros(len(alive))
+            if main is not None and main.shape[0]:
+                scores[:main.shape[0]] = main[:, features] @ weights
+            if delta is not None:
+                scores[len(alive) - delta.shape[0]:] = delta[:, features] @ weights
+            scores[~alive] = 0.0
+
+            count = min(top_k, len(scores))
+            candidates = np.argpartition(-scores, count - 1)[:count]
+            for row in candidates[np.argsort(-scores[candidates])]:
+                score = float(scores[row])
+                if score <= 0 or score < min_score:
+                    break
+                chunk = chunks[row]
+                results.append({
+                    "source": chunk["source"],
+                    "source_id": chunk["source_id"],
+                    "title": chunk["title"],
+                    "text": chunk["text"],
+                    "score": round(score, 4),
+                })
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats["searches"] += 1
+            self._stats["total_latency"] += elapsed
+            self._stats["max_latency"] = max(self._stats["max_latency"], elapsed)
+        return results
+
+    def build_context(self, results: List[Dict[str, Any]], max_tokens: int) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Format retrieved chunks for a prompt within a token budget
+
+        Returns:
+            (context text, the results that made it in); the last chunk is
+            truncated rather than dropped when it only partly fits
+        """
+        lines = []
+        used = []
+        remaining = max_tokens
+        for result in results:
+            line = f"- {result['text']}"
+            tokens = count_tokens(line)
+            if tokens > remaining:
+                if remaining >= 32:
+                    lines.append(truncate_to_tokens(line, remaining))
+                    used.append(result)
+                break
+            lines.append(line)
+            used.append(result)
+            remaining -= tokens
+        return "\n".join(lines), used
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size and search latency"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["chunks"] = self._live_rows
+            stats["documents"] = len(self._documents)
+            stats["delta_rows"] = len(self._alive) - self._main_rows
+            stats["last_seq"] = self._last_seq
+        searches = stats["searches"]
+        stats["average_latency_ms"] = stats.pop("total_latency") / searches * 1000 if searches else 0.0
+        stats["max_latency_ms"] = stats.pop("max_latency") * 1000
+        return stats
+
+
+# Create a singleton instance for easy import
+content_index = ContentIndex()
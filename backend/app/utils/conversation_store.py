@@ -0,0 +1,364 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from app.utils.token_budget import count_tokens, token_budget
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH", str(Path(__file__).resolve().parent.parent.parent / "data" / "synapseiq.db"))
+# Conversations kept in memory; older ones are reloaded from SQLite on demand
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "1000"))
+# Conversations idle for longer than this are forgotten
+CONVERSATION_TTL_SECONDS = float(os.getenv("CONVERSATION_TTL_SECONDS", str(24 * 3600)))
+# Recent turns kept verbatim; older ones are folded into the summary
+CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", "12"))
+# Token cap on the rolling summary of folded turns
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "300"))
+# Longer turns are clipped before they are stored
+CONVERSATION_TURN_MAX_CHARS = int(os.getenv("CONVERSATION_TURN_MAX_CHARS", "4000"))
+# Total characters of turns and summaries held in memory, per store
+CONVERSATION_CACHE_MAX_CHARS = int(os.getenv("CONVERSATION_CACHE_MAX_CHARS", "20000000"))
+
+# WhatsApp senders get their own table, cache size, expiry and turn limit;
+# the default expiry matches WhatsApp's 24-hour customer service window
+WHATSAPP_CONVERSATION_CACHE_SIZE = int(os.getenv("WHATSAPP_CONVERSATION_CACHE_SIZE", "5000"))
+WHATSAPP_CONVERSATION_TTL_SECONDS = float(os.getenv("WHATSAPP_CONVERSATION_TTL_SECONDS", str(24 * 3600)))
+WHATSAPP_CONVERSATION_MAX_TURNS = int(os.getenv("WHATSAPP_CONVERSATION_MAX_TURNS", "10"))
+WHATSAPP_CONVERSATION_TURN_MAX_CHARS = int(os.getenv("WHATSAPP_CONVERSATION_TURN_MAX_CHARS", "2000"))
+WHATSAPP_CONVERSATION_CACHE_MAX_CHARS = int(os.getenv("WHATSAPP_CONVERSATION_CACHE_MAX_CHARS", "20000000"))
+
+# How often expired rows are deleted from SQLite
+PURGE_INTERVAL_SECONDS = 600
+SUMMARY_HEADER = "Summary of earlier conversation:"
+
+
+class ConversationStore:
+    """Chat histories keyed by conversation id
+
+    Hot conversations live in an in-memory LRU, bounded both by count and by
+    total characters; every change is written through to SQLite, so evicted or restarted sessions are reloaded from
+    disk. Conversations expire after a period of inactivity. Only the last
+    max_turns turns are kept verbatim: when a conversation grows past that,
+    its oldest turns are folded into a rolling summary (one clipped line per
+    turn, oldest lines dropped first when the summary exceeds its token cap),
+    so stored state and prompt size stay bounded however long a session runs.
+    Turns longer than turn_max_chars are clipped when they are added.
+
+    SQLite is the source of truth: append re-reads the row inside a write
+    transaction, so API processes sharing the database never overwrite each
+    other's turns. The LRU only serves reads, which may briefly miss a turn
+    another process just added.
+
+    Each store has its own table, so stores with different expiry never purge
+    each other's conversations.
+    """
+
+    def __init__(
+        self,
+        db_path: str = CONVERSATION_DB_PATH,
+        capacity: int = CONVERSATION_CACHE_SIZE,
+        ttl_seconds: float = CONVERSATION_TTL_SECONDS,
+        max_turns: int = CONVERSATION_MAX_TURNS,
+        summary_tokens: int = CONVERSATION_SUMMARY_TOKENS,
+        table: str = "conversations",
+        turn_max_chars: int = CONVERSATION_TURN_MAX_CHARS,
+        cache_max_chars: int = CONVERSATION_CACHE_MAX_CHARS
+    ):
+        self.db_path = db_path
+        self.table = table
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.summary_tokens = summary_tokens
+        self.turn_max_chars = turn_max_chars
+        self.cache_max_chars = cache_max_chars
+        self._lock = threading.RLock()
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cached_chars = 0
+        self._last_purge = 0.0
+        self._stats = {"cache_hits": 0, "cache_misses": 0, "expired": 0, "evictions": 0, "summarized_turns": 0}
+
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL DEFAULT '',
+                    turns TEXT NOT NULL DEFAULT '[]',
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                ''')
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_updated_at ON {table} (updated_at)")
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Conversation table not created in {db_path}: {str(e)}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def new_id(self) -> str:
+        """Fresh conversation id"""
+        return str(uuid.uuid4())
+
+    def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Current state of a conversation
+
+        Returns:
+            Copy of {'id', 'summary', 'turns', 'created_at', 'updated_at'}, or
+            None when the id is unknown or has expired
+        """
+        conversation = self._load(conversation_id)
+        if conversation is None:
+            return None
+        return dict(conversation, turns=list(conversation["turns"]))
+
+    def _load(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            conversation = self._cache.get(conversation_id)
+            if conversation is not None:
+                if now - conversation["updated_at"] > self.ttl_seconds:
+                    self._cache_pop(conversation_id)
+                    self._stats["expired"] += 1
+                    return None
+                self._cache.move_to_end(conversation_id)
+                self._stats["cache_hits"] += 1
+                return conversation
+            self._stats["cache_misses"] += 1
+
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    f"SELECT id, summary, turns, created_at, updated_at FROM {self.table} WHERE id = ?",
+                    (conversation_id,)
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Could not load conversation {conversation_id}: {str(e)}")
+            return None
+        if row is None or now - row["updated_at"] > self.ttl_seconds:
+            return None
+
+        conversation = self._from_row(row)
+        with self._lock:
+            self._cache_put(conversation)
+        return conversation
+
+    @staticmethod
+    def _size(conversation: Dict[str, Any]) -> int:
+        """Characters of text held by a conversation"""
+        return len(conversation["summary"]) + sum(len(turn["content"]) for turn in conversation["turns"])
+
+    def _cache_put(self, conversation: Dict[str, Any]):
+        """Insert into the LRU, evicting the least recently used (lock held)"""
+        self._cache_pop(conversation["id"])
+        self._cache[conversation["id"]] = conversation
+        self._cached_chars += self._size(conversation)
+        while len(self._cache) > self.capacity or (self._cached_chars > self.cache_max_chars and len(self._cache) > 1):
+            self._cache_pop(next(iter(self._cache)))
+            self._stats["evictions"] += 1
+
+    def _cache_pop(self, conversation_id: str) -> bool:
+        """Remove from the LRU, keeping the character count (lock held)"""
+        conversation = self._cache.pop(conversation_id, None)
+        if conversation is None:
+            return False
+        self._cached_chars -= self._size(conversation)
+        return True
+
+    def append(self, conversation_id: str, turns: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Add turns to a conversation, creating it if needed, and persist it
+
+        Args:
+            conversation_id: Conversation to extend
+            turns: New {'role', 'content'} turns, oldest first
+
+        Returns:
+            The updated conversation (see get)
+        """
+        now = time.time()
+        new_turns = [
+            {"role": turn["role"], "content": self._clip(turn["content"])}
+            for turn in turns if turn.get("content")
+        ]
+
+        try:
+            conn = self._connect()
+            try:
+                # Take the write lock before reading, so a concurrent append
+                # (from this or another process) can't be lost
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    f"SELECT id, summary, turns, created_at, updated_at FROM {self.table} WHERE id = ?",
+                    (conversation_id,)
+                ).fetchone()
+                conversation = self._from_row(row) if row is not None and now - row["updated_at"] <= self.ttl_seconds else None
+                conversation = self._extend(conversation_id, conversation, new_turns, now)
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (id, summary, turns, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (conversation["id"], conversation["summary"], json.dumps(conversation["turns"], ensure_ascii=False),
+                     conversation["created_at"], conversation["updated_at"])
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Could not save conversation {conversation_id}: {str(e)}")
+            # Keep the conversation going from memory until the database is back
+            with self._lock:
+                cached = self._cache.get(conversation_id)
+                conversation = self._extend(
+                    conversation_id,
+                    dict(cached, turns=list(cached["turns"])) if cached else None,
+                    new_turns,
+                    now
+                )
+
+        with self._lock:
+            cached = self._cache.get(conversation_id)
+            if cached is None or cached["updated_at"] <= conversation["updated_at"]:
+                self._cache_put(conversation)
+        snapshot = dict(conversation, turns=list(conversation["turns"]))
+
+        if now - self._last_purge > PURGE_INTERVAL_SECONDS:
+            self.purge_expired()
+        return snapshot
+
+    def _clip(self, content: str) -> str:
+        if len(content) <= self.turn_max_chars:
+            return content
+        return content[:max(0, self.turn_max_chars - 1)].rstrip() + "…"
+
+    def _from_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "summary": row["summary"],
+            "turns": json.loads(row["turns"]),
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def _extend(
+        self,
+        conversation_id: str,
+        conversation: Optional[Dict[str, Any]],
+        turns: List[Dict[str, str]],
+        now: float
+    ) -> Dict[str, Any]:
+        """Add turns to a conversation (a new one when None), folding old turns into the summary"""
+        conversation = conversation or {
+            "id": conversation_id,
+            "summary": "",
+            "turns": [],
+            "created_at": now,
+        }
+        conversation["turns"].extend(turns)
+        if len(conversation["turns"]) > self.max_turns:
+            with self._lock:
+                self._summarize(conversation)
+        conversation["updated_at"] = now
+        return conversation
+
+    def _summarize(self, conversation: Dict[str, Any]):
+        """Fold the oldest turns into the rolling summary (lock held)"""
+        # Fold down to half the limit so summarizing doesn't run on every turn
+        keep = max(self.max_turns // 2, 1)
+        folded = conversation["turns"][:-keep]
+        conversation["turns"] = conversation["turns"][-keep:]
+
+        lines = [line for line in conversation["summary"].split("\n") if line and line != SUMMARY_HEADER]
+        new_lines = token_budget.condense(folded, self.summary_tokens).split("\n")[1:]
+        lines.extend(new_lines)
+
+        # Oldest lines go first when the summary is over its cap
+        available = self.summary_tokens - count_tokens(SUMMARY_HEADER)
+        kept = []
+        for line in reversed(lines):
+            cost = count_tokens(line) + 1
+            if cost > available:
+                break
+            kept.append(line)
+            available -= cost
+        kept.reverse()
+        conversation["summary"] = "\n".join([SUMMARY_HEADER] + kept) if kept else ""
+        self._stats["summarized_turns"] += len(folded)
+
+    def delete(self, conversation_id: str) -> bool:
+        """Forget a conversation; returns whether it existed"""
+        with self._lock:
+            cached = self._cache_pop(conversation_id)
+        try:
+            conn = self._connect()
+            try:
+                deleted = conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (conversation_id,)).rowcount
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Could not delete conversation {conversation_id}: {str(e)}")
+            return cached
+        return cached or deleted > 0
+
+    def purge_expired(self) -> int:
+        """Delete conversations idle past the TTL; returns how many rows were removed"""
+        now = time.time()
+        self._last_purge = now
+        cutoff = now - self.ttl_seconds
+        with self._lock:
+            for conversation_id in [key for key, value in self._cache.items() if value["updated_at"] < cutoff]:
+                self._cache_pop(conversation_id)
+                self._stats["expired"] += 1
+        try:
+            conn = self._connect()
+            try:
+                removed = conn.execute(f"DELETE FROM {self.table} WHERE updated_at < ?", (cutoff,)).rowcount
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Could not purge expired conversations: {str(e)}")
+            return 0
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache size and hit rate"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached"] = len(self._cache)
+            stats["cached_chars"] = self._cached_chars
+        lookups = stats["cache_hits"] + stats["cache_misses"]
+        stats["cache_hit_rate"] = stats["cache_hits"] / lookups if lookups else 0.0
+        stats["capacity"] = self.capacity
+        stats["cache_max_chars"] = self.cache_max_chars
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+
+# Create singleton instances for easy import
+conversation_store = ConversationStore()
+whatsapp_conversation_store = ConversationStore(
+    capacity=WHATSAPP_CONVERSATION_CACHE_SIZE,
+    ttl_seconds=WHATSAPP_CONVERSATION_TTL_SECONDS,
+    max_turns=WHATSAPP_CONVERSATION_MAX_TURNS,
+    table="whatsapp_conversations",
+    turn_max_chars=WHATSAPP_CONVERSATION_TURN_MAX_CHARS,
+    cache_max_chars=WHATSAPP_CONVERSATION_CACHE_MAX_CHARS
+)
@@ -24,6 +24,8 @@ class EmailSender:
         self.smtp_password = os.getenv("SMTP_PASSWORD", "")
         self.from_email = os.getenv("FROM_EMAIL", "noreply@synapseiq.com")
         self.admin_email = os.getenv("ADMIN_EMAIL", "admin@synapseiq.com")
+        # STARTTLS before login; disable only for local servers without TLS
+        self.use_tls = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
         
         # Check if email is properly configured
         self.is_configured = (
@@ -73,7 +75,8 @@ class EmailSender:
         try:
             # Connect to SMTP server
             server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
+            if self.use_tls:
+                server.starttls()
             server.login(self.smtp_username, self.smtp_password)
             
             # Send email
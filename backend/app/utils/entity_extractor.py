@@ -0,0 +1,188 @@
+import re
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Gazetteer lists ship with the backend in data/gazetteer
+GAZETTEER_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "gazetteer"
+
+# Words, keeping internal apostrophes ("Nando's", "d'Ivoire")
+TOKEN_PATTERN = re.compile(r"\w+(?:['’]\w+)*")
+
+# Marks the end of an entry in the token trie
+TERMINAL = ""
+
+# Weight of mention frequency (vs. position of the first mention) in relevance
+FREQUENCY_WEIGHT = 0.7
+
+
+class EntityExtractor:
+    """Gazetteer-based named entity matcher
+
+    Every entry (companies, places, people) is split into word tokens and
+    inserted into one token-level trie. Extraction walks the trie from each
+    token of the text and keeps the longest entry that ends there, so
+    "Standard Bank" beats "Standard" and "Guinea-Bissau" beats "Guinea",
+    then resumes after the match. Adjacent name parts ("Kwame" "Mensah")
+    are merged into a single PERSON span, and a known surname takes the
+    capitalised word before it as a given name ("John Kamau").
+    """
+
+    def __init__(self, gazetteer_dir: Path = GAZETTEER_DIR):
+        self._lock = threading.Lock()
+        self.gazetteer_dir = gazetteer_dir
+        self.load(gazetteer_dir)
+
+    def load(self, gazetteer_dir: Path):
+        """Build the trie from the sources listed in gazetteer.json"""
+        with open(gazetteer_dir / "gazetteer.json", encoding="utf-8") as f:
+            config = json.load(f)
+
+        trie: Dict[str, Any] = {}
+        entries = 0
+        for source in config.get("sources", []):
+            path = gazetteer_dir / source["file"]
+            try:
+                with open(path, encoding="utf-8") as f:
+                    lines = f.read().splitlines()
+            except OSError as e:
+                logger.error(f"Could not load gazetteer source {path}: {str(e)}")
+                continue
+            for line in lines:
+                entry = line.strip()
+                if entry and not entry.startswith("#"):
+                    if self._insert(
+                        trie,
+                        entry,
+                        source["type"],
+                        bool(source.get("case_sensitive", False)),
+                        bool(source.get("takes_given_name", False))
+                    ):
+                        entries += 1
+
+        with self._lock:
+            self._trie = trie
+            self.merge_adjacent = set(config.get("merge_adjacent", []))
+            self.not_given_names = {word.casefold() for word in config.get("not_given_names", [])}
+        logger.info(f"Gazetteer loaded: {entries} entries from {gazetteer_dir}")
+
+    def _insert(
+        self,
+        trie: Dict[str, Any],
+        entry: str,
+        entity_type: str,
+        case_sensitive: bool,
+        takes_given_name: bool = False
+    ) -> bool:
+        """Add one entry; the first source to list a phrase keeps it"""
+        tokens = TOKEN_PATTERN.findall(entry.casefold())
+        if not tokens:
+            return False
+        node = trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if TERMINAL in node:
+            return False
+        node[TERMINAL] = (entity_type, case_sensitive, takes_given_name)
+        return True
+
+    def add_entries(self, entries: List[str], entity_type: str, case_sensitive: bool = False, takes_given_name: bool = False):
+        """Add entries at runtime (e.g. newly registered client companies)"""
+        with self._lock:
+            for entry in entries:
+                self._insert(self._trie, entry, entity_type, case_sensitive, takes_given_name)
+
+    def extract(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Find gazetteer entities in a text
+
+        Returns:
+            List of entities in text order, each with 'text', 'type', 'start'
+            and 'end' (character offsets into the original text), and
+            'relevance' (0-1) from how often the entity is mentioned and how
+            early it first appears
+        """
+        if not text:
+            return []
+
+        trie = self._trie
+        matches = list(TOKEN_PATTERN.finditer(text))
+        folded = [match.group(0).casefold() for match in matches]
+        entities: List[Dict[str, Any]] = []
+        position = 0
+        count = len(matches)
+        while position < count:
+            node = trie
+            capitalized = True
+            longest = None
+            cursor = position
+            while cursor < count:
+                node = node.get(folded[cursor])
+                if node is None:
+                    break
+                capitalized = capitalized and matches[cursor].group(0)[:1].isupper()
+                terminal = node.get(TERMINAL)
+                if terminal is not None and (capitalized or not terminal[1]):
+                    longest = (cursor, terminal[0], terminal[2])
+                cursor += 1
+
+            if longest is None:
+                position += 1
+                continue
+
+            last, entity_type, takes_given_name = longest
+            start, end = matches[position].start(), matches[last].end()
+            previous = entities[-1] if entities else None
+            if takes_given_name and position > 0 and (previous is None or previous["end"] <= matches[position - 1].start()):
+                given = matches[position - 1]
+                word = given.group(0)
+                if (
+                    word[:1].isupper()
+                    and not word.isupper()
+                    and word.isalpha()
+                    and folded[position - 1] not in self.not_given_names
+                    and not text[given.end():start].strip()
+                ):
+                    start = given.start()
+            if (
+                previous is not None
+                and previous["type"] == entity_type
+                and entity_type in self.merge_adjacent
+                and not text[previous["end"]:start].strip()
+            ):
+                previous["end"] = end
+                previous["text"] = text[previous["start"]:end]
+            else:
+                entities.append({"text": text[start:end], "type": entity_type, "start": start, "end": end})
+            position = last + 1
+
+        self._score(entities, len(text))
+        return entities
+
+    def _score(self, entities: List[Dict[str, Any]], text_length: int):
+        """Set each entity's relevance from its mention count and first position"""
+        mentions: Dict[str, int] = {}
+        first_seen: Dict[str, int] = {}
+        for entity in entities:
+            key = entity["text"].casefold()
+            mentions[key] = mentions.get(key, 0) + 1
+            first_seen.setdefault(key, entity["start"])
+        most = max(mentions.values(), default=1)
+        for entity in entities:
+            key = entity["text"].casefold()
+            earliness = 1.0 - first_seen[key] / max(1, text_length)
+            entity["relevance"] = round(
+                FREQUENCY_WEIGHT * mentions[key] / most + (1 - FREQUENCY_WEIGHT) * earliness, 4
+            )
+
+    def extract_batch(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """Entities for each text in a batch"""
+        return [self.extract(text) for text in texts]
+
+
+# Create a singleton instance for easy import
+entity_extractor = EntityExtractor()
@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.utils.keyword_extractor import keyword_extractor
+
+# scikit-learn builds the TF-IDF index; without it every lookup is a miss
+SKLEARN_AVAILABLE = True
+try:
+    from scipy.sparse import hstack
+    from sklearn.feature_extraction.text import TfidfVectorizer
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Curated questions and answers ship with the backend in data/faq.json
+FAQ_PATH = Path(os.getenv("FAQ_PATH", str(Path(__file__).resolve().parent.parent.parent / "data" / "faq.json")))
+# Cosine similarity a question must reach to be answered from the FAQ
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.5"))
+
+# Word and character n-gram spaces are weighted equally in the combined vector
+SPACE_WEIGHT = np.sqrt(0.5)
+
+
+class FAQRetriever:
+    """Nearest-neighbour FAQ lookup over a TF-IDF index
+
+    Every question and alternate phrasing is a row of a sparse matrix that
+    concatenates word 1-2 gram and character 3-5 gram TF-IDF vectors (the
+    character grams tolerate typos and word-form changes). Rows are unit
+    length, so a query's cosine similarity to every row is one sparse
+    matrix-vector product. Reloading builds a new index and swaps it in, so
+    lookups never see a half-built one.
+
+    Without a file (faq_path=None) the index starts empty and is filled with
+    load_entries, e.g. from a database table.
+    """
+
+    def __init__(self, faq_path: Optional[Path] = FAQ_PATH, threshold: float = FAQ_MATCH_THRESHOLD, name: str = "FAQ"):
+        self.faq_path = faq_path
+        self.threshold = threshold
+        self.name = name
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Any]] = None
+        self._stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0,
+        }
+        if faq_path is not None:
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"{self.name} index not loaded: {str(e)}")
+
+    def reload(self, faq_path: Optional[Path] = None) -> Dict[str, Any]:
+        """
+        Rebuild the index from the FAQ file
+
+        Raises:
+            RuntimeError: If scikit-learn is not installed
+            OSError, ValueError: If the file can't be read or has no questions;
+                the current index stays in place
+        """
+        faq_path = faq_path or self.faq_path
+        with open(faq_path, encoding="utf-8") as f:
+            entries = json.load(f).get("entries", [])
+        result = self.load_entries(entries, source=str(faq_path))
+        self.faq_path = faq_path
+        return result
+
+    def load_entries(self, entries: List[Dict[str, Any]], source: str = "entries") -> Dict[str, Any]:
+        """
+        Rebuild the index from entries shaped like those in faq.json
+        ('id', 'question', 'alternates', 'answer', 'language')
+
+        Raises:
+            RuntimeError: If scikit-learn is not installed
+            ValueError: If no entry has a question and an answer; the current
+                index stays in place
+        """
+        if not SKLEARN_AVAILABLE:
+            raise RuntimeError(f"scikit-learn is required for the {self.name} index")
+
+        questions = []
+        row_entries = []
+        row_languages = []
+        for position, entry in enumerate(entries):
+            if not entry.get("answer"):
+                continue
+            for question in [entry.get("question", "")] + list(entry.get("alternates", [])):
+                if question.strip():
+                    questions.append(question)
+                    row_entries.append(position)
+                    row_languages.append(entry.get("language", "en"))
+        if not questions:
+            raise ValueError(f"No questions with answers in {source}")
+
+        word_vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, strip_accents="unicode")
+        char_vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True, strip_accents="unicode")
+        content = [self._content(question) for question in questions]
+        matrix = hstack([
+            word_vectorizer.fit_transform(content) * SPACE_WEIGHT,
+            char_vectorizer.fit_transform(content) * SPACE_WEIGHT,
+        ]).tocsr()
+
+        index = {
+            "entries": entries,
+            "word_vectorizer": word_vectorizer,
+            "char_vectorizer": char_vectorizer,
+            "matrix": matrix,
+            "row_entries": np.array(row_entries, dtype=np.int64),
+            "row_languages": np.array(row_languages),
+            "reloaded_at": datetime.now().isoformat(),
+        }
+        with self._lock:
+            self._index = index
+        logger.info(f"{self.name} index built: {len(entries)} entries, {len(questions)} questions from {source}")
+        return {"entries": len(entries), "questions": len(questions), "reloaded_at": index["reloaded_at"]}
+
+    def clear(self):
+        """Drop the index; every lookup misses until the next load"""
+        with self._lock:
+            self._index = None
+
+    def _content(self, text: str) -> str:
+        """Text reduced to its content words; function words ("how", "do you") match everything"""
+        return " ".join(keyword_extractor.words(text))
+
+    def search(self, text: str, language: Optional[str] = None, top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Closest FAQ entries to a message, best first (no threshold applied)
+
+        Args:
+            text: Visitor message
+            language: Only consider entries in this language (all when None)
+            top_k: Number of entries to return
+        """
+        index = self._index
+        if index is None or not text or not text.strip():
+            return []
+
+        content = [self._content(text)]
+        query = hstack([
+            index["word_vectorizer"].transform(content) * SPACE_WEIGHT,
+            index["char_vectorizer"].transform(content) * SPACE_WEIGHT,
+        ]).tocsr()
+        similarities = (index["matrix"] @ query.T).toarray().ravel()
+        if language is not None:
+            similarities = np.where(index["row_languages"] == language, similarities, 0.0)
+
+        # Best-scoring phrasing per entry
+        best = np.zeros(len(index["entries"]))
+        np.maximum.at(best, index["row_entries"], similarities)
+        results = []
+        for position in np.argsort(-best)[:top_k]:
+            score = float(best[position])
+            if score <= 0:
+                break
+            entry = index["entries"][position]
+            results.append({
+                "id": entry.get("id", str(position)),
+                "question": entry.get("question"),
+                "answer": entry["answer"],
+                "language": entry.get("language", "en"),
+                "score": round(score, 4),
+            })
+        return results
+
+    def lookup(self, text: str, language: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Answer a message from the FAQ when it is close enough to a known question
+
+        Returns:
+            The best entry ('id', 'question', 'answer', 'language', 'score') if
+            its similarity reaches the threshold, otherwise None
+        """
+        start = time.perf_counter()
+        candidates = self.search(text, language=language, top_k=1)
+        match = candidates[0] if candidates and candidates[0]["score"] >= self.threshold else None
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats["hits" if match else "misses"] += 1
+            self._stats["total_latency"] += elapsed
+            self._stats["max_latency"] = max(self._stats["max_latency"], elapsed)
+        return match
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate, lookup latency and index size"""
+        with self._lock:
+            stats = dict(self._stats)
+            index = self._index
+        lookups = stats["lookups"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["average_latency_ms"] = stats["total_latency"] / lookups * 1000 if lookups else 0.0
+        stats["max_latency_ms"] = stats.pop("max_latency") * 1000
+        stats.pop("total_latency")
+        stats["threshold"] = self.threshold
+        stats["entries"] = len(index["entries"]) if index else 0
+        stats["questions"] = index["matrix"].shape[0] if index else 0
+        stats["reloaded_at"] = index["reloaded_at"] if index else None
+        return stats
+
+
+# Create a singleton instance for easy import
+faq_retriever = FAQRetriever()
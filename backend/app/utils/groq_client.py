@@ -1,187 +1,226 @@
 import os
+import json
 import logging
-import random
+import re
 import time
-from typing import List, Dict, Optional, Union, Any
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any
 from dotenv import load_dotenv
 
-# Import Groq for AI capabilities
-GROQ_AVAILABLE = True
-try:
-    from groq import Groq
-except ImportError:
-    GROQ_AVAILABLE = False
+from app.utils.entity_extractor import entity_extractor
+from app.utils.intent_engine import intent_engine
+from app.utils.keyword_extractor import keyword_extractor
+from app.utils.language_id import language_name
+from app.utils.llm_metrics import fallback_reason, llm_metrics
+from app.utils.llm_pool import llm_pool
+from app.utils.model_router import ModelRouter
+from app.utils.rate_limiter import ModelRateLimiter
+from app.utils.retry import groq_retry_policy, time_remaining
+from app.utils.sentiment_engine import sentiment_engine
+from app.utils.singleflight import SingleFlight
+from app.utils.token_budget import count_tokens, token_budget
 
 # Load environment variables
 load_dotenv()
 
-# Get API key from environment
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+logger = logging.getLogger(__name__)
+
+# Prompt fragments describing the JSON fields expected for each analysis type
+ANALYSIS_INSTRUCTIONS = {
+    "sentiment": "'sentiment' (positive, negative, or neutral) and 'confidence' (0-1)",
+    "entities": "'entities' as a list of objects with 'text', 'type', and 'relevance'",
+    "keywords": "'keywords' as a list of objects with 'text' and 'relevance'",
+}
+
+# Rough completion size per packed item, used to size max_completion_tokens for batches
+BATCH_OUTPUT_TOKENS_PER_ITEM = {
+    "sentiment": 24,
+    "entities": 96,
+    "keywords": 80,
+}
+
+# Segments of a batch translation are wrapped in these tags so they can be matched
+# back to their keys; the tags are plain text that models copy reliably
+SEGMENT_PATTERN = re.compile(r'<seg id="(\d+)">(.*?)</seg>', re.DOTALL)
+
+# Translations run longer than their source in many African languages; completion
+# caps for batch translations allow this many output tokens per input token
+TRANSLATION_EXPANSION = 3
 
 class GroqAIClient:
     """Client for interacting with Groq AI API with fallback mechanisms"""
     
     def __init__(self):
         """Initialize the Groq AI client with fallback capabilities"""
-        self.api_key = os.getenv("GROQ_API_KEY")
-        self.api_available = False
+        # Per-operation routing table (model, max_tokens, timeout, fallback models)
+        self.model_router = ModelRouter()
         
-        # Default models
-        self.chat_model = "meta-llama/llama-guard-4-12b"  # Default chat model
-        self.analysis_model = "meta-llama/llama-guard-4-12b"  # Default analysis model
-        self.translation_model = "meta-llama/llama-guard-4-12b"  # Default translation model
+        # Default models (primary model of each route)
+        self.chat_model = self.model_router.model_for("chat")
+        self.analysis_model = self.model_router.model_for("analysis")
+        self.translation_model = self.model_router.model_for("translation")
         
-        # Initialize client if possible
-        if GROQ_AVAILABLE and self.api_key:
-            try:
-                self.client = Groq(api_key=self.api_key)
-                # Test the API with a simple request
+        # Transient upstream failures are retried with backoff inside the caller's deadline
+        self.retry_policy = groq_retry_policy
+        
+        # Identical concurrent chat requests share one upstream call
+        self.chat_singleflight = SingleFlight()
+        
+        # Client-side requests/min and tokens/min quota, queued per model
+        self.rate_limiter = ModelRateLimiter()
+        
+        # Configured backends (Groq keys, OpenAI-compatible endpoints), picked by
+        # health and latency with failover between them
+        self.pool = llm_pool
+        if self.pool.backends:
+            if os.getenv("LLM_STARTUP_PROBE", "true").lower() == "true":
                 self._test_api_connection()
-            except Exception as e:
-                print(f"Failed to initialize Groq client: {str(e)}")
-                self.client = None
         else:
-            logging.error("Groq package not available or API key not set. Using fallback responses.")
-            self.client = None
+            logger.error("No LLM backend configured (set GROQ_API_KEY or LLM_BACKENDS). Using fallback responses.")
+    
+    @property
+    def api_available(self) -> bool:
+        """Whether any backend is in rotation (backends that keep failing sit out a cooldown)"""
+        return self.pool.available()
     
     def _test_api_connection(self):
-        """Test the API connection with a minimal request"""
-        self.groq_available = False
-        try:
-            # Try a simple API call to check if the key is valid
-            response = self.client.chat.completions.create(
-                model=self.chat_model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": "Hello"}
-                ],
-                max_tokens=5
-            )
-            self.groq_available = True
-            logging.info("Groq API connection successful")
-        except Exception as e:
-            error_message = str(e)
-            if "401" in error_message and "Invalid API Key" in error_message:
-                logging.error(f"Groq API key validation failed: The API key appears to be invalid or expired. Please check your API key in the .env file.")
-                # Get API key from environment
-                api_key = os.getenv("GROQ_API_KEY", "")
-                if api_key:
-                    logging.error(f"API Key format: {api_key[:8]}...{api_key[-4:] if len(api_key) > 12 else ''}")
-                else:
-                    logging.error("API Key not found in environment variables")
+        """Test every backend with a minimal request; failing ones sit out a cooldown"""
+        for name, error in self.pool.probe(self.chat_model).items():
+            if error is None:
+                logger.info(f"LLM backend {name} connection successful")
+                continue
+            error_message = str(error)
+            if "401" in error_message:
+                logger.error(f"LLM backend {name}: the API key appears to be invalid or expired. Please check your API key in the .env file.")
             elif "404" in error_message:
-                logging.error(f"Groq API endpoint not found. The API endpoint might have changed.")
+                logger.error(f"LLM backend {name}: API endpoint or model {self.chat_model} not found.")
             elif "429" in error_message:
-                logging.error(f"Groq API rate limit exceeded. Please try again later.")
+                logger.error(f"LLM backend {name}: rate limit exceeded. Please try again later.")
             else:
-                logging.error(f"Groq API connection failed: {error_message}.")
-                
-            logging.info("Using fallback responses for all AI operations.")
-            self.groq_available = False
+                logger.error(f"LLM backend {name} connection failed: {error_message}.")
+        
+        if not self.api_available:
+            logger.info("No LLM backend reachable; using fallback responses until one recovers.")
     
     def chat_completion(
         self, 
         messages: List[Dict[str, str]], 
         model: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: int = 1024,
-        stream: bool = False
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        deadline: Optional[float] = None,
+        fallback: bool = True
     ):
         """
         Generate a chat completion using Groq API with fallback responses
         
         Args:
             messages: List of message dictionaries with 'role' and 'content'
-            model: Model to use (defaults to self.chat_model)
+            model: Model to use (defaults to the "chat" route and its fallbacks)
             temperature: Sampling temperature
-            max_tokens: Maximum tokens to generate
+            max_tokens: Maximum tokens to generate (defaults to the route's cap)
             stream: Whether to stream the response
+            deadline: time.monotonic() value by which the call must have started;
+                requests that would queue longer for quota use the fallback instead
+            fallback: Return a canned response when the API fails; when False
+                the error is raised so callers can tell model answers apart
             
         Returns:
             Chat completion response or fallback response if API fails
         """
-        # Define fallback responses for different topics
-        fallback_responses = {
-            "services": [
-                "SynapseIQ offers AI solutions tailored for African businesses, including NLP for local languages, predictive analytics, and custom chatbots.",
-                "Our AI services include natural language processing for African languages, predictive analytics for business intelligence, and custom chatbot development.",
-                "We specialize in AI solutions designed specifically for the African market, including language processing, data analytics, and intelligent automation."
-            ],
-            "pricing": [
-                "Our pricing is customized based on your business needs. We offer flexible packages starting from $500 for small businesses.",
-                "SynapseIQ provides tailored pricing models based on your specific requirements. Our starter packages begin at $500 for small businesses.",
-                "We believe in making AI accessible to African businesses of all sizes. Our pricing is flexible and starts from $500 for small businesses."
-            ],
-            "contact": [
-                "I'd be happy to connect you with our team for a demo. Please provide your email or contact us via WhatsApp at +265996873573.",
-                "You can reach our team via WhatsApp at +265996873573 or email us at info@synapseiq.com to schedule a demo.",
-                "For a personalized demonstration of our AI solutions, please contact us via WhatsApp at +265996873573 or through our website contact form."
-            ],
-            "default": [
-                "Thank you for your interest in SynapseIQ. Our AI team specializes in creating custom solutions for African businesses. How can I assist you today?",
-                "Welcome to SynapseIQ! We're focused on bringing cutting-edge AI solutions to African businesses. What specific information are you looking for?",
-                "SynapseIQ is dedicated to empowering African businesses with AI technology. How can we help your business today?"
-            ]
-        }
-        
         # If streaming is requested but API is not available, we can't provide a stream
         if stream and not self.api_available:
-            print("Streaming requested but API not available. Returning None.")
+            logger.warning("Streaming requested but no LLM backend is available. Returning None.")
+            llm_metrics.record_fallback("chat_stream", "unavailable")
             return None
         
         # Try to use the API if it's available
-        if self.client and self.api_available:
+        if self.api_available:
             try:
-                print(f"Attempting Groq API call with model: {model or self.chat_model}")
-                
-                completion = self.client.chat.completions.create(
-                    model=model or self.chat_model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_completion_tokens=max_tokens,
-                    top_p=1,
-                    stream=stream,
-                    stop=None,
-                )
-                
-                print("Groq API call successful!")
-                
                 if stream:
+                    route = self.model_router.route("chat", token_budget.count_message_tokens(messages))
+                    stream_model = model or route["models"][0]
+                    stream_max_tokens = max_tokens or route["max_tokens"]
+                    
+                    attempts = 0
+                    
+                    def open_stream(timeout):
+                        nonlocal attempts
+                        attempts += 1
+                        self.rate_limiter.acquire(
+                            stream_model,
+                            token_budget.count_message_tokens(messages) + stream_max_tokens,
+                            deadline
+                        )
+                        return self.pool.create_completion(
+                            model=stream_model,
+                            messages=messages,
+                            temperature=temperature,
+                            max_completion_tokens=stream_max_tokens,
+                            top_p=1,
+                            stream=True,
+                            stop=None,
+                            timeout=timeout
+                        )
+                    
+                    # Only opening the stream is retried; a broken stream is the caller's to handle.
+                    # The recorded latency is the time to open the stream.
+                    start_time = time.monotonic()
+                    try:
+                        completion = self.retry_policy.call(open_stream, deadline, "Groq chat stream")
+                    except Exception as e:
+                        llm_metrics.record_call("chat_stream", stream_model, time.monotonic() - start_time, False, retries=attempts - 1, error=e)
+                        raise
+                    llm_metrics.record_call("chat_stream", stream_model, time.monotonic() - start_time, True, retries=attempts - 1)
                     return completion  # Return the stream object
-                else:
-                    return completion.choices[0].message.content
+                
+                # Concurrent duplicates wait for the in-flight call instead of issuing their own
+                request_key = self._request_key(messages, model or "route:chat", temperature, max_tokens)
+                response = self.chat_singleflight.do(
+                    request_key,
+                    lambda: self._complete_routed(
+                        "chat",
+                        messages=messages,
+                        temperature=temperature,
+                        deadline=deadline,
+                        model=model,
+                        max_tokens=max_tokens
+                    ),
+                    timeout=max(0.0, deadline - time.monotonic()) if deadline else None
+                )
+                return response
                     
             except Exception as e:
-                print(f"Error in chat completion: {str(e)}")
+                logger.warning(f"Error in chat completion: {str(e)}")
+                if not fallback:
+                    raise
                 # Continue to fallback responses
+                llm_metrics.record_fallback("chat_stream" if stream else "chat", fallback_reason(e))
         else:
-            print("Groq API not available. Using fallback responses.")
+            if not fallback:
+                raise RuntimeError("Groq API not available")
+            logger.warning("No LLM backend available. Using fallback responses.")
+            llm_metrics.record_fallback("chat", "unavailable")
         
         # Extract the last user message to determine the appropriate fallback response
         last_message = ""
         for msg in reversed(messages):
             if msg.get("role") == "user":
-                last_message = msg.get("content", "").lower()
+                last_message = msg.get("content", "")
                 break
         
-        # Select an appropriate fallback response category
-        response_category = "default"
-        if any(keyword in last_message for keyword in ["services", "offer", "provide", "what do you do"]):
-            response_category = "services"
-        elif any(keyword in last_message for keyword in ["pricing", "cost", "price", "package", "how much"]):
-            response_category = "pricing"
-        elif any(keyword in last_message for keyword in ["contact", "demo", "reach", "call", "email", "phone"]):
-            response_category = "contact"
-        
-        # Return a random response from the selected category
-        import random
-        return random.choice(fallback_responses[response_category])
+        # Return a canned response for the detected intent
+        return intent_engine.respond(last_message)["response"]
     
     def analyze_text(
         self,
         text: str,
         analysis_type: str = "sentiment",
-        model: Optional[str] = None
+        model: Optional[str] = None,
+        deadline: Optional[float] = None,
+        language: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Analyze text using Groq AI with fallback responses
@@ -189,86 +228,358 @@ class GroqAIClient:
         Args:
             text: Text to analyze
             analysis_type: Type of analysis (sentiment, entities, keywords)
-            model: Model to use (defaults to self.analysis_model)
+            model: Model to use (defaults to the route for analysis_type)
+            deadline: time.monotonic() value by which the call must have started
+            language: Detected language code of the text, used for the prompt and route
             
         Returns:
             Dictionary with analysis results
         """
         # Create prompt based on analysis type
         if analysis_type == "sentiment":
-            prompt = f"Analyze the sentiment of the following text. Return a JSON with 'sentiment' (positive, negative, or neutral) and 'confidence' (0-1). Text: {text}"
-            fallback = {"sentiment": "neutral", "confidence": 0.7}
+            prompt = f"Analyze the sentiment of the following text. Return a JSON with {ANALYSIS_INSTRUCTIONS['sentiment']}. Text: {text}"
         elif analysis_type == "entities":
-            prompt = f"Extract named entities from the following text. Return a JSON with 'entities' as a list of objects with 'text', 'type', and 'relevance'. Text: {text}"
-            fallback = {"entities": []}
+            prompt = f"Extract named entities from the following text. Return a JSON with {ANALYSIS_INSTRUCTIONS['entities']}. Text: {text}"
         elif analysis_type == "keywords":
-            prompt = f"Extract keywords from the following text. Return a JSON with 'keywords' as a list of objects with 'text' and 'relevance'. Text: {text}"
-            fallback = {"keywords": []}
+            prompt = f"Extract keywords from the following text. Return a JSON with {ANALYSIS_INSTRUCTIONS['keywords']}. Text: {text}"
         else:
             prompt = f"Analyze the following text and provide insights. Return a JSON with your analysis. Text: {text}"
-            fallback = {"analysis": "Analysis not available"}
+        if language and language != "en":
+            prompt = f"The text is written in {language_name(language)}. {prompt}"
+        
+        operation = analysis_type if analysis_type in ANALYSIS_INSTRUCTIONS else "analysis"
         
         # Try to use the API if it's available
-        if self.client and self.api_available:
+        if self.api_available:
             try:
-                result = self.client.chat.completions.create(
-                    model=model or self.analysis_model,
+                response_text = self._complete_routed(
+                    operation,
                     messages=[
                         {"role": "system", "content": "You are an AI assistant that analyzes text and returns JSON results."},
                         {"role": "user", "content": prompt}
                     ],
                     temperature=0.1,  # Low temperature for more deterministic results
-                    max_completion_tokens=500,
-                    stream=False
+                    deadline=deadline,
+                    model=model,
+                    language=language
                 )
                 
-                # Parse JSON response
-                import json
-                response_text = result.choices[0].message.content
-                
-                # Extract JSON part if there's any text around it
-                import re
-                json_match = re.search(r'\{[\s\S]*\}', response_text)
-                if json_match:
-                    response_text = json_match.group(0)
-                    
-                try:
-                    return json.loads(response_text)
-                except json.JSONDecodeError:
-                    return {"error": "Failed to parse JSON response", "raw_response": response_text}
+                parsed = self._extract_json(response_text)
+                if parsed is not None:
+                    return parsed
+                llm_metrics.record_fallback(operation, "invalid_json")
+                return {"error": "Failed to parse JSON response", "raw_response": response_text}
                     
             except Exception as e:
-                print(f"Error in text analysis: {str(e)}")
+                logger.warning(f"Error in text analysis: {str(e)}")
                 # Continue to fallback response
+                llm_metrics.record_fallback(operation, fallback_reason(e))
         else:
-            print("Groq API not available for text analysis. Using fallback response.")
+            logger.warning("No LLM backend available for text analysis. Using fallback response.")
+            llm_metrics.record_fallback(operation, "unavailable")
             
-        # Generate a simple fallback response based on the text
-        # For sentiment analysis, try to determine sentiment based on keywords
-        if analysis_type == "sentiment":
-            # Very basic sentiment analysis based on keywords
-            positive_words = ["good", "great", "excellent", "amazing", "wonderful", "happy", "positive"]
-            negative_words = ["bad", "terrible", "awful", "horrible", "sad", "negative", "poor"]
+        return self._fallback_analysis(text, analysis_type)
+    
+    def pack_texts(
+        self,
+        texts: List[str],
+        token_budget: int = 2000,
+        max_items: int = 50
+    ) -> List[List[int]]:
+        """
+        Group texts into packs that each fit a single analysis prompt
+        
+        Args:
+            texts: Texts to pack
+            token_budget: Approximate input token budget per pack
+            max_items: Maximum number of texts per pack
             
-            text_lower = text.lower()
-            positive_count = sum(1 for word in positive_words if word in text_lower)
-            negative_count = sum(1 for word in negative_words if word in text_lower)
+        Returns:
+            List of packs, each a list of indices into texts (in order)
+        """
+        packs = []
+        current = []
+        current_tokens = 0
+        for index, text in enumerate(texts):
+            # Per-item overhead covers the "[n] " marker and line break
+            tokens = self.estimate_tokens(text) + 4
+            if current and (current_tokens + tokens > token_budget or len(current) >= max_items):
+                packs.append(current)
+                current = []
+                current_tokens = 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            packs.append(current)
+        return packs
+    
+    def analyze_text_pack(
+        self,
+        items: List[tuple],
+        analysis_type: str = "sentiment",
+        model: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Analyze several texts with one multi-item prompt
+        
+        Args:
+            items: List of (index, text) tuples; index is echoed back in the result
+            analysis_type: Type of analysis (sentiment, entities, keywords)
+            model: Model to use (defaults to the "batch_analysis" route)
+            deadline: time.monotonic() value by which the call must have started
             
-            if positive_count > negative_count:
-                return {"sentiment": "positive", "confidence": 0.6, "note": "Fallback analysis"}
-            elif negative_count > positive_count:
-                return {"sentiment": "negative", "confidence": 0.6, "note": "Fallback analysis"}
+        Returns:
+            Dictionary mapping each index to its analysis result. Items the model
+            skipped or mangled get the local fallback analysis instead.
+        """
+        results = {}
+        
+        if self.api_available and analysis_type in ANALYSIS_INSTRUCTIONS:
+            # Number items locally so the model only has to echo small integers
+            numbered = "\n".join(
+                f"[{position}] {' '.join(text.split())}" for position, (_, text) in enumerate(items)
+            )
+            prompt = (
+                f"Analyze the {analysis_type} of each numbered text below independently. "
+                f"Return a JSON object with a 'results' list containing one object per text, "
+                f"each with 'index' (the number in brackets) and {ANALYSIS_INSTRUCTIONS[analysis_type]}.\n\n"
+                f"{numbered}"
+            )
+            max_tokens = min(
+                self.model_router.route("batch_analysis")["max_tokens"],
+                64 + BATCH_OUTPUT_TOKENS_PER_ITEM[analysis_type] * len(items)
+            )
             
-        # Return the fallback response with a note
-        fallback["note"] = "Fallback analysis due to API unavailability"
-        return fallback
+            try:
+                response_text = self._complete_routed(
+                    "batch_analysis",
+                    messages=[
+                        {"role": "system", "content": "You are an AI assistant that analyzes text and returns JSON results."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.1,
+                    deadline=deadline,
+                    model=model,
+                    max_tokens=max_tokens
+                )
+                
+                parsed = self._extract_json(response_text)
+                entries = parsed.get("results", []) if isinstance(parsed, dict) else []
+                for entry in entries:
+                    if not isinstance(entry, dict):
+                        continue
+                    try:
+                        position = int(entry.pop("index"))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    if 0 <= position < len(items):
+                        results[items[position][0]] = entry
+            except Exception as e:
+                logger.warning(f"Error in batch text analysis: {str(e)}")
+                reason = fallback_reason(e)
+            else:
+                reason = "missing_items"
+        else:
+            reason = "unavailable" if not self.api_available else "unsupported_analysis"
+        
+        # Fill in anything the model did not return
+        missing = [(index, text) for index, text in items if index not in results]
+        if missing:
+            llm_metrics.record_fallback("batch_analysis", reason, len(missing))
+            for index, result in self.analyze_text_local(missing, analysis_type).items():
+                result["note"] = "Fallback analysis due to API unavailability"
+                results[index] = result
+        
+        return results
+    
+    def estimate_tokens(self, text: str) -> int:
+        """Token count for text, using the shared cached encoder"""
+        return count_tokens(text)
+    
+    def _complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        deadline: Optional[float] = None,
+        operation: str = "chat",
+        fallback: bool = False
+    ) -> str:
+        """
+        Run a single non-streaming completion and return the message content
+        
+        Each attempt takes rate-limit quota and uses the time left before the
+        deadline as its request timeout; transient failures are retried. The
+        call is recorded against the operation's route metrics and in the call
+        instrumentation (latency histogram, tokens, retries).
+        """
+        # Reserve quota for the worst case (full completion) and refund the unused part
+        reserved_tokens = token_budget.count_message_tokens(messages) + max_tokens
+        attempts = 0
+        
+        def attempt(timeout):
+            nonlocal attempts
+            attempts += 1
+            self.rate_limiter.acquire(model, reserved_tokens, deadline)
+            return self.pool.create_completion(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_completion_tokens=max_tokens,
+                stream=False,
+                timeout=timeout
+            )
+        
+        start_time = time.monotonic()
+        try:
+            completion = self.retry_policy.call(attempt, deadline, f"Groq completion ({model})")
+        except Exception as e:
+            latency = time.monotonic() - start_time
+            self.model_router.record(operation, model, latency, success=False, fallback=fallback)
+            llm_metrics.record_call(operation, model, latency, False, retries=attempts - 1, error=e)
+            raise
+        
+        latency = time.monotonic() - start_time
+        usage = getattr(completion, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        self.model_router.record(
+            operation,
+            model,
+            latency,
+            success=True,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            fallback=fallback
+        )
+        llm_metrics.record_call(operation, model, latency, True, prompt_tokens, completion_tokens, retries=attempts - 1)
+        self.rate_limiter.settle(model, reserved_tokens, getattr(usage, "total_tokens", None))
+        return completion.choices[0].message.content
+    
+    def _complete_routed(
+        self,
+        operation: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        deadline: Optional[float] = None,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        language: Optional[str] = None
+    ) -> str:
+        """
+        Run a completion on the route configured for an operation
+        
+        The route picks the model (smaller models for short inputs in languages
+        they handle well), completion cap and time budget. If a model fails, its
+        fallback models are tried in order, each within the route timeout and
+        the caller's deadline. An explicit model bypasses routing.
+        """
+        route = self.model_router.route(operation, token_budget.count_message_tokens(messages), language=language)
+        models = [model] if model else route["models"]
+        max_tokens = max_tokens or route["max_tokens"]
+        
+        last_error = None
+        for position, candidate in enumerate(models):
+            model_deadline = time.monotonic() + route["timeout"]
+            if deadline is not None:
+                model_deadline = min(model_deadline, deadline)
+            if model_deadline <= time.monotonic():
+                break
+            try:
+                return self._complete(
+                    messages=messages,
+                    model=candidate,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    deadline=model_deadline,
+                    operation=route["operation"],
+                    fallback=position > 0
+                )
+            except Exception as e:
+                last_error = e
+                logger.warning(f"Groq {operation} call on {candidate} failed: {str(e)}")
+        
+        raise last_error or TimeoutError(f"No time left in the deadline for Groq {operation} call")
+    
+    def _request_key(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """Normalized identity of a completion request (case and whitespace insensitive)"""
+        normalized = [
+            [msg.get("role", ""), " ".join(msg.get("content", "").split()).casefold()]
+            for msg in messages
+        ]
+        payload = json.dumps([model, temperature, max_tokens, normalized], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Runtime counters for the client"""
+        return {
+            "api_available": self.api_available,
+            "instrumentation": llm_metrics.get_stats(),
+            "llm_backends": self.pool.get_stats(),
+            "chat_coalescing": self.chat_singleflight.get_stats(),
+            "rate_limits": self.rate_limiter.get_stats(),
+            "model_routes": self.model_router.get_stats(),
+        }
+    
+    def _extract_json(self, response_text: str) -> Optional[Any]:
+        """Parse the JSON object in a model response, ignoring any text around it"""
+        if not response_text:
+            return None
+        json_match = re.search(r'\{[\s\S]*\}', response_text)
+        if json_match:
+            response_text = json_match.group(0)
+        try:
+            return json.loads(response_text)
+        except json.JSONDecodeError:
+            return None
+    
+    def analyze_text_local(
+        self,
+        items: List[tuple],
+        analysis_type: str = "sentiment"
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Analyze texts with the offline engines only (no API call)
+        
+        Args:
+            items: List of (index, text) tuples
+            analysis_type: Type of analysis (sentiment, entities, keywords)
+            
+        Returns:
+            Dictionary mapping each index to its analysis result
+        """
+        texts = [text for _, text in items]
+        if analysis_type == "sentiment":
+            results = sentiment_engine.analyze_batch(texts)
+        elif analysis_type == "entities":
+            results = [{"entities": entities} for entities in entity_extractor.extract_batch(texts)]
+        elif analysis_type == "keywords":
+            results = [{"keywords": keywords} for keywords in keyword_extractor.extract_batch(texts)]
+        else:
+            results = [{"analysis": "Analysis not available"} for _ in texts]
+        return {index: result for (index, _), result in zip(items, results)}
+    
+    def _fallback_analysis(self, text: str, analysis_type: str) -> Dict[str, Any]:
+        """Local analysis used when the API is unavailable or fails"""
+        result = self.analyze_text_local([(0, text)], analysis_type)[0]
+        result["note"] = "Fallback analysis due to API unavailability"
+        return result
     
     def translate_text(
         self,
         text: str,
         source_language: str,
         target_language: str,
-        model: Optional[str] = None
+        model: Optional[str] = None,
+        deadline: Optional[float] = None
     ) -> str:
         """
         Translate text using Groq AI with fallback mechanisms
@@ -277,37 +588,43 @@ class GroqAIClient:
             text: Text to translate
             source_language: Source language code (e.g., 'en', 'fr')
             target_language: Target language code
-            model: Model to use (defaults to self.translation_model)
+            model: Model to use (defaults to the "translation" route)
+            deadline: time.monotonic() value by which the call must have started
             
         Returns:
             Translated text or fallback message
         """
+        # Nothing to translate when both sides are the same language
+        if source_language.lower() == target_language.lower():
+            return text
+        
         # Create a prompt for translation
-        prompt = f"Translate the following text from {source_language} to {target_language}: \n\n{text}"
+        prompt = f"Translate the following text from {language_name(source_language)} to {language_name(target_language)}: \n\n{text}"
         
         # Use chat completion for translation if API is available
-        if self.client and self.api_available:
+        if self.api_available:
             try:
                 messages = [
                     {"role": "system", "content": "You are a helpful translation assistant that translates text accurately."},
                     {"role": "user", "content": prompt}
                 ]
                 
-                response = self.client.chat.completions.create(
-                    model=model or self.translation_model,
+                return self._complete_routed(
+                    "translation",
                     messages=messages,
                     temperature=0.3,  # Lower temperature for more accurate translations
-                    max_completion_tokens=1024,
-                    stream=False
+                    deadline=deadline,
+                    model=model,
+                    language=source_language
                 )
                 
-                return response.choices[0].message.content
-                
             except Exception as e:
-                print(f"Error in translation: {str(e)}")
+                logger.warning(f"Error in translation: {str(e)}")
                 # Continue to fallback response
+                llm_metrics.record_fallback("translation", fallback_reason(e))
         else:
-            print("Groq API not available for translation. Using fallback response.")
+            logger.warning("No LLM backend available for translation. Using fallback response.")
+            llm_metrics.record_fallback("translation", "unavailable")
         
         # Fallback response for common African languages
         common_translations = {
@@ -351,6 +668,139 @@ class GroqAIClient:
         # Return a fallback message
         return f"[Translation from {source_language} to {target_language} is not available. Please try again later.]"
 
+    def translate_pack(
+        self,
+        items: List[tuple],
+        source_language: str,
+        target_language: str,
+        model: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Dict[Any, str]:
+        """
+        Translate several strings with one prompt
+        
+        Each string is sent as a numbered <seg> element and the model is asked
+        to return the same elements translated, so every translation can be
+        matched to its key without relying on the model's line breaks.
+        
+        Args:
+            items: List of (key, text) tuples; keys are echoed back in the result
+            source_language: Source language code
+            target_language: Target language code
+            model: Model to use (defaults to the "batch_translation" route)
+            deadline: time.monotonic() value by which the call must have started
+            
+        Returns:
+            Dictionary mapping keys to translations. Strings the model skipped,
+            emptied or mangled, or all of them if the call fails, are left out
+            so the caller can retry just those.
+        """
+        if not items:
+            return {}
+        if source_language.lower() == target_language.lower():
+            return {key: text for key, text in items}
+        if not self.api_available:
+            return {}
+        
+        segments = "\n".join(f'<seg id="{position}">{text}</seg>' for position, (_, text) in enumerate(items))
+        prompt = (
+            f"Translate the text of each <seg> element below from {language_name(source_language)} "
+            f"to {language_name(target_language)}. These are user interface strings of a website. "
+            f"Keep placeholders such as {{name}} or %s, HTML tags and punctuation as they are. "
+            f"Return every element with its id unchanged, one per line, in the form "
+            f"<seg id=\"N\">translation</seg>, and nothing else.\n\n"
+            f"{segments}"
+        )
+        input_tokens = sum(self.estimate_tokens(text) for _, text in items)
+        max_tokens = min(
+            self.model_router.route("batch_translation")["max_tokens"],
+            64 + TRANSLATION_EXPANSION * input_tokens + 12 * len(items)
+        )
+        
+        try:
+            response_text = self._complete_routed(
+                "batch_translation",
+                messages=[
+                    {"role": "system", "content": "You are a helpful translation assistant that translates text accurately."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                deadline=deadline,
+                model=model,
+                max_tokens=max_tokens,
+                language=source_language
+            )
+        except Exception as e:
+            logger.warning(f"Error in batch translation to {target_language}: {str(e)}")
+            return {}
+        
+        results = {}
+        for match in SEGMENT_PATTERN.finditer(response_text or ""):
+            position = int(match.group(1))
+            translation = match.group(2).strip()
+            if position < len(items) and translation and items[position][0] not in results:
+                results[items[position][0]] = translation
+        return results
+
+    def translate_strings(
+        self,
+        strings: Dict[str, str],
+        source_language: str,
+        target_language: str,
+        deadline: Optional[float] = None,
+        pack_tokens: int = 1500,
+        max_items: int = 60,
+        retries: int = 2,
+        concurrency: int = 4
+    ) -> Dict[str, Any]:
+        """
+        Translate keyed strings in packs, retrying only the keys that didn't come back
+        
+        Args:
+            strings: Key -> text to translate (empty texts are copied as they are)
+            source_language: Source language code
+            target_language: Target language code
+            deadline: time.monotonic() value after which no new pack is started
+            pack_tokens: Approximate input token budget per pack
+            max_items: Maximum strings per pack (halved on every retry)
+            retries: Retry rounds for keys missing from the responses
+            concurrency: Packs translated at once
+            
+        Returns:
+            {'translations': key -> translation for every key that came back,
+            'missing': keys without a translation, 'calls': packs sent,
+            'retried': keys sent again}
+        """
+        translations = {key: text for key, text in strings.items() if not text.strip()}
+        pending = [key for key in strings if key not in translations]
+        summary = {"calls": 0, "retried": 0}
+        
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            for attempt in range(retries + 1):
+                if not pending or (attempt and deadline is not None and not time_remaining(deadline)):
+                    break
+                if not self.api_available and source_language.lower() != target_language.lower():
+                    break
+                if attempt:
+                    summary["retried"] += len(pending)
+                packs = self.pack_texts([strings[key] for key in pending], token_budget=pack_tokens, max_items=max_items)
+                summary["calls"] += len(packs)
+                for result in executor.map(
+                    lambda pack: self.translate_pack(
+                        [(pending[index], strings[pending[index]]) for index in pack],
+                        source_language,
+                        target_language,
+                        deadline=deadline
+                    ),
+                    packs
+                ):
+                    translations.update(result)
+                pending = [key for key in pending if key not in translations]
+                # Smaller packs are less likely to lose strings on the next try
+                max_items = max(1, max_items // 2)
+        
+        return dict(summary, translations=translations, missing=pending)
+
 # Create a singleton instance for easy import
 groq_client = GroqAIClient()
 
@@ -0,0 +1,158 @@
+import re
+import json
+import random
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Intent definitions ship with the backend in data/intents.json
+INTENTS_PATH = Path(__file__).resolve().parent.parent.parent / "data" / "intents.json"
+
+
+def build_trie_pattern(keywords: List[str]) -> str:
+    """
+    Regex alternation for keywords, factored into a character trie
+
+    Keywords sharing a prefix share one branch, so at each position the regex
+    engine follows at most one path per character instead of retrying every
+    keyword; matching cost grows with message length, not keyword count.
+    Longer keywords are preferred because the optional tails are greedy.
+    """
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def render(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char != ""]
+        if not branches:
+            return ""
+        terminal = "" in node
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if terminal else group
+
+    return render(trie)
+
+
+class IntentEngine:
+    """Keyword intent classifier used for fallback replies
+
+    All intents' multilingual keywords are compiled into a single trie-shaped
+    regex at load time. Classification is one scan over the message; each hit
+    is mapped back to its intent(s), and the highest-priority intent wins.
+    """
+
+    def __init__(self, intents_path: Path = INTENTS_PATH):
+        self._lock = threading.Lock()
+        self.intents: Dict[str, Dict[str, Any]] = {}
+        self.default_intent = "default"
+        self.load(intents_path)
+
+    def load(self, intents_path: Path):
+        """Load intent definitions from a JSON file and compile the matcher"""
+        with open(intents_path, encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            self.default_intent = data.get("default_intent", "default")
+            self.intents = {}
+            for name, definition in data.get("intents", {}).items():
+                self.intents[name] = self._normalize_definition(definition)
+            self._compile()
+        logger.info(f"Loaded {len(self.intents)} intents from {intents_path}")
+
+    def register_intent(
+        self,
+        name: str,
+        keywords: Union[List[str], Dict[str, List[str]]],
+        responses: List[str],
+        priority: int = 1
+    ):
+        """
+        Add or replace an intent at runtime
+
+        Args:
+            name: Intent name
+            keywords: Keyword list, or a mapping of language code to keyword list
+            responses: Canned replies for the intent
+            priority: Higher priority wins when several intents match
+        """
+        definition = self._normalize_definition({"keywords": keywords, "responses": responses, "priority": priority})
+        with self._lock:
+            self.intents[name] = definition
+            self._compile()
+
+    def _normalize_definition(self, definition: Dict[str, Any]) -> Dict[str, Any]:
+        keywords = definition.get("keywords", [])
+        if isinstance(keywords, dict):
+            keywords = [keyword for words in keywords.values() for keyword in words]
+        return {
+            "priority": int(definition.get("priority", 1)),
+            "keywords": sorted({" ".join(keyword.casefold().split()) for keyword in keywords if keyword.strip()}),
+            "responses": list(definition.get("responses", [])),
+        }
+
+    def _compile(self):
+        """Rebuild the keyword index and combined pattern (lock held)"""
+        keyword_intents: Dict[str, List[str]] = {}
+        for name, definition in self.intents.items():
+            for keyword in definition["keywords"]:
+                keyword_intents.setdefault(keyword, []).append(name)
+        self._keyword_intents = keyword_intents
+        if keyword_intents:
+            # Keywords match whole words only ("reach" does not match "research",
+            # nor "demo" "democracy")
+            self._pattern = re.compile(r"(?<!\w)(?:" + build_trie_pattern(list(keyword_intents)) + r")(?!\w)")
+        else:
+            self._pattern = None
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """
+        Detect the intent of a message
+
+        Returns:
+            Dictionary with 'intent', 'confidence' (0-1) and 'matches' (keywords hit)
+        """
+        pattern = self._pattern
+        keyword_intents = self._keyword_intents
+        if pattern is None or not text:
+            return {"intent": self.default_intent, "confidence": 0.0, "matches": []}
+
+        normalized = " ".join(text.casefold().split())
+        hits: Dict[str, int] = {}
+        matches = []
+        for match in pattern.finditer(normalized):
+            keyword = match.group(0)
+            matches.append(keyword)
+            for name in keyword_intents.get(keyword, ()):
+                hits[name] = hits.get(name, 0) + 1
+
+        if not hits:
+            return {"intent": self.default_intent, "confidence": 0.0, "matches": []}
+
+        intent = max(hits, key=lambda name: (self.intents[name]["priority"], hits[name]))
+        # More hits raise confidence; hits for competing intents lower it
+        confidence = (hits[intent] / sum(hits.values())) * (1 - 0.5 ** hits[intent])
+        return {"intent": intent, "confidence": round(confidence, 4), "matches": matches}
+
+    def fallback_response(self, intent: str) -> str:
+        """A canned reply for an intent (the default intent's when it has none)"""
+        definition = self.intents.get(intent) or self.intents.get(self.default_intent, {})
+        responses = definition.get("responses") or self.intents.get(self.default_intent, {}).get("responses", [])
+        return random.choice(responses) if responses else ""
+
+    def respond(self, text: str) -> Dict[str, Any]:
+        """Classify a message and pick a canned reply for it"""
+        classification = self.classify(text)
+        classification["response"] = self.fallback_response(classification["intent"])
+        return classification
+
+
+# Create a singleton instance for easy import
+intent_engine = IntentEngine()
@@ -0,0 +1,586 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import inspect
+import sqlite3
+import ipaddress
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.utils.retry import RetryPolicy, deadline_after
+
+logger = logging.getLogger(__name__)
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", str(Path(__file__).resolve().parent.parent.parent / "data" / "synapseiq.db"))
+# Jobs run concurrently per process
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Of those, how many may run bulk jobs at once, so bulk work can't starve the rest
+JOB_BULK_CONCURRENCY = int(os.getenv("JOB_BULK_CONCURRENCY", "2"))
+# Attempts per job before it is marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Time budget for one attempt, passed to handlers that take a deadline
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "300"))
+# A running job whose lease isn't renewed (crashed or restarted worker) is picked up again
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# How often idle workers look for jobs enqueued by other processes
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+
+# Hosts completion callbacks may be sent to (comma-separated; ".example.com"
+# also allows subdomains). When empty, any host that resolves only to public
+# addresses is allowed, so callbacks can't reach internal services
+JOB_CALLBACK_HOSTS = [host.strip().lower() for host in os.getenv("JOB_CALLBACK_HOSTS", "").split(",") if host.strip()]
+
+# Priority classes, claimed in this order
+PRIORITIES = {"high": 0, "normal": 1, "bulk": 2}
+PRIORITY_NAMES = {value: key for key, value in PRIORITIES.items()}
+
+# Parameters the queue supplies itself
+RESERVED_PARAMS = ("deadline", "stream")
+
+# Failed attempts are re-queued with backoff; completion callbacks are
+# retried on connection errors and 5xx/429 responses
+job_retry_policy = RetryPolicy(max_attempts=JOB_MAX_ATTEMPTS, base_delay=2.0, max_delay=60.0)
+callback_retry_policy = RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=30.0)
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for a failure no retry can fix; the job fails without further attempts"""
+
+
+def check_callback_url(url: str):
+    """
+    Reject callback URLs the queue must not POST to
+
+    Raises:
+        ValueError: If the URL isn't http(s), its host isn't in JOB_CALLBACK_HOSTS
+            (when set), or it resolves to a private, loopback or otherwise
+            non-public address
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise ValueError("callback_url must be an http(s) URL")
+
+    if JOB_CALLBACK_HOSTS:
+        if not any(host == allowed or (allowed.startswith(".") and host.endswith(allowed)) for allowed in JOB_CALLBACK_HOSTS):
+            raise ValueError(f"callback_url host {host} is not allowed")
+        return
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parts.port or 443, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"callback_url host {host} could not be resolved: {str(e)}")
+    for address in addresses:
+        if not ipaddress.ip_address(address.split("%")[0]).is_global:
+            raise ValueError(f"callback_url host {host} resolves to a non-public address")
+
+
+class JobQueue:
+    """Durable priority queue for long-running AI operations
+
+    Jobs are rows in a SQLite table, so they survive restarts and can be
+    enqueued by any process sharing the database. Workers claim the oldest
+    runnable job of the highest priority class inside an IMMEDIATE
+    transaction, so two workers never claim the same job. A claimed job holds
+    a lease that its worker renews while it runs; if the worker dies, the
+    lease lapses and another worker picks the job up. Failed attempts are
+    retried with backoff up to JOB_MAX_ATTEMPTS, unless the handler raised
+    PermanentJobError.
+
+    Operations are looked up in a handler registry (register), so any module
+    can make its own work queueable.
+    """
+
+    def __init__(
+        self,
+        db_path: str = JOB_DB_PATH,
+        workers: int = JOB_WORKERS,
+        bulk_concurrency: int = JOB_BULK_CONCURRENCY,
+        max_attempts: int = JOB_MAX_ATTEMPTS
+    ):
+        self.db_path = db_path
+        self.workers = workers
+        self.bulk_concurrency = bulk_concurrency
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, Callable] = {}
+        self._max_attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running_bulk = 0
+        self._running = 0
+        self._stats = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retried": 0,
+            "recovered": 0,
+            "callbacks_delivered": 0,
+            "callbacks_failed": 0,
+            "total_wait": 0.0,
+            "total_run": 0.0,
+        }
+
+        try:
+            conn = self._connect()
+            try:
+                conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    operation TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    callback_url TEXT,
+                    callback_status TEXT,
+                    worker TEXT,
+                    lease_until REAL,
+                    available_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                ''')
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority, created_at)")
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Jobs table not created in {db_path}: {str(e)}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def register(self, operation: str, handler: Callable, max_attempts: Optional[int] = None):
+        """
+        Make an operation queueable
+
+        Args:
+            operation: Name clients submit
+            handler: Function or coroutine called with the job's params as
+                keyword arguments; its return value must be JSON-serializable.
+                If it takes a `deadline` argument it gets the attempt's deadline.
+            max_attempts: Attempts per job of this operation (the queue's
+                max_attempts by default)
+        """
+        self._handlers[operation] = handler
+        if max_attempts is not None:
+            self._max_attempts[operation] = max_attempts
+
+    def _attempts_allowed(self, operation: str) -> int:
+        return self._max_attempts.get(operation, self.max_attempts)
+
+    def operations(self) -> List[str]:
+        """Registered operation names"""
+        return sorted(self._handlers)
+
+    def submit(
+        self,
+        operation: str,
+        params: Optional[Dict[str, Any]] = None,
+        priority: str = "normal",
+        callback_url: Optional[str] = None,
+        available_at: Optional[float] = None,
+        dedupe: Optional[Dict[str, Any]] = None,
+        job_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Enqueue a job
+
+        Args:
+            available_at: time.time() value before which the job isn't started
+                (immediately when None)
+            dedupe: Params identifying the work; if a queued or running job of
+                the same operation has these param values, that job is returned
+                and nothing new is queued
+            job_id: Caller-chosen id that makes the submit idempotent: if a job
+                with this id already exists (in any state), it is returned
+
+        Raises:
+            ValueError: Unknown operation or priority, params the handler doesn't
+                accept, or a callback URL that isn't allowed (see check_callback_url)
+        """
+        params = params or {}
+        handler = self._handlers.get(operation)
+        if handler is None:
+            raise ValueError(f"Unknown operation '{operation}'. Available: {', '.join(self.operations())}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}'. Use one of: {', '.join(PRIORITIES)}")
+        reserved = [name for name in RESERVED_PARAMS if name in params]
+        if reserved:
+            raise ValueError(f"Parameters set by the queue can't be submitted: {', '.join(reserved)}")
+        if callback_url:
+            check_callback_url(callback_url)
+        try:
+            inspect.signature(handler).bind(**params)
+        except TypeError as e:
+            raise ValueError(f"Invalid params for '{operation}': {str(e)}")
+
+        now = time.time()
+        chosen_id = job_id is not None
+        job_id = job_id or str(uuid.uuid4())
+        conn = self._connect()
+        try:
+            if dedupe:
+                # Check and insert in one write transaction, so two processes can't both queue it
+                conn.execute("BEGIN IMMEDIATE")
+                clauses = " AND ".join("json_extract(params, ?) = ?" for _ in dedupe)
+                values = [item for key, value in dedupe.items() for item in (f"$.{key}", value)]
+                existing = conn.execute(
+                    f"SELECT id FROM jobs WHERE operation = ? AND status IN ('queued', 'running') AND {clauses} LIMIT 1",
+                    [operation] + values
+                ).fetchone()
+                if existing:
+                    conn.rollback()
+                    with self._lock:
+                        self._stats["deduplicated"] += 1
+                    return self.get(existing["id"])
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, operation, params, priority, status, callback_url, available_at, created_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, operation, json.dumps(params, ensure_ascii=False), PRIORITIES[priority], callback_url, available_at or now, now)
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+
+        if chosen_id and not inserted:
+            with self._lock:
+                self._stats["deduplicated"] += 1
+            return self.get(job_id)
+
+        with self._lock:
+            self._stats["submitted"] += 1
+        self._wake()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status and, once finished, its result or error"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._to_dict(row) if row else None
+
+    def pending(self, operation: str) -> int:
+        """Number of jobs for an operation that haven't started yet (including scheduled ones)"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE operation = ? AND status = 'queued'", (operation,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def depth(self, operation: str) -> Dict[str, Any]:
+        """Jobs of one operation per status, and how long the oldest runnable one has waited"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            counts = conn.execute(
+                "SELECT status, COUNT(*) AS count FROM jobs WHERE operation = ? GROUP BY status", (operation,)
+            ).fetchall()
+            oldest = conn.execute(
+                "SELECT MIN(available_at) FROM jobs WHERE operation = ? AND status = 'queued' AND available_at <= ?",
+                (operation, now)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            "by_status": {row["status"]: row["count"] for row in counts},
+            "oldest_queued_seconds": now - oldest if oldest else 0.0,
+        }
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that hasn't started; returns whether it was cancelled"""
+        conn = self._connect()
+        try:
+            cancelled = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        return cancelled > 0
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        def timestamp(value):
+            return datetime.fromtimestamp(value).isoformat() if value else None
+
+        return {
+            "id": row["id"],
+            "operation": row["operation"],
+            "params": json.loads(row["params"]),
+            "priority": PRIORITY_NAMES.get(row["priority"], str(row["priority"])),
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "callback_url": row["callback_url"],
+            "callback_status": row["callback_status"],
+            "created_at": timestamp(row["created_at"]),
+            "started_at": timestamp(row["started_at"]),
+            "finished_at": timestamp(row["finished_at"]),
+        }
+
+    def _claim(self, allow_bulk: bool) -> Optional[sqlite3.Row]:
+        """Atomically take the next runnable job, or None"""
+        now = time.time()
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = conn.execute(
+                        "SELECT * FROM jobs WHERE ((status = 'queued' AND available_at <= ?) "
+                        "OR (status = 'running' AND lease_until < ?)) AND priority <= ? "
+                        "ORDER BY priority, created_at LIMIT 1",
+                        (now, now, PRIORITIES["bulk"] if allow_bulk else PRIORITIES["bulk"] - 1)
+                    ).fetchone()
+                    if row is None:
+                        conn.execute("COMMIT")
+                        return None
+                    if row["status"] == "running":
+                        # Its worker stopped renewing the lease
+                        with self._lock:
+                            self._stats["recovered"] += 1
+                        if row["attempts"] >= self._attempts_allowed(row["operation"]):
+                            conn.execute(
+                                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                                (f"Worker stopped after {row['attempts']} attempts", now, row["id"])
+                            )
+                            continue
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_until = ?, "
+                        "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                        (self.worker_id, now + JOB_LEASE_SECONDS, now, row["id"])
+                    )
+                    conn.execute("COMMIT")
+                    return conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, **fields):
+        """Write fields of a job this worker holds"""
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        try:
+            conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND worker = ?",
+                list(fields.values()) + [job_id, self.worker_id]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _wake(self):
+        """Let an idle worker claim a new job now instead of at its next poll"""
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+
+    async def start(self):
+        """Start the worker pool on the running event loop"""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        logger.info(f"Job queue started: {self.workers} workers ({self.worker_id})")
+
+    async def stop(self):
+        """Stop the workers; jobs they were running are picked up again after their lease"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                allow_bulk = self._running_bulk < self.bulk_concurrency
+                self._wakeup.clear()
+                job = await asyncio.to_thread(self._claim, allow_bulk)
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {index} error: {str(e)}")
+                await asyncio.sleep(JOB_POLL_SECONDS)
+
+    async def _run(self, job: sqlite3.Row):
+        job_id = job["id"]
+        bulk = job["priority"] == PRIORITIES["bulk"]
+        started = time.time()
+        self._running += 1
+        if bulk:
+            self._running_bulk += 1
+        renewer = asyncio.create_task(self._renew_lease(job_id))
+        try:
+            result = await self._call(job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            if not isinstance(e, PermanentJobError) and job["attempts"] < self._attempts_allowed(job["operation"]):
+                delay = job_retry_policy.backoff(job["attempts"])
+                await asyncio.to_thread(
+                    self._update, job_id, status="queued", error=error, lease_until=None, available_at=time.time() + delay
+                )
+                with self._lock:
+                    self._stats["retried"] += 1
+                logger.warning(f"Job {job_id} ({job['operation']}) attempt {job['attempts']} failed: {error}; retrying in {delay:.1f}s")
+                return
+            await asyncio.to_thread(self._update, job_id, status="failed", error=error, finished_at=time.time())
+            with self._lock:
+                self._stats["failed"] += 1
+            logger.error(f"Job {job_id} ({job['operation']}) failed: {error}")
+        else:
+            await asyncio.to_thread(
+                self._update, job_id, status="succeeded", error=None,
+                result=json.dumps(result, ensure_ascii=False, default=str), finished_at=time.time()
+            )
+            with self._lock:
+                self._stats["succeeded"] += 1
+                # Waiting starts when the job becomes runnable, not when a scheduled job was submitted
+                self._stats["total_wait"] += started - min(started, max(job["created_at"], job["available_at"]))
+                self._stats["total_run"] += time.time() - started
+        finally:
+            renewer.cancel()
+            self._running -= 1
+            if bulk:
+                self._running_bulk -= 1
+
+        if job["callback_url"]:
+            await self._send_callback(job_id)
+
+    async def _call(self, job: sqlite3.Row) -> Any:
+        handler = self._handlers.get(job["operation"])
+        if handler is None:
+            raise LookupError(f"No handler registered for '{job['operation']}'")
+        params = json.loads(job["params"])
+        if "deadline" in inspect.signature(handler).parameters:
+            params["deadline"] = deadline_after(JOB_TIMEOUT_SECONDS)
+        if inspect.iscoroutinefunction(handler):
+            return await asyncio.wait_for(handler(**params), timeout=JOB_TIMEOUT_SECONDS)
+        return await asyncio.to_thread(handler, **params)
+
+    async def _renew_lease(self, job_id: str):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                await asyncio.to_thread(self._update, job_id, lease_until=time.time() + JOB_LEASE_SECONDS)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not renew lease on job {job_id}: {str(e)}")
+
+    async def _send_callback(self, job_id: str):
+        """POST the finished job to its callback URL"""
+        job = await asyncio.to_thread(self.get, job_id)
+        if job is None or job["status"] not in ("succeeded", "failed"):
+            return
+        # Checked again at delivery: the host may resolve differently by now
+        try:
+            await asyncio.to_thread(check_callback_url, job["callback_url"])
+        except ValueError as e:
+            logger.warning(f"Callback for job {job_id} not sent: {str(e)}")
+            with self._lock:
+                self._stats["callbacks_failed"] += 1
+            await asyncio.to_thread(self._update, job_id, callback_status=f"blocked: {str(e)}")
+            return
+
+        status = None
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            for attempt in range(1, callback_retry_policy.max_attempts + 1):
+                try:
+                    response = await client.post(job["callback_url"], json=job)
+                    response.raise_for_status()
+                    status = f"delivered ({response.status_code})"
+                    break
+                except Exception as e:
+                    retryable = callback_retry_policy.is_retryable(e) or (
+                        isinstance(e, httpx.HTTPStatusError) and e.response.status_code in callback_retry_policy.retryable_statuses
+                    )
+                    status = f"failed: {str(e)}"
+                    if attempt == callback_retry_policy.max_attempts or not retryable:
+                        break
+                    await asyncio.sleep(callback_retry_policy.backoff(attempt))
+
+        delivered = status.startswith("delivered")
+        with self._lock:
+            self._stats["callbacks_delivered" if delivered else "callbacks_failed"] += 1
+        if not delivered:
+            logger.warning(f"Callback for job {job_id} to {job['callback_url']} {status}")
+        await asyncio.to_thread(self._update, job_id, callback_status=status)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth per status and priority, wait/run times, worker usage"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            counts = conn.execute("SELECT status, priority, COUNT(*) AS count FROM jobs GROUP BY status, priority").fetchall()
+            oldest, scheduled = conn.execute(
+                "SELECT MIN(CASE WHEN available_at <= ? THEN available_at END), "
+                "SUM(CASE WHEN available_at > ? THEN 1 ELSE 0 END) FROM jobs WHERE status = 'queued'",
+                (now, now)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        by_status: Dict[str, int] = {}
+        queued: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        for row in counts:
+            by_status[row["status"]] = by_status.get(row["status"], 0) + row["count"]
+            if row["status"] == "queued":
+                queued[PRIORITY_NAMES.get(row["priority"], str(row["priority"]))] = row["count"]
+
+        with self._lock:
+            stats = dict(self._stats)
+        succeeded = stats["succeeded"]
+        stats["average_wait_seconds"] = stats.pop("total_wait") / succeeded if succeeded else 0.0
+        stats["average_run_seconds"] = stats.pop("total_run") / succeeded if succeeded else 0.0
+        stats.update({
+            "jobs_by_status": by_status,
+            "queued_by_priority": queued,
+            "oldest_queued_seconds": now - oldest if oldest else 0.0,
+            "scheduled": scheduled or 0,
+            "running_here": self._running,
+            "running_bulk_here": self._running_bulk,
+            "workers": self.workers if self._tasks else 0,
+            "operations": self.operations(),
+        })
+        return stats
+
+
+# Create a singleton instance for easy import
+job_queue = JobQueue()
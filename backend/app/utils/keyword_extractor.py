@@ -0,0 +1,226 @@
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+# scikit-learn fits the IDF weights; without it phrases are scored by RAKE alone
+SKLEARN_AVAILABLE = True
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer, ENGLISH_STOP_WORDS
+except ImportError:
+    SKLEARN_AVAILABLE = False
+    ENGLISH_STOP_WORDS = frozenset()
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+KEYWORDS_DIR = BACKEND_DIR / "data" / "keywords"
+STOPWORDS_PATH = KEYWORDS_DIR / "stopwords.json"
+# Fitted vocabulary and IDF weights, written by fit() so startup never refits
+MODEL_PATH = Path(os.getenv("KEYWORD_MODEL_PATH", str(KEYWORDS_DIR / "tfidf_model.json")))
+# Blog posts and testimonials the IDF weights are fitted on
+CORPUS_DB_PATH = os.getenv("KEYWORD_CORPUS_DB", str(BACKEND_DIR / "data" / "synapseiq.db"))
+# Used when the database has no content yet
+SEED_CORPUS_PATH = BACKEND_DIR / "testimonials_data.json"
+
+# Words, keeping internal apostrophes and hyphens ("AI-powered", "Nando's")
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:['’-][^\W\d_]+)*")
+# Punctuation that ends a candidate phrase
+PHRASE_BREAK_PATTERN = re.compile(r"[.,;:!?()\[\]{}\"“”«»|/\n\r\t]+|\s[-–—]\s")
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+# Longest candidate phrase, in words
+MAX_PHRASE_WORDS = 3
+DEFAULT_TOP_N = 10
+
+
+def load_corpus(db_path: str = CORPUS_DB_PATH) -> List[str]:
+    """
+    Published blog posts and testimonials to fit the IDF weights on
+
+    Falls back to the bundled testimonials_data.json when the database is
+    missing or holds no content yet.
+    """
+    documents: List[str] = []
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if "blog_posts" in tables:
+                for title, excerpt, content in conn.execute(
+                    "SELECT title, excerpt, content FROM blog_posts WHERE published = 1"
+                ):
+                    documents.append(" ".join(part for part in (title, excerpt, HTML_TAG_PATTERN.sub(" ", content or "")) if part))
+            if "testimonials" in tables:
+                documents.extend(row[0] for row in conn.execute("SELECT content FROM testimonials") if row[0])
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Could not read keyword corpus from {db_path}: {str(e)}")
+
+    if not documents and SEED_CORPUS_PATH.exists():
+        with open(SEED_CORPUS_PATH, encoding="utf-8") as f:
+            documents = [item["content"] for item in json.load(f) if item.get("content")]
+    return documents
+
+
+class KeywordExtractor:
+    """Offline keyword extraction: RAKE phrase scoring weighted by corpus IDF
+
+    Candidate phrases are runs of up to MAX_PHRASE_WORDS words between
+    stopwords and punctuation. Each word scores degree/frequency as in RAKE,
+    multiplied by its IDF from a TF-IDF vectorizer fitted on our blog and
+    testimonial corpus, so words common to all our content ("SynapseIQ",
+    "business") rank below the ones that make a text distinctive.
+    """
+
+    def __init__(self, model_path: Path = MODEL_PATH, stopwords_path: Path = STOPWORDS_PATH):
+        self._lock = threading.Lock()
+        self.model_path = model_path
+        self.stopwords = self._load_stopwords(stopwords_path)
+        self.idf: Dict[str, float] = {}
+        self.default_idf = 1.0
+        self.fitted_at: Optional[str] = None
+        self.documents = 0
+
+        if model_path.exists():
+            self.load(model_path)
+        else:
+            self.refit()
+
+    def _load_stopwords(self, stopwords_path: Path) -> frozenset:
+        with open(stopwords_path, encoding="utf-8") as f:
+            languages = json.load(f).get("languages", {})
+        words = {word.casefold() for words in languages.values() for word in words}
+        return frozenset(words | set(ENGLISH_STOP_WORDS))
+
+    def words(self, text: str) -> List[str]:
+        """Lowercased content words of a text (stopwords removed)"""
+        return [word for word in WORD_PATTERN.findall(text.casefold()) if word not in self.stopwords and len(word) > 1]
+
+    def fit(self, documents: List[str]):
+        """Fit IDF weights on a corpus (RAKE-only scoring when scikit-learn is missing)"""
+        if not SKLEARN_AVAILABLE:
+            logger.warning("scikit-learn not available; keyword scores will not be IDF-weighted")
+            return
+        if not documents:
+            logger.warning("Keyword corpus is empty; keyword scores will not be IDF-weighted")
+            return
+
+        vectorizer = TfidfVectorizer(analyzer=self.words, sublinear_tf=True)
+        vectorizer.fit(documents)
+        idf = {term: float(vectorizer.idf_[index]) for term, index in vectorizer.vocabulary_.items()}
+        with self._lock:
+            self.idf = idf
+            # Words the corpus never used are treated as the rarest
+            self.default_idf = max(idf.values())
+            self.fitted_at = datetime.now().isoformat()
+            self.documents = len(documents)
+        logger.info(f"Keyword vocabulary fitted: {len(idf)} terms from {len(documents)} documents")
+
+    def save(self, model_path: Optional[Path] = None):
+        """Persist the fitted vocabulary and IDF weights"""
+        model_path = model_path or self.model_path
+        model_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {
+                "fitted_at": self.fitted_at,
+                "documents": self.documents,
+                "default_idf": self.default_idf,
+                "idf": {term: round(value, 6) for term, value in sorted(self.idf.items())},
+            }
+        with open(model_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=0)
+
+    def load(self, model_path: Path):
+        """Load a persisted vocabulary"""
+        with open(model_path, encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            self.idf = {term: float(value) for term, value in data.get("idf", {}).items()}
+            self.default_idf = float(data.get("default_idf", 1.0))
+            self.fitted_at = data.get("fitted_at")
+            self.documents = int(data.get("documents", 0))
+        logger.info(f"Keyword vocabulary loaded: {len(self.idf)} terms from {model_path}")
+
+    def refit(self, db_path: str = CORPUS_DB_PATH):
+        """Refit on the current blog and testimonial corpus and persist the result"""
+        self.fit(load_corpus(db_path))
+        if self.idf:
+            try:
+                self.save()
+            except OSError as e:
+                logger.error(f"Could not save keyword vocabulary to {self.model_path}: {str(e)}")
+
+    def candidate_phrases(self, text: str) -> List[List[str]]:
+        """Runs of content words between stopwords and punctuation"""
+        phrases = []
+        for chunk in PHRASE_BREAK_PATTERN.split(text.casefold()):
+            current: List[str] = []
+            for word in WORD_PATTERN.findall(chunk):
+                if word in self.stopwords or len(word) < 2:
+                    if current:
+                        phrases.append(current)
+                    current = []
+                    continue
+                current.append(word)
+                if len(current) == MAX_PHRASE_WORDS:
+                    phrases.append(current)
+                    current = []
+            if current:
+                phrases.append(current)
+        return phrases
+
+    def extract(self, text: str, top_n: int = DEFAULT_TOP_N) -> List[Dict[str, Any]]:
+        """
+        Top keywords of a text
+
+        Returns:
+            List of {'text', 'relevance'} sorted by relevance (0-1, relative to
+            the best phrase in the text)
+        """
+        phrases = self.candidate_phrases(text or "")
+        if not phrases:
+            return []
+
+        frequency: Dict[str, int] = {}
+        degree: Dict[str, int] = {}
+        for phrase in phrases:
+            for word in phrase:
+                frequency[word] = frequency.get(word, 0) + 1
+                degree[word] = degree.get(word, 0) + len(phrase)
+
+        idf = self.idf
+        default_idf = self.default_idf
+        word_scores = {
+            word: degree[word] / frequency[word] * idf.get(word, default_idf)
+            for word in frequency
+        }
+
+        scores: Dict[str, float] = {}
+        for phrase in phrases:
+            key = " ".join(phrase)
+            if key not in scores:
+                scores[key] = sum(word_scores[word] for word in phrase)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_n]
+        best = ranked[0][1] or 1.0
+        return [{"text": phrase, "relevance": round(score / best, 4)} for phrase, score in ranked]
+
+    def extract_batch(self, texts: List[str], top_n: int = DEFAULT_TOP_N) -> List[List[Dict[str, Any]]]:
+        """Top keywords for each text in a batch"""
+        return [self.extract(text, top_n=top_n) for text in texts]
+
+
+# Create a singleton instance for easy import
+keyword_extractor = KeywordExtractor()
+
+if __name__ == "__main__":
+    # Refit on the current database content: python -m app.utils.keyword_extractor
+    keyword_extractor.refit()
+    print(f"Fitted {len(keyword_extractor.idf)} terms on {keyword_extractor.documents} documents")
@@ -0,0 +1,199 @@
+import re
+import json
+import logging
+import unicodedata
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Training text ships with the backend in data/langid
+SAMPLES_PATH = Path(__file__).resolve().parent.parent.parent / "data" / "langid" / "samples.json"
+
+LANGUAGE_NAMES = {
+    "en": "English",
+    "fr": "French",
+    "sw": "Swahili",
+    "ny": "Chichewa",
+    "ln": "Lingala",
+    "ar": "Arabic",
+    "am": "Amharic",
+    "yo": "Yoruba",
+    "zu": "Zulu",
+}
+
+# Words, keeping combining accents (Yoruba tone marks) and Arabic vowel marks attached
+WORD_PATTERN = re.compile(r"(?:[^\W\d_]|[\u0300-\u036f\u064b-\u065f])+")
+
+# Character n-gram orders used as features
+NGRAM_ORDERS = (1, 2, 3)
+# Additive smoothing for n-grams a language's samples never produced
+SMOOTHING = 0.5
+# Only the start of long texts is scored; the language is settled well before this
+MAX_CHARS = 1000
+# Texts with fewer letters than this are not classified
+MIN_LETTERS = 2
+# Scale applied to the mean per-n-gram log-likelihood before the softmax
+SHARPNESS = 8.0
+# Texts with fewer n-grams than this get proportionally flatter probabilities
+EVIDENCE_NGRAMS = 30
+# Detections below this confidence are flagged as unreliable
+RELIABLE_CONFIDENCE = 0.5
+
+# Scripts used by a single supported language short-circuit the n-gram model
+SCRIPT_LANGUAGES = (
+    ("ar", re.compile(r"[\u0600-\u06ff\u0750-\u077f]")),
+    ("am", re.compile(r"[\u1200-\u139f\u2d80-\u2ddf]")),
+)
+
+
+def language_name(code: str) -> str:
+    """English name for a language code (the code itself when unknown)"""
+    return LANGUAGE_NAMES.get(code, code)
+
+
+class LanguageIdentifier:
+    """Offline language identification from character n-gram profiles
+
+    Each language's sample text is reduced to character 1-3 gram counts, which
+    are turned into a (n-grams x languages) matrix of smoothed log-probabilities.
+    Detecting a text maps its n-grams to row indices and sums the gathered rows,
+    i.e. a naive Bayes score per language; batches gather every text's rows at
+    once and sum them per text with np.add.reduceat.
+    """
+
+    def __init__(self, samples_path: Path = SAMPLES_PATH, default_language: str = "en"):
+        self.default_language = default_language
+        self.load(samples_path)
+
+    def load(self, samples_path: Path):
+        """Build n-gram profiles from a samples file"""
+        with open(samples_path, encoding="utf-8") as f:
+            samples = json.load(f).get("languages", {})
+
+        self.languages = list(samples)
+        vocabulary: Dict[str, int] = {}
+        rows: List[int] = []
+        columns: List[int] = []
+        for column, language in enumerate(self.languages):
+            for sentence in samples[language]:
+                for ngram in self.ngrams(sentence):
+                    index = vocabulary.setdefault(ngram, len(vocabulary))
+                    rows.append(index)
+                    columns.append(column)
+
+        matrix = np.zeros((len(vocabulary), len(self.languages)), dtype=np.float64)
+        np.add.at(matrix, (np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64)), 1.0)
+        totals = matrix.sum(axis=0) + SMOOTHING * len(vocabulary)
+        self.log_probabilities = np.log((matrix + SMOOTHING) / totals)
+        self.vocabulary = vocabulary
+        self._language_index = {language: column for column, language in enumerate(self.languages)}
+
+        logger.info(f"Language profiles built: {len(self.languages)} languages, {len(vocabulary)} n-grams from {samples_path}")
+
+    def ngrams(self, text: str) -> List[str]:
+        """Character n-grams of each word, padded with spaces at word boundaries"""
+        normalized = unicodedata.normalize("NFC", text[:MAX_CHARS]).casefold()
+        grams = []
+        for word in WORD_PATTERN.findall(normalized):
+            padded = f" {word} "
+            length = len(padded)
+            for n in NGRAM_ORDERS:
+                for start in range(length - n + 1):
+                    gram = padded[start:start + n]
+                    if gram != " ":
+                        grams.append(gram)
+        return grams
+
+    def _script_language(self, text: str) -> Optional[Dict[str, Any]]:
+        """Detection for texts written mostly in a script only one language uses"""
+        letters = [char for char in text[:MAX_CHARS] if char.isalpha()]
+        if len(letters) < MIN_LETTERS:
+            return None
+        for language, pattern in SCRIPT_LANGUAGES:
+            if language not in self._language_index:
+                continue
+            share = sum(1 for char in letters if pattern.match(char)) / len(letters)
+            if share >= 0.5:
+                return self._result(language, share)
+        return None
+
+    def _result(self, language: str, confidence: float, scores: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        result = {
+            "language": language,
+            "name": language_name(language),
+            "confidence": round(confidence, 4),
+            "reliable": confidence >= RELIABLE_CONFIDENCE,
+        }
+        if scores is not None:
+            result["scores"] = scores
+        return result
+
+    def _undetermined(self) -> Dict[str, Any]:
+        return self._result(self.default_language, 0.0)
+
+    def detect_batch(self, texts: List[str], include_scores: bool = False) -> List[Dict[str, Any]]:
+        """
+        Detect the language of many texts
+
+        Args:
+            texts: Texts to classify
+            include_scores: Add per-language probabilities to each result
+
+        Returns:
+            One dictionary per text with 'language' (code), 'name', 'confidence'
+            (0-1) and 'reliable'; texts too short to classify get the default
+            language with zero confidence
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        lookup = self.vocabulary.get
+        positions = []
+        lengths = []
+        ids: List[int] = []
+        for position, text in enumerate(texts):
+            script_result = self._script_language(text or "")
+            if script_result is not None:
+                results[position] = script_result
+                continue
+            text_ids = [index for index in map(lookup, self.ngrams(text or "")) if index is not None]
+            if len(text_ids) < MIN_LETTERS:
+                results[position] = self._undetermined()
+                continue
+            positions.append(position)
+            lengths.append(len(text_ids))
+            ids.extend(text_ids)
+
+        if positions:
+            lengths_array = np.array(lengths, dtype=np.int64)
+            starts = np.concatenate(([0], np.cumsum(lengths_array)[:-1]))
+            gathered = self.log_probabilities[np.array(ids, dtype=np.int64)]
+            # Mean log-likelihood per n-gram keeps confidence comparable across text
+            # lengths; very short texts carry less evidence and are flattened
+            scores = np.add.reduceat(gathered, starts, axis=0) / lengths_array[:, None]
+            evidence = np.minimum(1.0, lengths_array / EVIDENCE_NGRAMS)[:, None]
+            scaled = SHARPNESS * evidence * (scores - scores.max(axis=1, keepdims=True))
+            probabilities = np.exp(scaled)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            best = probabilities.argmax(axis=1)
+
+            for row, position in enumerate(positions):
+                column = int(best[row])
+                language_scores = None
+                if include_scores:
+                    language_scores = {
+                        language: round(float(probabilities[row, index]), 4)
+                        for index, language in enumerate(self.languages)
+                    }
+                results[position] = self._result(self.languages[column], float(probabilities[row, column]), language_scores)
+
+        return results
+
+    def detect(self, text: str, include_scores: bool = False) -> Dict[str, Any]:
+        """Detect the language of a single text"""
+        return self.detect_batch([text], include_scores=include_scores)[0]
+
+
+# Create a singleton instance for easy import
+language_identifier = LanguageIdentifier()
@@ -0,0 +1,243 @@
+import os
+import json
+import queue
+import random
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+from app.utils.rate_limiter import RateLimitExceeded
+from app.utils.retry import status_code_of
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0]
+
+# Optional JSON-lines trace of individual calls: file path (empty disables it),
+# share of successful calls kept (failures and fallbacks are always kept), and
+# how many records may wait for the writer before new ones are dropped
+LLM_TRACE_LOG = os.getenv("LLM_TRACE_LOG", "")
+LLM_TRACE_SAMPLE_RATE = float(os.getenv("LLM_TRACE_SAMPLE_RATE", "0.05"))
+LLM_TRACE_QUEUE_SIZE = int(os.getenv("LLM_TRACE_QUEUE_SIZE", "10000"))
+
+
+def fallback_reason(error: Optional[BaseException]) -> str:
+    """Short reason label for an error that made a caller fall back"""
+    if error is None:
+        return "unavailable"
+    if isinstance(error, RateLimitExceeded):
+        return "rate_limited"
+    status = status_code_of(error)
+    if status == 429:
+        return "rate_limited"
+    if isinstance(error, TimeoutError) or "Timeout" in type(error).__name__:
+        return "timeout"
+    if status is not None:
+        return f"http_{status}"
+    return "error"
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with estimated percentiles"""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Estimated percentile, interpolated linearly inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / bucket_count)
+            seen += bucket_count
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound:g}" for bound in self.buckets] + ["inf"]
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class LLMMetrics:
+    """In-process aggregation of LLM calls, cache lookups and fallbacks
+
+    Calls are aggregated per operation and model: outcome counts, latency
+    histogram, token usage and retries. When LLM_TRACE_LOG is set, a sample of
+    individual calls is appended to it as JSON lines by a background thread,
+    so request threads never wait on the disk.
+    """
+
+    def __init__(self, trace_path: str = LLM_TRACE_LOG, sample_rate: float = LLM_TRACE_SAMPLE_RATE):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._caches: Dict[str, Dict[str, int]] = {}
+        self._fallbacks: Dict[str, Dict[str, int]] = {}
+        self.started_at = time.time()
+
+        self.trace_path = trace_path
+        self.sample_rate = sample_rate
+        self._trace_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=LLM_TRACE_QUEUE_SIZE)
+        self._trace_stats = {"written": 0, "dropped": 0, "errors": 0}
+        self._writer: Optional[threading.Thread] = None
+        if trace_path:
+            self._writer = threading.Thread(target=self._write_traces, name="llm-trace-writer", daemon=True)
+            self._writer.start()
+
+    def record_call(
+        self,
+        operation: str,
+        model: str,
+        latency: float,
+        success: bool,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        retries: int = 0,
+        error: Optional[BaseException] = None
+    ):
+        """
+        Add one upstream call (all of its attempts) to the aggregates
+
+        Args:
+            operation: Route operation (chat, sentiment, translation, ...)
+            model: Model the call ran on
+            latency: Seconds from the first attempt to the final outcome
+            success: Whether the call returned a completion
+            prompt_tokens: Prompt tokens reported by the backend
+            completion_tokens: Completion tokens reported by the backend
+            retries: Attempts after the first one
+            error: The final error of a failed call
+        """
+        with self._lock:
+            stats = self._calls.setdefault(operation, {}).setdefault(model, {
+                "calls": 0,
+                "errors": 0,
+                "retries": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "error_reasons": {},
+                "latency": LatencyHistogram(),
+            })
+            stats["calls"] += 1
+            stats["retries"] += retries
+            stats["latency"].observe(latency)
+            if success:
+                stats["prompt_tokens"] += prompt_tokens or 0
+                stats["completion_tokens"] += completion_tokens or 0
+            else:
+                stats["errors"] += 1
+                reason = fallback_reason(error)
+                stats["error_reasons"][reason] = stats["error_reasons"].get(reason, 0) + 1
+
+        self._trace(not success, {
+            "type": "call",
+            "operation": operation,
+            "model": model,
+            "latency_ms": round(latency * 1000, 1),
+            "success": success,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "retries": retries,
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+        })
+
+    def record_cache(self, cache: str, hit: bool):
+        """Count a lookup in a cache that can save an LLM call (faq, answer_cache, ...)"""
+        with self._lock:
+            stats = self._caches.setdefault(cache, {"hits": 0, "misses": 0})
+            stats["hits" if hit else "misses"] += 1
+
+    def record_fallback(self, operation: str, reason: str, count: int = 1):
+        """Count responses served without the model, by reason"""
+        with self._lock:
+            reasons = self._fallbacks.setdefault(operation, {})
+            reasons[reason] = reasons.get(reason, 0) + count
+        self._trace(True, {"type": "fallback", "operation": operation, "reason": reason, "count": count})
+
+    def _trace(self, always: bool, record: Dict[str, Any]):
+        """Queue a trace record for the writer thread (sampled unless `always`)"""
+        if self._writer is None or (not always and random.random() >= self.sample_rate):
+            return
+        record["timestamp"] = time.time()
+        try:
+            self._trace_queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._trace_stats["dropped"] += 1
+
+    def _write_traces(self):
+        """Append queued trace records to the trace log, batching whatever is waiting"""
+        while True:
+            batch = [self._trace_queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._trace_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.trace_path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(record, default=str) + "\n" for record in batch))
+                with self._lock:
+                    self._trace_stats["written"] += len(batch)
+            except OSError as e:
+                logger.error(f"Could not write LLM trace log {self.trace_path}: {str(e)}")
+                with self._lock:
+                    self._trace_stats["errors"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Aggregated calls per operation and model, cache hit rates, fallback reasons"""
+        with self._lock:
+            calls = {}
+            for operation, models in self._calls.items():
+                calls[operation] = {}
+                for model, stats in models.items():
+                    entry = {key: value for key, value in stats.items() if key != "latency"}
+                    entry["error_reasons"] = dict(stats["error_reasons"])
+                    entry["error_rate"] = stats["errors"] / stats["calls"] if stats["calls"] else 0.0
+                    entry["latency"] = stats["latency"].to_dict()
+                    calls[operation][model] = entry
+
+            caches = {}
+            for cache, stats in self._caches.items():
+                lookups = stats["hits"] + stats["misses"]
+                caches[cache] = dict(stats, hit_rate=stats["hits"] / lookups if lookups else 0.0)
+
+            fallbacks = {operation: dict(reasons) for operation, reasons in self._fallbacks.items()}
+            trace = dict(self._trace_stats, enabled=self._writer is not None, path=self.trace_path or None,
+                         sample_rate=self.sample_rate, queued=self._trace_queue.qsize())
+
+        return {
+            "since": self.started_at,
+            "calls": calls,
+            "caches": caches,
+            "fallbacks": fallbacks,
+            "trace": trace,
+        }
+
+
+# Create a singleton instance for easy import
+llm_metrics = LLMMetrics()
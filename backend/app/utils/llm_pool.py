@@ -0,0 +1,395 @@
+import os
+import json
+import time
+import logging
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from app.utils.retry import retry_after_of, status_code_of
+
+# The Groq SDK is used for "groq" backends; OpenAI-compatible backends only need httpx
+GROQ_AVAILABLE = True
+try:
+    from groq import Groq
+except ImportError:
+    GROQ_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures that take a backend out of rotation, and for how long
+FAILURE_THRESHOLD = int(os.getenv("LLM_BACKEND_FAILURE_THRESHOLD", "3"))
+COOLDOWN_SECONDS = float(os.getenv("LLM_BACKEND_COOLDOWN_SECONDS", "30"))
+# Rejected credentials won't fix themselves quickly
+AUTH_COOLDOWN_SECONDS = float(os.getenv("LLM_BACKEND_AUTH_COOLDOWN_SECONDS", "600"))
+# Longest wait for a free slot when every backend is at its concurrency limit
+SLOT_WAIT_SECONDS = float(os.getenv("LLM_BACKEND_SLOT_WAIT_SECONDS", "30"))
+DEFAULT_MAX_CONCURRENCY = 8
+# Weight of the newest latency sample in the moving average
+LATENCY_SMOOTHING = 0.2
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+# Request errors that would fail the same way on every backend
+NO_FAILOVER_STATUSES = (400, 413, 422)
+AUTH_STATUSES = (401, 403)
+
+
+class BackendError(Exception):
+    """HTTP error from an OpenAI-compatible backend (carries status_code and response for the retry policy)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, response: Optional[httpx.Response] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+class BackendBusy(TimeoutError):
+    """Every eligible backend stayed at its concurrency limit"""
+
+
+def to_namespace(value: Any) -> Any:
+    """JSON response as nested attribute objects, shaped like the SDK's response types"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [to_namespace(item) for item in value]
+    return value
+
+
+class LLMBackend:
+    """One configured endpoint: a Groq API key or an OpenAI-compatible server
+
+    Tracks its own health (moving-average latency, consecutive failures and a
+    cooldown after repeated failures) and caps concurrent requests.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: {'name', 'type' ('groq' or 'openai'), 'base_url', 'api_key' or
+                'api_key_env', 'max_concurrency', 'models' (served model names;
+                all when omitted), 'model_map' (route model -> backend model,
+                '*' for any), 'timeout'}
+        """
+        self.name = config.get("name") or config.get("base_url") or "groq"
+        self.type = config.get("type", "openai")
+        self.base_url = (config.get("base_url") or GROQ_BASE_URL).rstrip("/")
+        self.api_key = config.get("api_key") or os.getenv(config.get("api_key_env", ""), "")
+        self.models = set(config["models"]) if config.get("models") else None
+        self.model_map = dict(config.get("model_map") or {})
+        self.timeout = float(config.get("timeout", 60.0))
+        self.max_concurrency = int(config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY))
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.unavailable_until = 0.0
+        self.stats = {"requests": 0, "failures": 0, "failovers_from": 0}
+        self.last_error: Optional[str] = None
+
+        self.client = None
+        if self.type == "groq":
+            if not GROQ_AVAILABLE:
+                raise RuntimeError("groq package not installed")
+            # Retries are handled by the caller's retry policy so they respect deadlines
+            self.client = Groq(api_key=self.api_key, max_retries=0)
+        else:
+            self.client = httpx.Client(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else {},
+                timeout=self.timeout
+            )
+
+    def serves(self, model: str) -> bool:
+        """Whether this backend can run a route model"""
+        if model in self.model_map or "*" in self.model_map:
+            return True
+        return self.models is None or model in self.models
+
+    def backend_model(self, model: str) -> str:
+        """Name of a route model on this backend"""
+        return self.model_map.get(model) or self.model_map.get("*") or model
+
+    def healthy(self, now: Optional[float] = None) -> bool:
+        return (now or time.monotonic()) >= self.unavailable_until
+
+    def score(self) -> float:
+        """Lower is better: expected latency, inflated by how busy the backend is and recent failures"""
+        latency = self.latency if self.latency is not None else 0.0
+        return latency * (1.0 + self.in_flight / self.max_concurrency) + self.in_flight * 0.001 + self.consecutive_failures
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take a concurrency slot (immediately when timeout is None)"""
+        acquired = self._slots.acquire(blocking=False) if timeout is None else self._slots.acquire(timeout=max(timeout, 0.0))
+        if acquired:
+            with self._lock:
+                self.in_flight += 1
+        return acquired
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def record_success(self, elapsed: float):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.consecutive_failures = 0
+            self.unavailable_until = 0.0
+            self.latency = elapsed if self.latency is None else (
+                LATENCY_SMOOTHING * elapsed + (1 - LATENCY_SMOOTHING) * self.latency
+            )
+
+    def record_failure(self, error: BaseException):
+        status = status_code_of(error)
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["failures"] += 1
+            self.consecutive_failures += 1
+            self.last_error = f"{type(error).__name__}: {str(error)[:200]}"
+            if status in AUTH_STATUSES:
+                self.unavailable_until = time.monotonic() + AUTH_COOLDOWN_SECONDS
+            elif self.consecutive_failures >= FAILURE_THRESHOLD:
+                cooldown = max(COOLDOWN_SECONDS, retry_after_of(error) or 0.0)
+                self.unavailable_until = time.monotonic() + cooldown
+                logger.warning(f"LLM backend {self.name} out of rotation for {cooldown:.0f}s after {self.consecutive_failures} failures")
+
+    def suspend(self, seconds: float):
+        """Take the backend out of rotation for at least `seconds`"""
+        with self._lock:
+            self.unavailable_until = max(self.unavailable_until, time.monotonic() + seconds)
+
+    def create(self, model: str, messages: List[Dict[str, str]], stream: bool = False, timeout: Optional[float] = None, **options) -> Any:
+        """Chat completion on this backend; same call shape and response shape as the Groq SDK"""
+        model = self.backend_model(model)
+        if self.type == "groq":
+            kwargs = {"timeout": timeout} if timeout is not None else {}
+            return self.client.chat.completions.create(model=model, messages=messages, stream=stream, **options, **kwargs)
+
+        payload = dict(options, model=model, messages=messages, stream=stream)
+        payload = {key: value for key, value in payload.items() if value is not None}
+        request_timeout = timeout if timeout is not None else self.timeout
+        if stream:
+            return self._stream(payload, request_timeout)
+        try:
+            response = self.client.post("/chat/completions", json=payload, timeout=request_timeout)
+        except httpx.TimeoutException as e:
+            raise TimeoutError(f"{self.name} timed out: {str(e)}")
+        self._raise_for_status(response)
+        return to_namespace(response.json())
+
+    def _stream(self, payload: Dict[str, Any], timeout: float) -> Iterator[Any]:
+        """Server-sent completion chunks, opened eagerly so connection errors surface here"""
+        request = self.client.build_request("POST", "/chat/completions", json=payload, timeout=timeout)
+        response = self.client.send(request, stream=True)
+        if response.status_code >= 400:
+            response.read()
+            response.close()
+            self._raise_for_status(response)
+
+        def chunks():
+            try:
+                for line in response.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    yield to_namespace(json.loads(data))
+            finally:
+                response.close()
+
+        return chunks()
+
+    def _raise_for_status(self, response: httpx.Response):
+        if response.status_code < 400:
+            return
+        try:
+            detail = response.json().get("error", {})
+            message = detail.get("message") if isinstance(detail, dict) else str(detail)
+        except (ValueError, AttributeError):
+            message = response.text[:200]
+        raise BackendError(f"{self.name} returned {response.status_code}: {message}", response.status_code, response)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({
+                "type": self.type,
+                "base_url": self.base_url,
+                "healthy": self.healthy(now),
+                "unavailable_for_seconds": max(0.0, self.unavailable_until - now),
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "latency_ms": self.latency * 1000 if self.latency is not None else None,
+                "consecutive_failures": self.consecutive_failures,
+                "last_error": self.last_error,
+            })
+        return stats
+
+
+def load_backend_configs() -> List[Dict[str, Any]]:
+    """
+    Backend list from the environment
+
+    LLM_BACKENDS_FILE points at a JSON file and LLM_BACKENDS holds inline JSON,
+    each a list of backend configs (see LLMBackend). Without either, one Groq
+    backend is configured per key in GROQ_API_KEY and GROQ_API_KEYS
+    (comma-separated extra keys).
+    """
+    configs: List[Dict[str, Any]] = []
+    backends_file = os.getenv("LLM_BACKENDS_FILE")
+    if backends_file:
+        try:
+            with open(backends_file) as f:
+                configs.extend(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Could not load LLM backends from {backends_file}: {str(e)}")
+    try:
+        configs.extend(json.loads(os.getenv("LLM_BACKENDS", "[]")))
+    except json.JSONDecodeError:
+        logger.error("LLM_BACKENDS is not valid JSON; ignoring it")
+    if configs:
+        return configs
+
+    keys = [os.getenv("GROQ_API_KEY", "")] + os.getenv("GROQ_API_KEYS", "").split(",")
+    keys = [key.strip() for key in keys if key.strip()]
+    return [
+        {"name": f"groq-{position + 1}", "type": "groq", "api_key": key}
+        for position, key in enumerate(dict.fromkeys(keys))
+    ]
+
+
+class LLMPool:
+    """Pick a healthy, fast, not-too-busy backend for each completion and fail over on errors
+
+    Backends are ordered by moving-average latency weighted by their current
+    load. A request goes to the first one with a free concurrency slot (or
+    waits for the best one when all are busy). On a backend error the next
+    backend is tried; backends that keep failing sit out a cooldown, and
+    rejected credentials sit out longer. Errors in the request itself
+    (400/413/422) are raised without failover.
+    """
+
+    def __init__(self, configs: Optional[List[Dict[str, Any]]] = None):
+        self.backends: List[LLMBackend] = []
+        for config in (configs if configs is not None else load_backend_configs()):
+            try:
+                self.backends.append(LLMBackend(config))
+            except Exception as e:
+                logger.error(f"LLM backend {config.get('name', config.get('base_url'))} not configured: {str(e)}")
+        self._lock = threading.Lock()
+        self.failovers = 0
+
+    def available(self) -> bool:
+        """Whether any backend is currently in rotation"""
+        now = time.monotonic()
+        return any(backend.healthy(now) for backend in self.backends)
+
+    def candidates(self, model: str) -> List[LLMBackend]:
+        """Backends that serve a model, best first; out-of-rotation ones only if nothing else is left"""
+        serving = [backend for backend in self.backends if backend.serves(model)]
+        now = time.monotonic()
+        healthy = sorted((backend for backend in serving if backend.healthy(now)), key=lambda backend: backend.score())
+        return healthy or sorted(serving, key=lambda backend: backend.unavailable_until)
+
+    def create_completion(self, model: str, messages: List[Dict[str, str]], timeout: Optional[float] = None, **options) -> Any:
+        """
+        Run a chat completion on the best available backend
+
+        Args:
+            model: Route model name (mapped per backend)
+            messages: Chat messages
+            timeout: Seconds left for the whole call, including failover
+            options: temperature, max_completion_tokens, stream, ...
+
+        Raises:
+            The last backend's error when every backend failed, BackendBusy when
+            none had a free slot in time, RuntimeError when none serves the model
+        """
+        candidates = self.candidates(model)
+        if not candidates:
+            raise RuntimeError(f"No LLM backend configured for model {model}")
+
+        end = time.monotonic() + timeout if timeout is not None else None
+        remaining = list(candidates)
+        last_error: Optional[BaseException] = None
+        while remaining:
+            backend = next((candidate for candidate in remaining if candidate.acquire()), None)
+            if backend is None:
+                # Everyone is busy: queue on the best one
+                backend = remaining[0]
+                wait = SLOT_WAIT_SECONDS if end is None else min(SLOT_WAIT_SECONDS, end - time.monotonic())
+                if not backend.acquire(wait):
+                    raise last_error or BackendBusy(f"All LLM backends for {model} are at their concurrency limit")
+            remaining.remove(backend)
+
+            left = None if end is None else end - time.monotonic()
+            if left is not None and left <= 0:
+                backend.release()
+                break
+
+            start = time.monotonic()
+            try:
+                response = backend.create(model, messages, timeout=left, **options)
+            except Exception as e:
+                backend.release()
+                if status_code_of(e) in NO_FAILOVER_STATUSES:
+                    raise
+                backend.record_failure(e)
+                last_error = e
+                if remaining:
+                    with self._lock:
+                        self.failovers += 1
+                    backend.stats["failovers_from"] += 1
+                    logger.warning(f"LLM backend {backend.name} failed ({str(e)}); failing over")
+                continue
+
+            # A stream only holds its slot while it is being opened
+            backend.release()
+            backend.record_success(time.monotonic() - start)
+            return response
+
+        raise last_error or TimeoutError(f"No time left for an LLM call on {model}")
+
+    def probe(self, model: str) -> Dict[str, Optional[BaseException]]:
+        """
+        Send a minimal request to every backend serving a model
+
+        Backends that fail sit out a cooldown. Returns backend name -> error
+        (None when the backend answered).
+        """
+        results: Dict[str, Optional[BaseException]] = {}
+        for backend in self.backends:
+            if not backend.serves(model):
+                continue
+            start = time.monotonic()
+            try:
+                backend.create(
+                    model,
+                    [{"role": "system", "content": "You are a helpful assistant."}, {"role": "user", "content": "Hello"}],
+                    max_completion_tokens=5
+                )
+                backend.record_success(time.monotonic() - start)
+                results[backend.name] = None
+            except Exception as e:
+                backend.record_failure(e)
+                backend.suspend(COOLDOWN_SECONDS)
+                results[backend.name] = e
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-backend health, latency and load"""
+        return {
+            "failovers": self.failovers,
+            "backends": {backend.name: backend.get_stats() for backend in self.backends},
+        }
+
+
+# Create a singleton instance for easy import
+llm_pool = LLMPool()
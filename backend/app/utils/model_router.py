@@ -0,0 +1,197 @@
+import os
+import json
+import copy
+import logging
+import threading
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Groq models, smallest/fastest first
+FAST_MODEL = "llama-3.1-8b-instant"
+LARGE_MODEL = "llama-3.3-70b-versatile"
+
+# Default routing table: operation -> model, completion cap, time budget and fallbacks.
+# Routes with short_input_tokens send inputs at or below that size to short_model,
+# limited to short_languages when set (the small model is weaker on African languages).
+DEFAULT_ROUTES = {
+    "chat": {
+        "model": LARGE_MODEL,
+        "max_tokens": 1024,
+        "timeout": 10.0,
+        "fallbacks": [FAST_MODEL],
+    },
+    "sentiment": {
+        "model": FAST_MODEL,
+        "max_tokens": 100,
+        "timeout": 5.0,
+        "fallbacks": [],
+    },
+    "entities": {
+        "model": LARGE_MODEL,
+        "max_tokens": 500,
+        "timeout": 8.0,
+        "fallbacks": [FAST_MODEL],
+        "short_input_tokens": 256,
+        "short_model": FAST_MODEL,
+        "short_languages": ["en", "fr"],
+    },
+    "keywords": {
+        "model": FAST_MODEL,
+        "max_tokens": 300,
+        "timeout": 5.0,
+        "fallbacks": [],
+    },
+    "analysis": {
+        "model": LARGE_MODEL,
+        "max_tokens": 500,
+        "timeout": 8.0,
+        "fallbacks": [FAST_MODEL],
+        "short_input_tokens": 256,
+        "short_model": FAST_MODEL,
+        "short_languages": ["en", "fr"],
+    },
+    "batch_analysis": {
+        "model": FAST_MODEL,
+        "max_tokens": 8192,
+        "timeout": 30.0,
+        "fallbacks": [LARGE_MODEL],
+    },
+    "translation": {
+        "model": LARGE_MODEL,
+        "max_tokens": 1024,
+        "timeout": 15.0,
+        "fallbacks": [FAST_MODEL],
+    },
+    "batch_translation": {
+        "model": LARGE_MODEL,
+        "max_tokens": 8192,
+        "timeout": 45.0,
+        "fallbacks": [FAST_MODEL],
+    },
+}
+
+
+def load_routes() -> Dict[str, Dict[str, Any]]:
+    """
+    Default routes merged with overrides from the environment
+
+    GROQ_MODEL_ROUTES_FILE points at a JSON file and GROQ_MODEL_ROUTES holds
+    inline JSON; both map operation names to (partial) route settings.
+    """
+    routes = copy.deepcopy(DEFAULT_ROUTES)
+    overrides = []
+
+    routes_file = os.getenv("GROQ_MODEL_ROUTES_FILE")
+    if routes_file:
+        try:
+            with open(routes_file) as f:
+                overrides.append(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Could not load model routes from {routes_file}: {str(e)}")
+
+    try:
+        overrides.append(json.loads(os.getenv("GROQ_MODEL_ROUTES", "{}")))
+    except json.JSONDecodeError:
+        logger.error("GROQ_MODEL_ROUTES is not valid JSON; ignoring it")
+
+    # Inline settings are applied after the file's, key by key
+    for override in overrides:
+        for operation, settings in override.items():
+            routes.setdefault(operation, {}).update(settings)
+    return routes
+
+
+class ModelRouter:
+    """Pick the model, completion cap and time budget for each operation"""
+
+    def __init__(self, routes: Optional[Dict[str, Dict[str, Any]]] = None, default_operation: str = "chat"):
+        self.routes = routes if routes is not None else load_routes()
+        self.default_operation = default_operation
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    def model_for(self, operation: str) -> str:
+        """Primary model configured for an operation"""
+        return self._route_config(operation)["model"]
+
+    def _route_config(self, operation: str) -> Dict[str, Any]:
+        return self.routes.get(operation) or self.routes[self.default_operation]
+
+    def route(self, operation: str, input_tokens: int = 0, language: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Resolve the route for one call
+
+        Args:
+            operation: Operation name (chat, sentiment, entities, translation, ...)
+            input_tokens: Size of the input, used for short-input routing
+            language: Language code of the input, checked against short_languages
+
+        Returns:
+            Dictionary with 'operation', 'models' (primary first, then fallbacks),
+            'max_tokens' and 'timeout'
+        """
+        config = self._route_config(operation)
+        primary = config["model"]
+        short_limit = config.get("short_input_tokens")
+        short_languages = config.get("short_languages")
+        language_allowed = not short_languages or language is None or language in short_languages
+        if short_limit and config.get("short_model") and input_tokens <= short_limit and language_allowed:
+            primary = config["short_model"]
+
+        models = [primary]
+        for model in [config["model"]] + list(config.get("fallbacks", [])):
+            if model not in models:
+                models.append(model)
+
+        return {
+            "operation": operation if operation in self.routes else self.default_operation,
+            "models": models,
+            "max_tokens": int(config.get("max_tokens", 1024)),
+            "timeout": float(config.get("timeout", 10.0)),
+        }
+
+    def record(
+        self,
+        operation: str,
+        model: str,
+        latency: float,
+        success: bool,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        fallback: bool = False
+    ):
+        """Add one upstream call to the per-route, per-model counters"""
+        with self._lock:
+            stats = self._stats.setdefault(operation, {}).setdefault(model, {
+                "calls": 0,
+                "errors": 0,
+                "fallback_calls": 0,
+                "total_latency": 0.0,
+                "max_latency": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+            })
+            stats["calls"] += 1
+            if not success:
+                stats["errors"] += 1
+            if fallback:
+                stats["fallback_calls"] += 1
+            stats["total_latency"] += latency
+            stats["max_latency"] = max(stats["max_latency"], latency)
+            stats["prompt_tokens"] += prompt_tokens or 0
+            stats["completion_tokens"] += completion_tokens or 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-route latency and token counters, plus the active routing table"""
+        with self._lock:
+            usage = {}
+            for operation, models in self._stats.items():
+                usage[operation] = {}
+                for model, stats in models.items():
+                    entry = dict(stats)
+                    entry["average_latency"] = stats["total_latency"] / stats["calls"] if stats["calls"] else 0.0
+                    successful = stats["calls"] - stats["errors"]
+                    entry["average_completion_tokens"] = stats["completion_tokens"] / successful if successful else 0.0
+                    usage[operation][model] = entry
+            return {"routes": copy.deepcopy(self.routes), "usage": usage}
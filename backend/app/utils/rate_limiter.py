@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Account quota defaults (per model); override per model with GROQ_RATE_LIMITS, e.g.
+# {"llama-3.1-8b-instant": {"requests_per_minute": 30, "tokens_per_minute": 6000}}
+DEFAULT_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+DEFAULT_TOKENS_PER_MINUTE = float(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))
+# Seconds of quota that may be spent in a single burst
+BURST_SECONDS = float(os.getenv("GROQ_RATE_BURST_SECONDS", "30"))
+# Longest a caller without its own deadline will queue
+DEFAULT_MAX_WAIT = float(os.getenv("GROQ_RATE_MAX_WAIT", "30"))
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to wait past its deadline for quota"""
+
+    def __init__(self, model: str, expected_wait: float):
+        self.model = model
+        self.expected_wait = expected_wait
+        super().__init__(f"Rate limit for {model} needs {expected_wait:.2f}s of queueing, beyond the caller's deadline")
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking
+
+    Reservations may drive the balance negative; the returned wait is how long
+    the caller must sleep before its share of the quota has accrued. Because
+    reservations are taken in arrival order, callers are served first come,
+    first served. Not thread-safe on its own; callers hold a lock.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        # now may predate updated when the bucket was created after the caller read the clock
+        if now <= self.updated:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def expected_wait(self, amount: float, now: float) -> float:
+        """Seconds until amount tokens would be available"""
+        self._refill(now)
+        deficit = amount - self.tokens
+        return max(0.0, deficit / self.rate)
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount tokens (possibly on credit) and return the wait before use"""
+        wait = self.expected_wait(amount, now)
+        self.tokens -= amount
+        return wait
+
+    def refund(self, amount: float):
+        """Give back tokens that were reserved but not used"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ModelRateLimiter:
+    """Client-side requests/min and tokens/min limiter with one queue per model"""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None):
+        if limits is None:
+            try:
+                limits = json.loads(os.getenv("GROQ_RATE_LIMITS", "{}"))
+            except json.JSONDecodeError:
+                logger.error("GROQ_RATE_LIMITS is not valid JSON; using default limits")
+                limits = {}
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _model_state(self, model: str):
+        """Buckets and counters for a model, created on first use (lock held)"""
+        if model not in self._buckets:
+            limit = self.limits.get(model, {})
+            rpm = float(limit.get("requests_per_minute", DEFAULT_REQUESTS_PER_MINUTE))
+            tpm = float(limit.get("tokens_per_minute", DEFAULT_TOKENS_PER_MINUTE))
+            self._buckets[model] = {
+                "requests": TokenBucket(rpm / 60.0, max(1.0, rpm * BURST_SECONDS / 60.0)),
+                "tokens": TokenBucket(tpm / 60.0, max(1.0, tpm * BURST_SECONDS / 60.0)),
+            }
+            self._stats[model] = {
+                "granted": 0,
+                "rejected": 0,
+                "waiting": 0,
+                "total_wait": 0.0,
+                "max_wait": 0.0,
+                "tokens_reserved": 0,
+                "tokens_refunded": 0,
+            }
+        return self._buckets[model], self._stats[model]
+
+    def acquire(self, model: str, tokens: int, deadline: Optional[float] = None) -> float:
+        """
+        Wait for quota to make one request of about `tokens` tokens
+
+        Args:
+            model: Model the request is for (each model has its own quota)
+            tokens: Estimated prompt plus completion tokens
+            deadline: time.monotonic() value the call must start by
+
+        Returns:
+            Seconds spent queueing
+
+        Raises:
+            RateLimitExceeded: If the expected wait would pass the deadline; no
+                quota is consumed in that case
+        """
+        now = time.monotonic()
+        if deadline is None:
+            deadline = now + DEFAULT_MAX_WAIT
+
+        with self._lock:
+            buckets, stats = self._model_state(model)
+            # A single request larger than the burst size is clamped so it can ever run
+            tokens = min(tokens, buckets["tokens"].capacity)
+            wait = max(
+                buckets["requests"].expected_wait(1, now),
+                buckets["tokens"].expected_wait(tokens, now),
+            )
+            if now + wait > deadline:
+                stats["rejected"] += 1
+                raise RateLimitExceeded(model, wait)
+
+            buckets["requests"].reserve(1, now)
+            buckets["tokens"].reserve(tokens, now)
+            stats["granted"] += 1
+            stats["tokens_reserved"] += tokens
+            stats["total_wait"] += wait
+            stats["max_wait"] = max(stats["max_wait"], wait)
+            if wait > 0:
+                stats["waiting"] += 1
+
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    stats["waiting"] -= 1
+        return wait
+
+    def settle(self, model: str, reserved_tokens: int, used_tokens: Optional[int]):
+        """Refund the difference when a call used fewer tokens than reserved"""
+        if used_tokens is None or used_tokens >= reserved_tokens:
+            return
+        with self._lock:
+            buckets, stats = self._model_state(model)
+            refund = reserved_tokens - used_tokens
+            buckets["tokens"].refund(refund)
+            stats["tokens_refunded"] += refund
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-model queueing counters and current bucket levels"""
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for model, buckets in self._buckets.items():
+                stats = dict(self._stats[model])
+                stats["average_wait"] = stats["total_wait"] / stats["granted"] if stats["granted"] else 0.0
+                for name, bucket in buckets.items():
+                    level = bucket.tokens + (now - bucket.updated) * bucket.rate
+                    stats[f"{name}_available"] = round(min(bucket.capacity, level), 2)
+                result[model] = stats
+            return result
@@ -0,0 +1,201 @@
+import os
+import time
+import random
+import socket
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Iterable, Optional
+
+# httpx is what the Groq SDK uses under the hood; its transport errors are transient
+HTTPX_AVAILABLE = True
+try:
+    import httpx
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying for idempotent calls
+TRANSIENT_STATUS_CODES = (408, 425, 429, 500, 502, 503, 504)
+
+# Exception class names raised by SDKs for connection-level failures
+TRANSIENT_ERROR_NAMES = ("APIConnectionError", "APITimeoutError", "ConnectTimeout", "ConnectionError")
+
+# Exception class names (httpx, requests, urllib3) for failures to open a
+# connection, where the request cannot have reached the server
+CONNECT_ERROR_NAMES = ("ConnectError", "ConnectTimeout", "ConnectTimeoutError", "NewConnectionError", "NameResolutionError")
+
+
+def deadline_after(seconds: Optional[float]) -> Optional[float]:
+    """Absolute time.monotonic() deadline `seconds` from now (None for no deadline)"""
+    if seconds is None:
+        return None
+    return time.monotonic() + seconds
+
+
+def time_remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left before deadline (None when there is no deadline)"""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def status_code_of(error: BaseException) -> Optional[int]:
+    """HTTP status carried by an SDK exception, if any (Groq: status_code, Twilio: status)"""
+    for attribute in ("status_code", "status"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_connect_error(error: BaseException, depth: int = 0) -> bool:
+    """
+    Whether an error happened while opening the connection, before any request was sent
+
+    SDKs wrap the underlying error (requests wraps urllib3's, which wraps the
+    socket's), so the cause chain, args and `reason` are searched as well.
+    """
+    if isinstance(error, (ConnectionRefusedError, socket.gaierror)):
+        return True
+    if any(cls.__name__ in CONNECT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    if depth >= 4:
+        return False
+    nested = [error.__cause__, error.__context__, getattr(error, "reason", None)]
+    nested.extend(arg for arg in getattr(error, "args", ()) if isinstance(arg, BaseException))
+    return any(
+        isinstance(inner, BaseException) and inner is not error and is_connect_error(inner, depth + 1)
+        for inner in nested
+    )
+
+
+def retry_after_of(error: BaseException) -> Optional[float]:
+    """Seconds requested by a Retry-After header on the error's response, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter, bounded by a caller deadline"""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 4.0,
+        retryable_statuses: Iterable[int] = TRANSIENT_STATUS_CODES,
+        retry_connection_errors: bool = True,
+        connect_errors_only: bool = False
+    ):
+        """
+        Args:
+            max_attempts: Total attempts including the first one
+            base_delay: Backoff before the first retry (doubles each attempt)
+            max_delay: Upper bound on a single backoff
+            retryable_statuses: HTTP statuses that are retried
+            retry_connection_errors: Whether connection/timeout errors are retried
+            connect_errors_only: Only retry connection errors raised before the
+                request was sent, for calls that aren't safe to repeat
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable_statuses = set(retryable_statuses)
+        self.retry_connection_errors = retry_connection_errors
+        self.connect_errors_only = connect_errors_only
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Whether an error is transient under this policy"""
+        status = status_code_of(error)
+        if status is not None:
+            return status in self.retryable_statuses
+        if not self.retry_connection_errors:
+            return False
+        if self.connect_errors_only:
+            return is_connect_error(error)
+        if isinstance(error, (ConnectionError, TimeoutError)):
+            return True
+        if HTTPX_AVAILABLE and isinstance(error, httpx.TransportError):
+            return True
+        return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+    def backoff(self, attempt: int) -> float:
+        """Jittered delay before retry number `attempt` (1-based)"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    def call(
+        self,
+        fn: Callable[[Optional[float]], Any],
+        deadline: Optional[float] = None,
+        description: str = "upstream call"
+    ) -> Any:
+        """
+        Call fn until it succeeds, fails permanently, or time runs out
+
+        Args:
+            fn: Called with the seconds left before the deadline (or None), which
+                it should use as its own request timeout
+            deadline: time.monotonic() value after which no attempt is started
+            description: Label used in log messages
+
+        Returns:
+            The first successful result of fn
+
+        Raises:
+            The last error when it isn't retryable, attempts are exhausted, or the
+            next backoff would overrun the deadline
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return fn(time_remaining(deadline))
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.is_retryable(e):
+                    raise
+
+                delay = self.backoff(attempt)
+                retry_after = retry_after_of(e)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+
+                remaining = time_remaining(deadline)
+                if remaining is not None and delay >= remaining:
+                    logger.warning(f"{description} failed ({str(e)}); no time left in the deadline to retry")
+                    raise
+
+                logger.warning(f"{description} failed ({str(e)}); retry {attempt} of {self.max_attempts - 1} in {delay:.2f}s")
+                time.sleep(delay)
+
+
+# Shared policies; Twilio message creation is not idempotent, so only retry
+# failures where Twilio rejected the request before accepting it, or where the
+# connection could not be opened at all (a dropped or timed-out request may
+# already have sent the message)
+groq_retry_policy = RetryPolicy(
+    max_attempts=int(os.getenv("GROQ_MAX_ATTEMPTS", "3")),
+    base_delay=float(os.getenv("GROQ_RETRY_BASE_DELAY", "0.2")),
+    max_delay=float(os.getenv("GROQ_RETRY_MAX_DELAY", "4.0")),
+)
+twilio_retry_policy = RetryPolicy(
+    max_attempts=int(os.getenv("TWILIO_MAX_ATTEMPTS", "3")),
+    base_delay=float(os.getenv("TWILIO_RETRY_BASE_DELAY", "0.5")),
+    max_delay=float(os.getenv("TWILIO_RETRY_MAX_DELAY", "8.0")),
+    retryable_statuses=(429, 503),
+    connect_errors_only=True,
+)
@@ -0,0 +1,158 @@
+import re
+import json
+import logging
+from itertools import repeat
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Lexicons ship with the backend in data/lexicons
+LEXICON_PATH = Path(__file__).resolve().parent.parent.parent / "data" / "lexicons" / "sentiment.json"
+
+# Words (with internal apostrophes, e.g. "don't", "n'est", "pang'onopang'ono")
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*")
+
+# How many preceding tokens a negator reaches ("is not very good")
+NEGATION_WINDOW = 3
+# Negated words flip sign and lose some strength ("not bad" is milder than "good")
+NEGATION_FACTOR = -0.75
+
+
+class SentimentEngine:
+    """Offline lexicon-based sentiment scoring for English, French, Swahili and Chichewa
+
+    Lexicons are compiled once into a vocabulary index and NumPy arrays of word
+    polarity, negator flags and intensifier multipliers. Scoring a batch maps
+    every token to an index in a single pass, then computes negation windows,
+    intensifiers and per-text sums with vectorised array operations.
+    """
+
+    def __init__(self, lexicon_path: Path = LEXICON_PATH):
+        self.lexicon_path = lexicon_path
+        self.load(lexicon_path)
+
+    def load(self, lexicon_path: Path):
+        """Compile a lexicon file into the vocabulary index and weight arrays"""
+        with open(lexicon_path, encoding="utf-8") as f:
+            lexicon = json.load(f)
+
+        polarity = {}
+        for language, words in lexicon.get("languages", {}).items():
+            for word, weight in words.items():
+                # First language wins when the same spelling appears twice
+                polarity.setdefault(word.casefold(), float(weight))
+        negators = {word.casefold() for word in lexicon.get("negators", [])}
+        intensifiers = {word.casefold(): float(value) for word, value in lexicon.get("intensifiers", {}).items()}
+
+        # Index 0 is reserved for out-of-vocabulary tokens
+        vocabulary = {}
+        for word in sorted(set(polarity) | negators | set(intensifiers)):
+            for spelling in {word, word.replace("'", "’")}:
+                vocabulary[spelling] = len(vocabulary) + 1
+
+        size = len(vocabulary) + 1
+        self.polarity = np.zeros(size, dtype=np.float64)
+        self.is_negator = np.zeros(size, dtype=np.int64)
+        self.boost = np.ones(size, dtype=np.float64)
+        for spelling, index in vocabulary.items():
+            word = spelling.replace("’", "'")
+            self.polarity[index] = polarity.get(word, 0.0)
+            self.is_negator[index] = 1 if word in negators else 0
+            self.boost[index] = intensifiers.get(word, 1.0)
+        self.vocabulary = vocabulary
+
+        calibration = lexicon.get("calibration", {})
+        self.alpha = float(calibration.get("alpha", 15.0))
+        self.slope = float(calibration.get("slope", 4.0))
+        self.intercept = float(calibration.get("intercept", 0.0))
+        self.neutral_threshold = float(calibration.get("neutral_threshold", 0.05))
+
+        logger.info(f"Sentiment lexicon loaded: {len(vocabulary)} entries from {lexicon_path}")
+
+    def tokenize(self, text: str) -> List[str]:
+        """Lowercased word tokens"""
+        return TOKEN_PATTERN.findall(text.casefold())
+
+    def score_batch(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Raw sentiment arrays for a batch of texts
+
+        Returns:
+            Dictionary of arrays (one entry per text): 'score' in [-1, 1],
+            'probability_positive' in [0, 1] and 'matches' (lexicon hits)
+        """
+        count = len(texts)
+        lookup = self.vocabulary.get
+        findall = TOKEN_PATTERN.findall
+
+        lengths = np.empty(count, dtype=np.int64)
+        token_ids = []
+        for position, text in enumerate(texts):
+            ids = list(map(lookup, findall(text.casefold()), repeat(0)))
+            lengths[position] = len(ids)
+            token_ids.extend(ids)
+
+        ids = np.fromiter(token_ids, dtype=np.int64, count=len(token_ids))
+        doc_ids = np.repeat(np.arange(count), lengths)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if count else np.zeros(0, dtype=np.int64)
+        positions = np.arange(len(ids))
+        doc_start = starts[doc_ids]
+
+        # Negators in the window before each token, never reaching into the previous text
+        negator_counts = np.concatenate(([0], np.cumsum(self.is_negator[ids])))
+        window_start = np.maximum(positions - NEGATION_WINDOW, doc_start)
+        negated = (negator_counts[positions] - negator_counts[window_start]) % 2 == 1
+
+        # Intensifier multiplier from the immediately preceding token
+        multiplier = np.ones(len(ids))
+        if len(ids) > 1:
+            previous_boost = self.boost[ids[:-1]]
+            has_previous = positions[1:] > doc_start[1:]
+            multiplier[1:] = np.where(has_previous, previous_boost, 1.0)
+
+        weights = self.polarity[ids]
+        contributions = weights * multiplier * np.where(negated, NEGATION_FACTOR, 1.0)
+
+        totals = np.bincount(doc_ids, weights=contributions, minlength=count)
+        matches = np.bincount(doc_ids, weights=(weights != 0), minlength=count)
+
+        # VADER-style normalisation into (-1, 1), then logistic calibration
+        score = totals / np.sqrt(totals * totals + self.alpha)
+        probability_positive = 1.0 / (1.0 + np.exp(-(self.slope * score + self.intercept)))
+        return {"score": score, "probability_positive": probability_positive, "matches": matches}
+
+    def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Sentiment label, confidence and score for each text"""
+        arrays = self.score_batch(texts)
+        results = []
+        for score, probability, matches in zip(
+            arrays["score"].tolist(),
+            arrays["probability_positive"].tolist(),
+            arrays["matches"].tolist()
+        ):
+            if matches == 0:
+                sentiment, confidence = "neutral", 0.5
+            elif score >= self.neutral_threshold:
+                sentiment, confidence = "positive", probability
+            elif score <= -self.neutral_threshold:
+                sentiment, confidence = "negative", 1.0 - probability
+            else:
+                sentiment, confidence = "neutral", 1.0 - abs(probability - 0.5) * 2
+            results.append({
+                "sentiment": sentiment,
+                "confidence": round(confidence, 4),
+                "score": round(score, 4),
+                "matched_terms": int(matches),
+            })
+        return results
+
+    def analyze(self, text: str) -> Dict[str, Any]:
+        """Sentiment for a single text"""
+        return self.analyze_batch([text])[0]
+
+
+# Create a singleton instance for easy import
+sentiment_engine = SentimentEngine()
@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """Collapse concurrent calls that share a key into one execution
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is still running wait for the leader and receive the same
+    result or exception. Once the call finishes the key is released, so later
+    callers trigger a fresh execution.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run fn once per key among concurrent callers
+
+        Args:
+            key: Identity of the call; equal keys share one execution
+            fn: Zero-argument callable doing the actual work
+            timeout: Maximum seconds a follower waits for the leader
+
+        Returns:
+            The result of fn (shared by all callers with the same key)
+
+        Raises:
+            Whatever fn raised, or concurrent.futures.TimeoutError when a
+            follower gives up waiting
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            if future is None:
+                future = Future()
+                self._calls[key] = future
+                self.executions += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            return future.result(timeout=timeout)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        """Number of keys currently being executed"""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters describing how much work was saved by coalescing"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": self.coalesced / self.calls if self.calls else 0.0,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,192 @@
+import os
+import logging
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple, Any
+
+# tiktoken gives accurate counts; without it we fall back to a character estimate
+TIKTOKEN_AVAILABLE = True
+try:
+    import tiktoken
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Groq-hosted models don't ship tiktoken encodings; cl100k_base is a close enough proxy
+DEFAULT_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+
+# Prompt token budget per model (context window minus room for the reply)
+DEFAULT_PROMPT_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "3000"))
+MODEL_PROMPT_BUDGETS = {
+    "meta-llama/llama-guard-4-12b": 3000,
+    "llama-3.1-8b-instant": 6000,
+    "llama-3.3-70b-versatile": 6000,
+}
+
+# Chat format overhead, following the OpenAI cookbook accounting
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+
+@lru_cache(maxsize=None)
+def get_encoder(encoding_name: str = DEFAULT_ENCODING):
+    """Load a tiktoken encoder once per process (None if unavailable)"""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        # Encodings are downloaded on first use, which fails on offline hosts
+        logger.warning(f"Could not load tiktoken encoding {encoding_name}: {str(e)}. Using estimates.")
+        return None
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Number of tokens in text (cached, since chat history is recounted every turn)"""
+    if not text:
+        return 0
+    encoder = get_encoder()
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoder = get_encoder()
+    if encoder is None:
+        # Mirror count_tokens' len // 4 + 1 estimate so the result fits
+        return text[:max_tokens * 4 - 1]
+    return encoder.decode(encoder.encode(text, disallowed_special=())[:max_tokens])
+
+
+class TokenBudgetManager:
+    """Fit chat histories into a per-model prompt token budget"""
+
+    def __init__(self, summary_share: float = 0.15, summary_line_tokens: int = 40):
+        """
+        Args:
+            summary_share: Fraction of the budget reserved for condensed older turns
+            summary_line_tokens: Maximum tokens kept from each condensed turn
+        """
+        self.summary_share = summary_share
+        self.summary_line_tokens = summary_line_tokens
+
+    def budget_for(self, model: Optional[str]) -> int:
+        """Prompt token budget for a model"""
+        return MODEL_PROMPT_BUDGETS.get(model, DEFAULT_PROMPT_BUDGET)
+
+    def count_message_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Prompt tokens for a list of chat messages, including format overhead"""
+        total = TOKENS_PER_REPLY
+        for msg in messages:
+            total += TOKENS_PER_MESSAGE + count_tokens(msg.get("content", ""))
+        return total
+
+    def fit_messages(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        model: Optional[str] = None,
+        budget: Optional[int] = None
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        Trim a conversation so the prompt fits the model's budget
+
+        The system prompt and the most recent turns are always kept. Older turns
+        that do not fit are condensed into a short summary message, and dropped
+        entirely if even the summary does not fit.
+
+        Args:
+            messages: Conversation turns, oldest first (system messages are ignored)
+            system_prompt: System prompt to prepend
+            model: Model the prompt is for (selects the budget)
+            budget: Explicit prompt token budget, overriding the model's
+
+        Returns:
+            Tuple of (messages to send, report with token counts)
+        """
+        budget = budget or self.budget_for(model)
+        turns = [msg for msg in messages if msg.get("role") != "system"]
+        system_messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+
+        remaining = budget - self.count_message_tokens(system_messages)
+
+        # When the whole history doesn't fit, hold back room for the condensed summary
+        reserve = 0
+        if self.count_message_tokens(turns) - TOKENS_PER_REPLY > remaining:
+            reserve = int(budget * self.summary_share)
+            remaining -= reserve
+
+        # Walk backwards keeping whole turns; the latest turn is kept even if it has to be cut
+        kept = []
+        for index in range(len(turns) - 1, -1, -1):
+            msg = turns[index]
+            cost = TOKENS_PER_MESSAGE + count_tokens(msg["content"])
+            if cost <= remaining:
+                kept.append(msg)
+                remaining -= cost
+            elif not kept:
+                content = truncate_to_tokens(msg["content"], max(remaining - TOKENS_PER_MESSAGE, 1))
+                kept.append({"role": msg["role"], "content": content})
+                remaining = 0
+                break
+            else:
+                break
+        kept.reverse()
+        older = turns[:len(turns) - len(kept)]
+
+        # Condense whatever didn't fit, newest lines first, within the summary allowance
+        summary_messages = []
+        if older:
+            allowance = remaining + reserve - TOKENS_PER_MESSAGE
+            summary = self.condense(older, allowance)
+            if summary:
+                summary_messages = [{"role": "system", "content": summary}]
+
+        fitted = system_messages + summary_messages + kept
+        report = {
+            "prompt_tokens": self.count_message_tokens(fitted),
+            "token_budget": budget,
+            "original_turns": len(turns),
+            "kept_turns": len(kept),
+            "condensed_turns": len(older) if summary_messages else 0,
+            "dropped_turns": 0 if summary_messages else len(older),
+        }
+        return fitted, report
+
+    def condense(self, turns: List[Dict[str, str]], max_tokens: int) -> str:
+        """
+        Compact summary of older turns, at most max_tokens long
+
+        Each turn becomes one clipped line; the most recent lines are preferred
+        when not all of them fit.
+        """
+        header = "Summary of earlier conversation:"
+        available = max_tokens - count_tokens(header)
+        if available <= 0:
+            return ""
+
+        lines = []
+        for msg in reversed(turns):
+            speaker = "User" if msg.get("role") == "user" else "Assistant"
+            content = " ".join(msg.get("content", "").split())
+            line = f"- {speaker}: {truncate_to_tokens(content, self.summary_line_tokens)}"
+            cost = count_tokens(line) + 1
+            if cost > available:
+                break
+            lines.append(line)
+            available -= cost
+
+        if not lines:
+            return ""
+        return "\n".join([header] + list(reversed(lines)))
+
+
+# Create a singleton instance for easy import
+token_budget = TokenBudgetManager()
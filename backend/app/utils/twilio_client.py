@@ -1,8 +1,14 @@
 from twilio.rest import Client
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 import logging
 
+from app.utils.rate_limiter import RateLimitExceeded, TokenBucket
+from app.utils.retry import twilio_retry_policy
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -10,6 +16,15 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Alternative Twilio API host, e.g. the local stand-in used by the benchmarks
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL")
+
+# Messages per second the account may send (shared by all sends from this
+# process, retries included), and up to one second of it in a burst
+TWILIO_MESSAGES_PER_SECOND = float(os.getenv("TWILIO_MESSAGES_PER_SECOND", "10"))
+# Messages of a bulk send in flight at once
+TWILIO_BULK_CONCURRENCY = int(os.getenv("TWILIO_BULK_CONCURRENCY", "8"))
+
 class TwilioClient:
     def __init__(self):
         self.account_sid = os.getenv("TWILIO_ACCOUNT_SID")
@@ -19,9 +34,15 @@ class TwilioClient:
         # Check if credentials are available
         self.is_configured = all([self.account_sid, self.auth_token, self.whatsapp_number])
         
+        # Account-wide send rate, so bulk sends can't trip Twilio's own limit
+        self.send_limiter = TokenBucket(TWILIO_MESSAGES_PER_SECOND, max(1.0, TWILIO_MESSAGES_PER_SECOND))
+        self._limiter_lock = threading.Lock()
+        
         if self.is_configured:
             try:
                 self.client = Client(self.account_sid, self.auth_token)
+                if TWILIO_API_BASE_URL:
+                    self.client.api.base_url = TWILIO_API_BASE_URL.rstrip("/")
                 logger.info("Twilio client initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Twilio client: {str(e)}")
@@ -29,22 +50,26 @@ class TwilioClient:
         else:
             logger.warning("Twilio credentials not found in environment variables")
     
-    def send_whatsapp_message(self, to_number, message_body):
+    def send_whatsapp_message(self, to_number, message_body, deadline=None):
         """
         Send a WhatsApp message using Twilio API
         
         Args:
             to_number (str): Recipient's WhatsApp number in format: +1234567890
             message_body (str): Message content
+            deadline (float, optional): time.monotonic() value after which no
+                retry is attempted
             
         Returns:
-            dict: Response with status and message
+            dict: Response with status and message; errors also say whether
+                sending again is safe and could succeed ('retryable')
         """
         if not self.is_configured:
             logger.warning("Twilio not configured. Message not sent.")
             return {
                 "status": "error",
-                "message": "Twilio not configured. Please set up Twilio credentials."
+                "message": "Twilio not configured. Please set up Twilio credentials.",
+                "retryable": False
             }
         
         try:
@@ -52,12 +77,16 @@ class TwilioClient:
             from_whatsapp = f"whatsapp:{self.whatsapp_number}"
             to_whatsapp = f"whatsapp:{to_number}"
             
-            # Send message
-            message = self.client.messages.create(
-                from_=from_whatsapp,
-                body=message_body,
-                to=to_whatsapp
-            )
+            def attempt(timeout):
+                self._wait_for_send_slot(deadline)
+                return self.client.messages.create(
+                    from_=from_whatsapp,
+                    body=message_body,
+                    to=to_whatsapp
+                )
+            
+            # Send message, retrying only when Twilio rejected it before accepting
+            message = twilio_retry_policy.call(attempt, deadline, f"WhatsApp message to {to_number}")
             
             logger.info(f"WhatsApp message sent successfully. SID: {message.sid}")
             return {
@@ -67,28 +96,83 @@ class TwilioClient:
             }
         except Exception as e:
             logger.error(f"Failed to send WhatsApp message: {str(e)}")
+            # Safe to send again only when the message certainly wasn't accepted:
+            # no send slot, a 429/503 rejection, or no connection. Other 4xx
+            # (invalid or unsubscribed number) won't succeed later, and a
+            # dropped connection or 5xx may already have sent it
             return {
                 "status": "error",
-                "message": f"Failed to send WhatsApp message: {str(e)}"
+                "message": f"Failed to send WhatsApp message: {str(e)}",
+                "retryable": isinstance(e, RateLimitExceeded) or twilio_retry_policy.is_retryable(e)
             }
     
-    def send_bulk_whatsapp_messages(self, numbers, message_body):
+    def _wait_for_send_slot(self, deadline=None):
+        """
+        Block until the account's send rate allows one more message
+        
+        Raises:
+            RateLimitExceeded: If the wait would pass the deadline; no slot is taken
+        """
+        now = time.monotonic()
+        with self._limiter_lock:
+            wait = self.send_limiter.expected_wait(1, now)
+            if deadline is not None and now + wait > deadline:
+                raise RateLimitExceeded("Twilio account", wait)
+            self.send_limiter.reserve(1, now)
+        if wait > 0:
+            time.sleep(wait)
+    
+    def send_bulk_whatsapp_messages(self, numbers, message_body, concurrency=None, on_result=None):
         """
         Send the same WhatsApp message to multiple recipients
         
+        Messages go out from a bounded pool of worker threads, paced by the
+        account's messages-per-second limit.
+        
         Args:
             numbers (list): List of recipient WhatsApp numbers
             message_body (str): Message content
+            concurrency (int, optional): Messages in flight at once
+                (TWILIO_BULK_CONCURRENCY by default)
+            on_result (callable, optional): Called with each
+                {"number", "result"} entry as soon as that message is done
             
         Returns:
-            list: List of responses for each recipient
+            dict: Counts of successful and failed messages, elapsed time and
+                throughput, and "results" with one entry per recipient in the
+                order given
         """
-        results = []
-        for number in numbers:
-            result = self.send_whatsapp_message(number, message_body)
-            results.append({"number": number, "result": result})
+        started = time.monotonic()
+        results = [None] * len(numbers)
+        successful = failed = 0
+        
+        workers = max(1, min(concurrency or TWILIO_BULK_CONCURRENCY, len(numbers)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whatsapp-bulk") as pool:
+            futures = {
+                pool.submit(self.send_whatsapp_message, number, message_body): index
+                for index, number in enumerate(numbers)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                entry = {"number": numbers[index], "result": future.result()}
+                results[index] = entry
+                if entry["result"]["status"] == "success":
+                    successful += 1
+                else:
+                    failed += 1
+                if on_result:
+                    on_result(entry)
         
-        return results
+        elapsed = time.monotonic() - started
+        logger.info(f"Bulk WhatsApp send: {successful} sent, {failed} failed in {elapsed:.1f}s")
+        return {
+            "total": len(numbers),
+            "successful": successful,
+            "failed": failed,
+            "elapsed_seconds": elapsed,
+            "messages_per_second": len(numbers) / elapsed if elapsed > 0 else None,
+            "results": results
+        }
 
 
 # Create a singleton instance
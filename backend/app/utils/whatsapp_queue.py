@@ -0,0 +1,179 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.utils.job_queue import PermanentJobError, job_queue
+from app.utils.llm_metrics import LatencyHistogram
+from app.utils.twilio_client import twilio_client
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_DB_PATH = os.getenv("WHATSAPP_DB_PATH", str(Path(__file__).resolve().parent.parent.parent / "data" / "synapseiq.db"))
+# How long an inbound MessageSid is remembered; Twilio retries a webhook within minutes
+WHATSAPP_DEDUPE_TTL_SECONDS = float(os.getenv("WHATSAPP_DEDUPE_TTL_SECONDS", "86400"))
+# Delivery attempts per outbound message; with the job queue's backoff (up to a
+# minute between attempts) the default rides out a few minutes of Twilio trouble
+WHATSAPP_SEND_MAX_ATTEMPTS = int(os.getenv("WHATSAPP_SEND_MAX_ATTEMPTS", "8"))
+
+# Job operations: answering an inbound message, and delivering one outbound message
+REPLY_OPERATION = "whatsapp_reply"
+SEND_OPERATION = "send_whatsapp_message"
+
+# Delivery latency covers queueing and retry backoff, so the buckets reach minutes
+DELIVERY_BUCKETS = [0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0]
+
+# Expired MessageSids are deleted at most this often
+PURGE_INTERVAL_SECONDS = 600
+
+
+class WhatsAppQueue:
+    """Durable outbound WhatsApp messages and once-only inbound processing
+
+    Outbound messages are jobs on the shared job queue, so a message waiting
+    for Twilio survives a restart and failed sends are retried with backoff.
+    Each message is its own job: a failed delivery is retried without
+    regenerating the reply. Inbound MessageSids are recorded in the
+    whatsapp_inbound table, so a webhook that Twilio delivers twice (or to two
+    workers) is processed once. A reply's send job is keyed by the MessageSid
+    it answers, so a reply job that runs again queues no second answer.
+    Sends are only retried when Twilio certainly didn't accept the message.
+    """
+
+    def __init__(self, db_path: str = WHATSAPP_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._delivery = LatencyHistogram(DELIVERY_BUCKETS)
+        self._stats = {"inbound": 0, "duplicates": 0, "enqueued": 0, "sent": 0, "send_errors": 0, "undeliverable": 0}
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS whatsapp_inbound (
+                        message_sid TEXT PRIMARY KEY,
+                        from_number TEXT,
+                        received_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_whatsapp_inbound_received ON whatsapp_inbound (received_at)")
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"WhatsApp inbound table not created in {db_path}: {str(e)}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def first_delivery(self, message_sid: str, from_number: Optional[str] = None) -> bool:
+        """
+        Record an inbound message; False if its MessageSid was already seen
+
+        Args:
+            message_sid: Twilio's MessageSid of the inbound message
+            from_number: Sender, kept for troubleshooting
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO whatsapp_inbound (message_sid, from_number, received_at) VALUES (?, ?, ?)",
+                (message_sid, from_number, now)
+            ).rowcount
+            if now - self._last_purge > PURGE_INTERVAL_SECONDS:
+                self._last_purge = now
+                conn.execute("DELETE FROM whatsapp_inbound WHERE received_at < ?", (now - WHATSAPP_DEDUPE_TTL_SECONDS,))
+            conn.commit()
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._stats["inbound" if inserted else "duplicates"] += 1
+        return bool(inserted)
+
+    @staticmethod
+    def _reply_job_id(inbound_sid: str) -> str:
+        return f"{SEND_OPERATION}:{inbound_sid}"
+
+    def replied(self, inbound_sid: Optional[str]) -> bool:
+        """Whether a reply to this inbound message has already been queued"""
+        return bool(inbound_sid) and job_queue.get(self._reply_job_id(inbound_sid)) is not None
+
+    def enqueue(self, to_number: str, body: str, inbound_sid: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue a WhatsApp message for delivery
+
+        Args:
+            to_number: Recipient in international format
+            body: Message text
+            inbound_sid: MessageSid of the message this answers, if any; only
+                one reply per inbound message is ever queued
+
+        Returns:
+            The queued job (the earlier one, if this message was already answered)
+        """
+        job = job_queue.submit(
+            SEND_OPERATION,
+            {"to_number": to_number, "body": body, "queued_at": time.time(), "inbound_sid": inbound_sid},
+            priority="high",
+            job_id=self._reply_job_id(inbound_sid) if inbound_sid else None
+        )
+        with self._lock:
+            self._stats["enqueued"] += 1
+        return job
+
+    def send(
+        self,
+        to_number: str,
+        body: str,
+        queued_at: float,
+        inbound_sid: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Deliver a queued message (job handler)
+
+        Raises:
+            RuntimeError: If Twilio didn't accept the message and sending again
+                is safe, so the job is retried
+            PermanentJobError: If a retry can't succeed (e.g. an invalid number)
+                or might deliver the message twice
+        """
+        result = twilio_client.send_whatsapp_message(to_number, body, deadline)
+        if result["status"] != "success":
+            retryable = result.get("retryable", True)
+            with self._lock:
+                self._stats["send_errors" if retryable else "undeliverable"] += 1
+            if not retryable:
+                raise PermanentJobError(result["message"])
+            raise RuntimeError(result["message"])
+
+        latency = time.time() - queued_at
+        with self._lock:
+            self._stats["sent"] += 1
+            self._delivery.observe(latency)
+        return {"sid": result.get("sid"), "to_number": to_number, "inbound_sid": inbound_sid, "delivery_seconds": latency}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth of replies and sends, delivery latency, inbound duplicates"""
+        with self._lock:
+            stats = dict(self._stats)
+            delivery = self._delivery.to_dict()
+        stats.update({
+            "outbound_queue": job_queue.depth(SEND_OPERATION),
+            "reply_queue": job_queue.depth(REPLY_OPERATION),
+            "delivery_latency": delivery,
+        })
+        return stats
+
+
+# Create a singleton instance for easy import
+whatsapp_queue = WhatsAppQueue()
+
+job_queue.register(SEND_OPERATION, whatsapp_queue.send, max_attempts=WHATSAPP_SEND_MAX_ATTEMPTS)
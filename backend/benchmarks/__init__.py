@@ -0,0 +1,10 @@
+"""
+Load-test harness for the SynapseIQ backend
+
+Starts local stand-ins for Groq (an OpenAI-compatible chat server), the
+Twilio Messages API and an SMTP server, points the FastAPI apps at them and
+drives the apps with an async load generator. Run it with:
+
+    python -m benchmarks.run --duration 30 --concurrency 20 --out report.json
+    python -m benchmarks.compare baseline.json report.json
+"""
@@ -0,0 +1,74 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import httpx
+
+from benchmarks import stub_twilio
+from benchmarks.response_profile import ResponseProfile
+from benchmarks.run import ServerThread, free_port
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time a bulk WhatsApp send against the local Twilio stand-in")
+    parser.add_argument("--recipients", type=int, default=500, help="Number of recipients (default 500)")
+    parser.add_argument("--rate", type=float, default=10.0, help="TWILIO_MESSAGES_PER_SECOND for the run (default 10)")
+    parser.add_argument("--concurrency", type=int, default=8, help="TWILIO_BULK_CONCURRENCY for the run (default 8)")
+    parser.add_argument("--twilio-latency", default="lognormal:0.15,0.4", help="Twilio stand-in latency profile")
+    parser.add_argument("--twilio-error-rate", type=float, default=0.0, help="Share of Twilio calls that fail")
+    parser.add_argument("--twilio-error-status", type=int, default=429, help="Status of injected Twilio failures (default 429)")
+    parser.add_argument("--out", help="Write the summary as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    profile = ResponseProfile(args.twilio_latency, args.twilio_error_rate, args.twilio_error_status)
+    server = ServerThread(stub_twilio.create_app(profile), free_port())
+    server.start()
+    try:
+        # The client reads its settings at import time
+        os.environ.update({
+            "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+            "TWILIO_AUTH_TOKEN": "benchmark",
+            "TWILIO_WHATSAPP_NUMBER": "+15550000000",
+            "TWILIO_API_BASE_URL": server.url,
+            "TWILIO_MESSAGES_PER_SECOND": str(args.rate),
+            "TWILIO_BULK_CONCURRENCY": str(args.concurrency),
+        })
+        from app.utils.twilio_client import TwilioClient
+
+        # The Twilio SDK logs every request at INFO
+        logging.getLogger("twilio.http_client").setLevel(logging.WARNING)
+        client = TwilioClient()
+        numbers = [f"+26599{index:07d}" for index in range(args.recipients)]
+        progress = {"done": 0}
+        started = time.monotonic()
+
+        def report_progress(entry):
+            progress["done"] += 1
+            if progress["done"] % max(1, args.recipients // 10) == 0:
+                rate = progress["done"] / (time.monotonic() - started)
+                print(f"  {progress['done']}/{args.recipients} sent ({rate:.1f} msg/s)")
+
+        print(f"Sending to {args.recipients} recipients at up to {args.rate:g} msg/s with {args.concurrency} workers...")
+        summary = client.send_bulk_whatsapp_messages(numbers, "Benchmark broadcast", on_result=report_progress)
+        summary["results"] = [entry for entry in summary["results"] if entry["result"]["status"] == "error"]
+        summary["settings"] = {"rate": args.rate, "concurrency": args.concurrency, "twilio": profile.describe()}
+        summary["stand_in"] = httpx.get(f"{server.url}/stats", timeout=5.0).json()
+    finally:
+        server.stop()
+
+    print(f"{summary['successful']} sent, {summary['failed']} failed in {summary['elapsed_seconds']:.1f}s "
+          f"({summary['messages_per_second']:.1f} msg/s)")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict, List
+
+# Metrics compared per endpoint, and whether a higher value is better
+METRICS = [
+    ("p50", False),
+    ("p95", False),
+    ("p99", False),
+    ("throughput_rps", True),
+    ("error_rate", False),
+]
+
+
+def _metric(endpoint: Dict[str, Any], name: str) -> float:
+    if name in endpoint.get("latency_ms", {}):
+        return endpoint["latency_ms"][name]
+    return endpoint.get(name, 0.0)
+
+
+def compare_reports(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    Per-endpoint metric changes between two load-test reports
+
+    Args:
+        baseline: Report of the reference run
+        candidate: Report of the new run
+        threshold: Relative change that counts as a regression (0.10 = 10%)
+
+    Returns:
+        One row per endpoint and metric: {'endpoint', 'metric', 'baseline',
+        'candidate', 'change', 'regression'}
+    """
+    rows = []
+    names = sorted(set(baseline["endpoints"]) | set(candidate["endpoints"])) + ["total"]
+    for name in names:
+        before = baseline["total"] if name == "total" else baseline["endpoints"].get(name)
+        after = candidate["total"] if name == "total" else candidate["endpoints"].get(name)
+        if before is None or after is None:
+            rows.append({"endpoint": name, "metric": "missing", "baseline": before is not None,
+                         "candidate": after is not None, "change": None, "regression": False})
+            continue
+        for metric, higher_is_better in METRICS:
+            old, new = _metric(before, metric), _metric(after, metric)
+            if metric == "error_rate":
+                # Rates near zero make relative change meaningless; compare in points
+                change = new - old
+            else:
+                change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            rows.append({"endpoint": name, "metric": metric, "baseline": old, "candidate": new,
+                         "change": change, "regression": worse > threshold})
+    return rows
+
+
+def format_rows(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'endpoint':<28} {'metric':<15} {'baseline':>12} {'candidate':>12} {'change':>9}"]
+    for row in rows:
+        if row["metric"] == "missing":
+            side = "candidate" if row["baseline"] else "baseline"
+            lines.append(f"{row['endpoint']:<28} missing from {side}")
+            continue
+        if row["metric"] == "error_rate":
+            change = f"{row['change'] * 100:+.1f}pt"
+        else:
+            change = f"{row['change'] * 100:+.1f}%"
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(f"{row['endpoint']:<28} {row['metric']:<15} {row['baseline']:>12.2f} {row['candidate']:>12.2f} {change:>9}{flag}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two load-test reports")
+    parser.add_argument("baseline", help="Report of the reference run")
+    parser.add_argument("candidate", help="Report of the new run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change that counts as a regression (default 0.10)")
+    parser.add_argument("--json", action="store_true", help="Print the comparison as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare_reports(baseline, candidate, args.threshold)
+    print(json.dumps(rows, indent=2) if args.json else format_rows(rows))
+    # Non-zero exit so CI can fail on a regression
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import httpx
+
+# A scenario is a dict:
+#   name      label used in the report
+#   method    HTTP method (default POST)
+#   url       absolute URL
+#   json/data request body, or a callable returning one per request
+#   weight    relative share of the traffic (default 1)
+Scenario = Dict[str, Any]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Linear-interpolated percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies: List[float], statuses: Counter, errors: int, elapsed: float) -> Dict[str, Any]:
+    """Request count, error rate, throughput and latency percentiles (milliseconds)"""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": errors / count if count else 0.0,
+        "throughput_rps": count / elapsed if elapsed > 0 else 0.0,
+        "status_codes": {str(code): total for code, total in sorted(statuses.items(), key=lambda item: str(item[0]))},
+        "latency_ms": {
+            "p50": percentile(ordered, 0.50) * 1000,
+            "p95": percentile(ordered, 0.95) * 1000,
+            "p99": percentile(ordered, 0.99) * 1000,
+            "mean": (sum(ordered) / count) * 1000 if count else 0.0,
+            "max": ordered[-1] * 1000 if count else 0.0
+        }
+    }
+
+
+class LoadGenerator:
+    """Closed-loop load: `concurrency` workers each send one request at a time"""
+
+    def __init__(self, scenarios: List[Scenario], concurrency: int = 10, timeout: float = 30.0, seed: Optional[int] = None):
+        if not scenarios:
+            raise ValueError("At least one scenario is required")
+        self.scenarios = scenarios
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._random = random.Random(seed)
+        self._weights = [scenario.get("weight", 1) for scenario in scenarios]
+        self._latencies: Dict[str, List[float]] = defaultdict(list)
+        self._statuses: Dict[str, Counter] = defaultdict(Counter)
+        self._errors: Counter = Counter()
+
+    @staticmethod
+    def _body(value: Union[None, Dict[str, Any], Callable[[], Dict[str, Any]]]):
+        return value() if callable(value) else value
+
+    async def _send(self, client: httpx.AsyncClient, scenario: Scenario):
+        name = scenario["name"]
+        kwargs = {}
+        if "json" in scenario:
+            kwargs["json"] = self._body(scenario["json"])
+        if "data" in scenario:
+            kwargs["data"] = self._body(scenario["data"])
+
+        started = time.perf_counter()
+        try:
+            response = await client.request(scenario.get("method", "POST"), scenario["url"], **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self._latencies[name].append(time.perf_counter() - started)
+        self._statuses[name][status] += 1
+        if not isinstance(status, int) or status >= 400:
+            self._errors[name] += 1
+
+    async def _worker(self, client: httpx.AsyncClient, stop_at: float, remaining: Optional[List[int]]):
+        while time.perf_counter() < stop_at:
+            if remaining is not None:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            scenario = self._random.choices(self.scenarios, weights=self._weights)[0]
+            await self._send(client, scenario)
+
+    async def run(self, duration: float = 30.0, requests: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Send load until `duration` seconds pass or `requests` requests were sent
+
+        Returns:
+            Report with per-endpoint and total latency percentiles and throughput
+        """
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        remaining = [requests] if requests is not None else None
+        started = time.perf_counter()
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            await asyncio.gather(*[
+                self._worker(client, started + duration, remaining) for _ in range(self.concurrency)
+            ])
+        elapsed = time.perf_counter() - started
+
+        endpoints = {
+            name: summarize(self._latencies[name], self._statuses[name], self._errors[name], elapsed)
+            for name in sorted(self._latencies)
+        }
+        all_latencies = [value for values in self._latencies.values() for value in values]
+        all_statuses = sum(self._statuses.values(), Counter())
+        return {
+            "elapsed_seconds": elapsed,
+            "concurrency": self.concurrency,
+            "endpoints": endpoints,
+            "total": summarize(all_latencies, all_statuses, sum(self._errors.values()), elapsed)
+        }
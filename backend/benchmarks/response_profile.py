@@ -0,0 +1,50 @@
+import asyncio
+import math
+import random
+from typing import Optional
+
+
+class ResponseProfile:
+    """Latency distribution and error rate of a stand-in service
+
+    Latency specs (seconds):
+        fixed:0.2             always 200 ms
+        uniform:0.1,0.5       evenly spread between 100 and 500 ms
+        lognormal:0.3,0.5     median 300 ms, log-space sigma 0.5 (long tail)
+    """
+
+    def __init__(self, latency: str = "fixed:0", error_rate: float = 0.0, error_status: int = 500, seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.kind, self.params = self._parse(latency)
+        self._random = random.Random(seed)
+
+    @staticmethod
+    def _parse(spec: str):
+        kind, _, raw = spec.partition(":")
+        params = [float(value) for value in raw.split(",") if value.strip()]
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec '{spec}' (use fixed:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA)")
+        return kind, params
+
+    def delay(self) -> float:
+        """Seconds to wait before answering one request"""
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self._random.uniform(*self.params)
+        median, sigma = self.params
+        return self._random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    async def wait(self):
+        delay = self.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def describe(self) -> dict:
+        return {"latency": self.latency, "error_rate": self.error_rate, "error_status": self.error_status}
@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+import uvicorn
+
+from benchmarks import stub_llm, stub_twilio
+from benchmarks.loadgen import LoadGenerator
+from benchmarks.response_profile import ResponseProfile
+from benchmarks.smtp_sink import AIOSMTPD_AVAILABLE, SMTPSink
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+HOST = "127.0.0.1"
+
+# Chat questions: a few FAQ hits, repeats for the answer cache and open-ended ones for the model
+CHAT_QUESTIONS = [
+    "What services does SynapseIQ offer?",
+    "How much does a chatbot cost?",
+    "How can I contact you?",
+    "Do you build mobile apps?",
+    "Can you help a Nairobi retailer forecast demand for the holiday season?",
+    "How would an AI assistant help a clinic in Lilongwe manage appointments?",
+    "What data do I need before starting a machine learning project?",
+    "Can your chatbot answer customers in Swahili and French?",
+]
+
+ANALYZE_TEXTS = [
+    "The new payment system made our customers very happy and sales grew quickly.",
+    "Delivery was late again and the support team never replied to my emails.",
+    "Safaricom and Airtel are expanding mobile money services across Kenya and Malawi.",
+]
+
+# Scenario groups selectable with --scenarios
+MAIN_SCENARIOS = ["chat", "analyze", "translate", "whatsapp_send", "whatsapp_webhook", "contact"]
+SIMPLE_SCENARIOS = ["testimonials", "simple_contact"]
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    """A stand-in served by uvicorn in a background thread"""
+
+    def __init__(self, app, port: int):
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host=HOST, port=port, log_level="warning", lifespan="on"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{HOST}:{self.port}"
+
+    def start(self, timeout: float = 30.0):
+        self.thread.start()
+        stop_at = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > stop_at:
+                raise RuntimeError(f"Server on port {self.port} did not start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+class AppProcess:
+    """One of the FastAPI apps under test, served by uvicorn in a child process
+
+    Keeping the apps out of the load generator's process stops the two from
+    competing for the GIL and skewing the latencies.
+    """
+
+    def __init__(self, name: str, target: str, port: int, env: Dict[str, str], workdir: Path, workers: int = 1):
+        self.name = name
+        self.target = target
+        self.port = port
+        self.env = env
+        self.workdir = workdir
+        self.workers = workers
+        self.process = None
+        self.log_path = workdir / f"{name}.log"
+
+    @property
+    def url(self) -> str:
+        return f"http://{HOST}:{self.port}"
+
+    def start(self, timeout: float = 60.0):
+        command = [
+            sys.executable, "-m", "uvicorn", self.target, "--app-dir", str(BACKEND_DIR),
+            "--host", HOST, "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"
+        ]
+        self._log = open(self.log_path, "w")
+        self.process = subprocess.Popen(command, cwd=self.workdir, env=self.env, stdout=self._log, stderr=subprocess.STDOUT)
+        stop_at = time.monotonic() + timeout
+        while time.monotonic() < stop_at:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited during startup; see {self.log_path}")
+            try:
+                if httpx.get(f"{self.url}/", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"{self.name} did not start within {timeout:.0f}s; see {self.log_path}")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.process is not None:
+            self._log.close()
+
+
+def app_environment(workdir: Path, llm_url: str, twilio_url: str, smtp_port: int, smtp_enabled: bool, llm_concurrency: int) -> Dict[str, str]:
+    """Environment pointing the backend at the stand-ins and at a scratch copy of the database"""
+    db_path = str(workdir / "data" / "synapseiq.db")
+    env = dict(os.environ)
+    env.update({
+        "API_ENV": "benchmark",
+        "CONTENT_DB_PATH": db_path,
+        "CONVERSATION_DB_PATH": db_path,
+        "JOB_DB_PATH": db_path,
+        "KEYWORD_CORPUS_DB": db_path,
+        "ANSWER_DB_PATH": db_path,
+        "WHATSAPP_DB_PATH": db_path,
+        # One OpenAI-compatible backend: the LLM stand-in
+        "LLM_BACKENDS": json.dumps([{
+            "name": "stand-in", "type": "openai", "base_url": f"{llm_url}/v1",
+            "api_key": "stand-in", "max_concurrency": llm_concurrency
+        }]),
+        "LLM_BACKENDS_FILE": "",
+        "LLM_STARTUP_PROBE": "false",
+        # Measure the app, not the client-side Groq quota
+        "GROQ_REQUESTS_PER_MINUTE": "1000000",
+        "GROQ_TOKENS_PER_MINUTE": "1000000000",
+        "GROQ_RATE_LIMITS": "{}",
+        "TWILIO_ACCOUNT_SID": "AC" + "0" * 32,
+        "TWILIO_AUTH_TOKEN": "stand-in",
+        "TWILIO_WHATSAPP_NUMBER": "+15550000000",
+        "TWILIO_API_BASE_URL": twilio_url,
+        "SMTP_SERVER": HOST,
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_USERNAME": "benchmark@synapseiq.com",
+        # Without the sink, leave email unconfigured so sends are skipped
+        "SMTP_PASSWORD": "stand-in" if smtp_enabled else "",
+        "SMTP_USE_TLS": "false",
+        "FROM_EMAIL": "noreply@synapseiq.com",
+        "ADMIN_EMAIL": "admin@synapseiq.com",
+    })
+    return env
+
+
+def build_scenarios(main_url: str, simple_url: str, names: List[str]) -> List[Dict[str, Any]]:
+    """Load-test scenarios, one per endpoint"""
+    rng = random.Random()
+
+    def phone() -> str:
+        return f"+2659{rng.randint(10000000, 99999999)}"
+
+    available = {
+        "chat": {
+            "name": "POST /chatbot/chat", "url": f"{main_url}/chatbot/chat", "weight": 4,
+            "json": lambda: {"message": rng.choice(CHAT_QUESTIONS)}
+        },
+        "analyze": {
+            "name": "POST /nlp/analyze", "url": f"{main_url}/nlp/analyze", "weight": 2,
+            "json": lambda: {"text": rng.choice(ANALYZE_TEXTS), "analysis_type": "sentiment"}
+        },
+        "translate": {
+            "name": "POST /nlp/translate", "url": f"{main_url}/nlp/translate",
+            "json": lambda: {"text": rng.choice(ANALYZE_TEXTS), "source_language": "en", "target_language": "sw"}
+        },
+        "whatsapp_send": {
+            "name": "POST /whatsapp/send", "url": f"{main_url}/whatsapp/send",
+            "json": lambda: {"to_number": phone(), "message": "Your SynapseIQ demo is confirmed."}
+        },
+        "whatsapp_webhook": {
+            "name": "POST /whatsapp/webhook", "url": f"{main_url}/whatsapp/webhook", "weight": 2,
+            "data": lambda: {"From": f"whatsapp:{phone()}", "Body": rng.choice(CHAT_QUESTIONS), "ProfileName": "Load Test"}
+        },
+        "contact": {
+            "name": "POST /contact/submit", "url": f"{main_url}/contact/submit",
+            "json": lambda: {"name": "Load Test", "email": "loadtest@example.com", "subject": "Benchmark", "message": "Benchmark submission"}
+        },
+        "testimonials": {
+            "name": "simple GET /testimonials", "method": "GET", "url": f"{simple_url}/testimonials", "weight": 2
+        },
+        "simple_contact": {
+            "name": "simple POST /contact/submit", "url": f"{simple_url}/contact/submit",
+            "json": lambda: {"name": "Load Test", "email": "loadtest@example.com", "subject": "Benchmark", "message": "Benchmark submission"}
+        },
+    }
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(available)})")
+    return [available[name] for name in names]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def stand_in_stats(url: str) -> Dict[str, Any]:
+    try:
+        return httpx.get(f"{url}/stats", timeout=5).json()
+    except httpx.HTTPError as e:
+        return {"error": str(e)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the backend against local Groq/Twilio/SMTP stand-ins")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load (default 30)")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients (default 10)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unrecorded load first (default 2)")
+    parser.add_argument("--scenarios", default=",".join(MAIN_SCENARIOS + SIMPLE_SCENARIOS), help="Comma-separated scenario names")
+    parser.add_argument("--llm-latency", default="lognormal:0.4,0.5", help="LLM stand-in latency spec (default lognormal:0.4,0.5)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of LLM calls that fail")
+    parser.add_argument("--llm-error-status", type=int, default=503, help="HTTP status of failed LLM calls (default 503)")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Concurrency limit of the LLM backend (default 8)")
+    parser.add_argument("--twilio-latency", default="uniform:0.05,0.15", help="Twilio stand-in latency spec")
+    parser.add_argument("--twilio-error-rate", type=float, default=0.0, help="Share of Twilio calls that fail")
+    parser.add_argument("--app-workers", type=int, default=1, help="uvicorn workers per app (default 1)")
+    parser.add_argument("--label", default="", help="Free-form name for this run, stored in the report")
+    parser.add_argument("--out", help="Write the JSON report here (default: print it)")
+    parser.add_argument("--keep-workdir", action="store_true", help="Keep the scratch database copy and app logs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenario_names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+
+    # The apps work on a copy of the database; some modules open ./data/synapseiq.db relative to the cwd
+    workdir = Path(tempfile.mkdtemp(prefix="synapseiq-bench-"))
+    (workdir / "data").mkdir()
+    shutil.copy(BACKEND_DIR / "data" / "synapseiq.db", workdir / "data" / "synapseiq.db")
+
+    llm_profile = ResponseProfile(args.llm_latency, args.llm_error_rate, args.llm_error_status)
+    twilio_profile = ResponseProfile(args.twilio_latency, args.twilio_error_rate, 500)
+    servers: List[Any] = []
+    smtp_sink = None
+    try:
+        llm_server = ServerThread(stub_llm.create_app(llm_profile), free_port())
+        twilio_server = ServerThread(stub_twilio.create_app(twilio_profile), free_port())
+        for server in (llm_server, twilio_server):
+            server.start()
+            servers.append(server)
+
+        smtp_port = free_port()
+        if AIOSMTPD_AVAILABLE:
+            smtp_sink = SMTPSink(HOST, smtp_port)
+            smtp_sink.start()
+        else:
+            print("aiosmtpd is not installed; email sending is disabled for this run")
+
+        env = app_environment(workdir, llm_server.url, twilio_server.url, smtp_port, smtp_sink is not None, args.llm_concurrency)
+        main_app = AppProcess("main", "app.main:app", free_port(), env, workdir, args.app_workers)
+        simple_app = AppProcess("simple_server", "simple_server:app", free_port(), env, workdir, args.app_workers)
+        for app in (main_app, simple_app):
+            app.start()
+            servers.append(app)
+
+        scenarios = build_scenarios(main_app.url, simple_app.url, scenario_names)
+        if args.warmup > 0:
+            asyncio.run(LoadGenerator(scenarios, args.concurrency).run(duration=args.warmup))
+        generator = LoadGenerator(scenarios, args.concurrency)
+        print(f"Running {len(scenarios)} scenarios with {args.concurrency} clients...")
+        report = asyncio.run(generator.run(duration=args.duration if args.requests is None else float("inf"), requests=args.requests))
+
+        report["meta"] = {
+            "label": args.label,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "scenarios": scenario_names,
+            "duration": args.duration,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "app_workers": args.app_workers,
+        }
+        report["stand_ins"] = {
+            "llm": stand_in_stats(llm_server.url),
+            "twilio": stand_in_stats(twilio_server.url),
+            "smtp": smtp_sink.get_stats() if smtp_sink else {"enabled": False},
+        }
+    finally:
+        for server in reversed(servers):
+            server.stop()
+        if smtp_sink is not None:
+            smtp_sink.stop()
+        if args.keep_workdir:
+            print(f"Scratch database and app logs kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+        print(f"Report written to {args.out}")
+    else:
+        print(output)
+
+    for name, endpoint in sorted(report["endpoints"].items()):
+        latency = endpoint["latency_ms"]
+        print(f"{name:<30} {endpoint['throughput_rps']:8.1f} req/s  p50 {latency['p50']:8.1f} ms  "
+              f"p95 {latency['p95']:8.1f} ms  p99 {latency['p99']:8.1f} ms  errors {endpoint['errors']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import logging
+from typing import Any, Dict, Optional
+
+# aiosmtpd is only needed for benchmarks, not by the backend itself
+try:
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult
+    AIOSMTPD_AVAILABLE = True
+except ImportError:
+    AIOSMTPD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class _SinkHandler:
+    """Counts and discards every message"""
+
+    def __init__(self):
+        self.stats = {"messages": 0, "recipients": 0, "bytes": 0}
+
+    async def handle_DATA(self, server, session, envelope):
+        self.stats["messages"] += 1
+        self.stats["recipients"] += len(envelope.rcpt_tos)
+        self.stats["bytes"] += len(envelope.content or b"")
+        return "250 Message accepted for delivery"
+
+
+def _accept_any_login(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+class SMTPSink:
+    """Local SMTP server that accepts any login and drops the mail
+
+    Runs without TLS, so the backend must be started with SMTP_USE_TLS=false.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8025):
+        self.host = host
+        self.port = port
+        self.handler = _SinkHandler()
+        self.controller: Optional[Any] = None
+
+    def start(self):
+        if not AIOSMTPD_AVAILABLE:
+            raise RuntimeError("aiosmtpd is not installed (pip install aiosmtpd)")
+        self.controller = Controller(
+            self.handler,
+            hostname=self.host,
+            port=self.port,
+            authenticator=_accept_any_login,
+            auth_require_tls=False
+        )
+        self.controller.start()
+        logger.info(f"SMTP sink listening on {self.host}:{self.port}")
+
+    def stop(self):
+        if self.controller is not None:
+            self.controller.stop()
+            self.controller = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.handler.stats)
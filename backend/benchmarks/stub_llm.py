@@ -0,0 +1,81 @@
+import json
+import time
+import uuid
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.response_profile import ResponseProfile
+
+STUB_REPLY = (
+    "SynapseIQ builds AI solutions for African businesses, including chatbots, "
+    "analytics and language tools. Contact us to discuss your project."
+)
+
+
+def _rough_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Prompt size estimate (about four characters per token) for the usage block"""
+    return max(1, sum(len(str(message.get("content", ""))) for message in messages) // 4)
+
+
+def create_app(profile: ResponseProfile) -> FastAPI:
+    """
+    OpenAI-compatible chat completions server with injected latency and errors
+
+    Serves POST /v1/chat/completions (plain and streamed) and GET /stats.
+    """
+    app = FastAPI(title="LLM stand-in")
+    stats = {"requests": 0, "errors": 0, "streams": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        stats["requests"] += 1
+        await profile.wait()
+
+        if profile.should_fail():
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=profile.error_status,
+                content={"error": {"message": "Injected failure", "type": "stub_error"}}
+            )
+
+        model = payload.get("model", "stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        prompt_tokens = _rough_tokens(payload.get("messages", []))
+        completion_tokens = len(STUB_REPLY) // 4
+
+        if payload.get("stream"):
+            stats["streams"] += 1
+
+            def events():
+                for word in STUB_REPLY.split(" "):
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": STUB_REPLY}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats, profile=profile.describe())
+
+    return app
@@ -0,0 +1,61 @@
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.response_profile import ResponseProfile
+
+
+def create_app(profile: ResponseProfile) -> FastAPI:
+    """
+    Fake Twilio Messages API
+
+    Accepts POST /2010-04-01/Accounts/{sid}/Messages.json the way Twilio does
+    (form-encoded To/From/Body) and answers with a queued message resource.
+    Point the backend at it with TWILIO_API_BASE_URL.
+    """
+    app = FastAPI(title="Twilio stand-in")
+    stats = {"requests": 0, "errors": 0, "accepted": 0}
+
+    @app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+    async def create_message(account_sid: str, request: Request):
+        form = await request.form()
+        stats["requests"] += 1
+        await profile.wait()
+
+        if profile.should_fail():
+            stats["errors"] += 1
+            # Same error body shape as the real API
+            return JSONResponse(
+                status_code=profile.error_status,
+                content={"code": 20500, "message": "Injected failure", "more_info": "", "status": profile.error_status}
+            )
+
+        stats["accepted"] += 1
+        now = datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
+        sid = f"SM{uuid.uuid4().hex}"
+        return JSONResponse(status_code=201, content={
+            "sid": sid,
+            "account_sid": account_sid,
+            "to": form.get("To"),
+            "from": form.get("From"),
+            "body": form.get("Body"),
+            "status": "queued",
+            "num_segments": "1",
+            "direction": "outbound-api",
+            "api_version": "2010-04-01",
+            "date_created": now,
+            "date_updated": now,
+            "date_sent": None,
+            "error_code": None,
+            "error_message": None,
+            "price": None,
+            "uri": f"/2010-04-01/Accounts/{account_sid}/Messages/{sid}.json"
+        })
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats, profile=profile.describe())
+
+    return app
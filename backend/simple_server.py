@@ -4,6 +4,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional, Dict, Any
+import asyncio
 import sqlite3
 import os
 import json
@@ -19,6 +20,9 @@ import hashlib
 import uuid
 from jose import JWTError, jwt
 
+from app.utils.blog_translations import blog_translator, content_hash
+from app.utils.content_index import content_index
+
 # Initialize FastAPI app
 app = FastAPI(
     title="SynapseIQ Testimonials API",
@@ -283,6 +287,7 @@ def send_email(subject, recipient_email, recipient_name, message_body, is_html=F
     sender_email = os.environ.get('SMTP_USERNAME', 'dongobbinshombo@gmail.com')
     sender_password = os.environ.get('SMTP_PASSWORD', '')
     from_email = os.environ.get('FROM_EMAIL', 'noreply@synapseiq.com')
+    use_tls = os.environ.get('SMTP_USE_TLS', 'true').lower() == 'true'
     
     # For debugging
     print(f"Environment variables loaded:")
@@ -326,9 +331,10 @@ def send_email(subject, recipient_email, recipient_name, message_body, is_html=F
         # Optional - set debug level for more verbose output
         server.set_debuglevel(1)
         
-        print(f"DEBUG EMAIL - Starting TLS...")
-        server.starttls()  # Secure the connection
-        print(f"DEBUG EMAIL - TLS started")
+        if use_tls:
+            print(f"DEBUG EMAIL - Starting TLS...")
+            server.starttls()  # Secure the connection
+            print(f"DEBUG EMAIL - TLS started")
         
         print(f"DEBUG EMAIL - Logging in with {sender_email}...")
         server.login(sender_email, sender_password)
@@ -464,6 +470,7 @@ async def create_testimonial(testimonial: dict):
         
         # Get the ID of the newly created testimonial
         testimonial_id = cursor.lastrowid
+        await asyncio.to_thread(content_index.sync_testimonial, testimonial_id)
         
         # Fetch the created testimonial
         cursor.execute("SELECT * FROM testimonials WHERE id = ?", (testimonial_id,))
@@ -501,6 +508,7 @@ async def update_testimonial(testimonial_id: int, testimonial: dict):
              testimonial_id)
         )
         conn.commit()
+        await asyncio.to_thread(content_index.sync_testimonial, testimonial_id)
         
         # Fetch the updated testimonial
         cursor.execute("SELECT * FROM testimonials WHERE id = ?", (testimonial_id,))
@@ -538,6 +546,7 @@ async def delete_testimonial(testimonial_id: int):
         cursor.execute("DELETE FROM testimonials WHERE id = ?", (testimonial_id,))
         conn.commit()
         conn.close()
+        await asyncio.to_thread(content_index.sync_testimonial, testimonial_id)
         
         return {"message": f"Testimonial {testimonial_id} deleted successfully"}
     except HTTPException:
@@ -1040,7 +1049,11 @@ async def get_blog_posts(
 
 # Get a single blog post by ID or slug
 @app.get("/blog/posts/{post_identifier}")
-async def get_blog_post(post_identifier: str, token: str = Depends(oauth2_scheme)):
+async def get_blog_post(
+    post_identifier: str,
+    lang: Optional[str] = Query(None, description="Language code of a pre-translated version, e.g. sw or fr"),
+    token: str = Depends(oauth2_scheme)
+):
     try:
         # Verify token (will raise exception if invalid)
         verify_token(token)
@@ -1079,6 +1092,19 @@ async def get_blog_post(post_identifier: str, token: str = Depends(oauth2_scheme
         
         conn.close()
         
+        # Serve the stored translation of the current text; never translate on read
+        if lang:
+            translation = blog_translator.get(post['id'], lang, content_hash(post['title'], post['excerpt'], post['content']))
+            if translation:
+                result.update({
+                    "title": translation['title'],
+                    "excerpt": translation['excerpt'],
+                    "content": translation['content'],
+                    "language": lang.lower(),
+                    "source_language": translation['source_language']
+                })
+            result["translation_available"] = translation is not None
+        
         return result
     except Exception as e:
         if isinstance(e, HTTPException):
@@ -1130,6 +1156,8 @@ async def create_blog_post(post: BlogPostCreate, token: str = Depends(oauth2_sch
         
         post_id = cursor.lastrowid
         conn.commit()
+        await asyncio.to_thread(content_index.sync_blog_post, post_id)
+        blog_translator.enqueue(post_id)
         
         # Fetch the created post
         cursor.execute("SELECT * FROM blog_posts WHERE id = ?", (post_id,))
@@ -1194,7 +1222,8 @@ async def update_blog_post(post_id: int, post_update: BlogPostUpdate, token: str
         if not update_data:
             # No fields to update
             conn.close()
-            return get_blog_post(str(post_id), token)
+            # Called directly, so every Query default must be passed explicitly
+            return await get_blog_post(str(post_id), lang=None, token=token)
         
         # Handle special fields
         if 'tags' in update_data:
@@ -1217,6 +1246,9 @@ async def update_blog_post(post_id: int, post_update: BlogPostUpdate, token: str
         # Execute the update
         cursor.execute(query, list(update_data.values()) + [post_id])
         conn.commit()
+        await asyncio.to_thread(content_index.sync_blog_post, post_id)
+        # Queues a job only if the text changed since the last translation
+        blog_translator.enqueue(post_id)
         
         # Fetch the updated post
         cursor.execute("SELECT * FROM blog_posts WHERE id = ?", (post_id,))
@@ -1268,6 +1300,8 @@ async def delete_blog_post(post_id: int, token: str = Depends(oauth2_scheme)):
         cursor.execute("DELETE FROM blog_posts WHERE id = ?", (post_id,))
         conn.commit()
         conn.close()
+        await asyncio.to_thread(content_index.sync_blog_post, post_id)
+        blog_translator.delete_post(post_id)
         
         return {"success": True, "message": "Blog post deleted successfully"}
     except Exception as e:
@@ -1303,6 +1337,8 @@ async def toggle_publish_status(post_id: int, token: str = Depends(oauth2_scheme
             (new_status, published_at, datetime.now().isoformat(), post_id)
         )
         conn.commit()
+        await asyncio.to_thread(content_index.sync_blog_post, post_id)
+        blog_translator.enqueue(post_id)
         
         # Fetch the updated post
         cursor.execute("SELECT * FROM blog_posts WHERE id = ?", (post_id,))
@@ -0,0 +1,22 @@
+import os
+import tempfile
+
+# Modules read their settings and open their databases at import time, so the
+# test environment is set before anything from app is imported: every store
+# gets a scratch database (never data/synapseiq.db) and no LLM backend is
+# configured, so nothing reaches the network.
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="synapseiq-tests-")
+_SCRATCH_DB = os.path.join(_SCRATCH_DIR, "synapseiq.db")
+for _name in (
+    "CONTENT_DB_PATH",
+    "CONVERSATION_DB_PATH",
+    "JOB_DB_PATH",
+    "ANSWER_DB_PATH",
+    "WHATSAPP_DB_PATH",
+    "KEYWORD_CORPUS_DB",
+):
+    os.environ[_name] = _SCRATCH_DB
+os.environ["LLM_STARTUP_PROBE"] = "false"
+os.environ["LLM_BACKENDS"] = "[]"
+os.environ["GROQ_API_KEY"] = ""
+os.environ["GROQ_API_KEYS"] = ""
@@ -0,0 +1,86 @@
+import time
+
+from app.utils.answer_precompute import MAX_QUESTION_CHARS, AnswerPrecomputer, QuestionLog, scrub_question
+
+
+def wait_for_rows(log, count, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        rows = log.recent(0)
+        if len(rows) >= count:
+            return rows
+        time.sleep(0.02)
+    return log.recent(0)
+
+
+def test_scrub_question_removes_contact_details():
+    scrubbed = scrub_question("Call me on +265 999 123 456 or mail jane.doe@example.com,  see https://x.io/a?b=1")
+    assert "[number]" in scrubbed
+    assert "[email]" in scrubbed
+    assert "[link]" in scrubbed
+    assert "999" not in scrubbed and "jane" not in scrubbed and "x.io" not in scrubbed
+    assert "  " not in scrubbed
+    assert scrub_question("How much is a chatbot?") == "How much is a chatbot?"
+    assert scrub_question(None) == ""
+
+
+def test_scrub_question_keeps_prices_and_year_ranges():
+    for question in (
+        "Is a chatbot 500-1000 dollars?",
+        "What changed in your 2023-2024 report?",
+        "Do you charge 10000-50000 kwacha?",
+    ):
+        assert scrub_question(question) == question
+    for phone in ("0999 123 456", "(0888) 123-456", "+1 (415) 555 0100", "265999123456"):
+        assert scrub_question(f"Call {phone} today") == "Call [number] today"
+
+
+def test_log_stores_only_scrubbed_short_questions(tmp_path):
+    log = QuestionLog(db_path=str(tmp_path / "answers.db"))
+    log.record("Email me at amina@example.org about pricing", "chat")
+    log.record("x" * (MAX_QUESTION_CHARS + 1), "chat")
+    log.record("   ", "whatsapp")
+    log.record("Do you build chatbots?", "whatsapp", language="en")
+
+    rows = wait_for_rows(log, 2)
+    assert sorted(row["question"] for row in rows) == ["Do you build chatbots?", "Email me at [email] about pricing"]
+
+    assert log.purge(time.time() + 1) == 2
+    assert log.recent(0) == []
+
+
+def test_cluster_groups_near_duplicates_around_the_most_asked():
+    precomputer = AnswerPrecomputer(log=None)
+    clusters = precomputer._cluster([
+        ("How much does a chatbot cost?", 5),
+        ("how much does a chatbot cost", 2),
+        ("How much does the chatbot cost?", 3),
+        ("Do you work in Malawi?", 4),
+        ("Which countries do you work in?", 1),
+    ], "en")
+
+    by_question = {cluster["question"]: cluster for cluster in clusters}
+    chatbot = by_question["How much does a chatbot cost?"]
+    assert chatbot["asked"] == 10
+    assert set(chatbot["alternates"]) == {"how much does a chatbot cost", "How much does the chatbot cost?"}
+    assert chatbot["language"] == "en"
+    assert by_question["Do you work in Malawi?"]["asked"] < 10
+    assert sum(cluster["asked"] for cluster in clusters) == 15
+
+
+def test_cluster_ids_are_stable():
+    questions = [("What is machine learning?", 3), ("Can you automate invoices?", 2)]
+    first = AnswerPrecomputer(log=None)._cluster(list(questions), "en")
+    second = AnswerPrecomputer(log=None)._cluster(list(reversed(questions)), "en")
+    assert {cluster["id"] for cluster in first} == {cluster["id"] for cluster in second}
+
+
+def test_clustering_scales_past_pairwise_comparison():
+    # Distinct questions share no leader terms, so each leader scores only its own bucket
+    letters = "bcdfghjklmnpqrstvwxz"
+    words = [a + "o" + b + "a" + c for a in letters for b in letters for c in letters[:8]]
+    questions = [(f"{words[number]} {words[-1 - number]}", 1) for number in range(1500)]
+    started = time.perf_counter()
+    clusters = AnswerPrecomputer(log=None)._cluster(questions, "en")
+    assert len(clusters) == 1500
+    assert time.perf_counter() - started < 30
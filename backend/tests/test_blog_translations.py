@@ -0,0 +1,120 @@
+import sqlite3
+
+import pytest
+
+from app.utils import blog_translations
+from app.utils.blog_translations import BLOG_TRANSLATION_OPERATION, BlogTranslator, content_hash
+from app.utils.groq_client import groq_client
+from app.utils.job_queue import JobQueue
+
+POST = (
+    "Why chatbots help small businesses",
+    "A short guide to customer service automation",
+    "Customers expect quick answers.\n\nA chatbot can answer common questions at any time of day.",
+)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "content.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE blog_posts (id INTEGER PRIMARY KEY, title TEXT, excerpt TEXT, content TEXT, published INTEGER)")
+    conn.execute("INSERT INTO blog_posts (id, title, excerpt, content, published) VALUES (1, ?, ?, ?, 1)", POST)
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(blog_translations, "job_queue", queue)
+    return queue
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    def translate_strings(strings, source_language, target_language, **options):
+        calls.append(target_language)
+        return {"translations": {key: f"[{target_language}] {text}" for key, text in strings.items()}, "missing": []}
+
+    monkeypatch.setattr(groq_client, "translate_strings", translate_strings)
+    return calls
+
+
+def edit(db_path, content):
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE blog_posts SET content = ? WHERE id = 1", (content,))
+    conn.commit()
+    conn.close()
+
+
+def test_saving_the_same_version_queues_one_job(db_path, queue):
+    translator = BlogTranslator(db_path=db_path, languages=["fr", "sw"])
+    queue.register(BLOG_TRANSLATION_OPERATION, translator.translate_post)
+
+    first = translator.enqueue(1)
+    second = translator.enqueue(1)
+
+    assert first["id"] == second["id"]
+    assert first["params"]["queued_hash"] == content_hash(*POST)
+    assert queue.pending(BLOG_TRANSLATION_OPERATION) == 1
+    assert queue.get_stats()["deduplicated"] == 1
+
+    edit(db_path, "New text about chatbots for small shops.")
+    assert translator.enqueue(1)["id"] != first["id"]
+    assert queue.pending(BLOG_TRANSLATION_OPERATION) == 2
+
+
+def test_job_translates_and_stores_each_missing_language(db_path, calls):
+    translator = BlogTranslator(db_path=db_path, languages=["fr", "sw", "en"])
+    digest = content_hash(*POST)
+
+    result = translator.translate_post(1, queued_hash=digest)
+
+    assert sorted(result["translated"]) == ["fr", "sw"]
+    assert sorted(calls) == ["fr", "sw"]
+    stored = translator.get(1, "fr", digest)
+    assert stored["title"] == f"[fr] {POST[0]}"
+    # Paragraph breaks are kept verbatim
+    assert "\n\n" in stored["content"]
+    assert translator.enqueue(1) is None
+
+
+def test_superseded_job_does_nothing(db_path, calls):
+    translator = BlogTranslator(db_path=db_path, languages=["fr"])
+    old_hash = content_hash(*POST)
+    edit(db_path, "Edited before the job ran.")
+
+    result = translator.translate_post(1, queued_hash=old_hash)
+
+    assert result["skipped"] == "superseded by an edit"
+    assert calls == []
+
+
+def test_edit_during_translation_is_not_overwritten(db_path, monkeypatch):
+    translator = BlogTranslator(db_path=db_path, languages=["fr"])
+
+    def translate_strings(strings, source_language, target_language, **options):
+        edit(db_path, "Edited while the model was translating.")
+        return {"translations": dict(strings), "missing": []}
+
+    monkeypatch.setattr(groq_client, "translate_strings", translate_strings)
+    result = translator.translate_post(1, queued_hash=content_hash(*POST))
+
+    assert result["skipped"] == "superseded by an edit"
+    assert translator.get(1, "fr", content_hash(*POST)) is None
+
+
+def test_unpublished_posts_are_not_queued(db_path, queue):
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE blog_posts SET published = 0")
+    conn.commit()
+    conn.close()
+    translator = BlogTranslator(db_path=db_path, languages=["fr"])
+    queue.register(BLOG_TRANSLATION_OPERATION, translator.translate_post)
+
+    assert translator.enqueue(1) is None
+    assert translator.translate_post(1)["skipped"] == "not published"
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+
+from app.routers import chatbot
+from app.utils.groq_client import GroqAIClient
+
+
+@pytest.fixture
+def slow_model(monkeypatch):
+    """Groq that answers (or fails) after 0.2s, against a 0.05s latency budget"""
+    outcome = {"answer": "Our consulting starts with a free discovery call."}
+
+    def chat_completion(messages, temperature, max_tokens, stream, deadline, fallback):
+        time.sleep(0.2)
+        if isinstance(outcome["answer"], Exception):
+            raise outcome["answer"]
+        return outcome["answer"]
+
+    monkeypatch.setattr(chatbot, "CHAT_LATENCY_BUDGET_SECONDS", 0.05)
+    monkeypatch.setattr(GroqAIClient, "api_available", property(lambda self: True))
+    monkeypatch.setattr(chatbot.groq_client, "chat_completion", chat_completion)
+    monkeypatch.setattr(chatbot.faq_retriever, "lookup", lambda question, language=None: None)
+    monkeypatch.setattr(chatbot.answer_cache, "lookup_precomputed", lambda question, language=None: None)
+    return outcome
+
+
+def answer_then_wait(*args):
+    """Run _answer, then stay on the loop long enough for the abandoned call to finish"""
+    async def run():
+        result = await chatbot._answer(*args, deadline=time.monotonic() + 5)
+        await asyncio.sleep(0.4)
+        return result
+
+    return asyncio.run(run())
+
+
+def test_slow_model_gets_a_local_answer_and_the_late_answer_is_cached(slow_model):
+    question = "How does your consulting engagement start?"
+
+    response, metadata = answer_then_wait(question, [], "", "en")
+
+    assert metadata["degraded"] is True
+    assert metadata["degraded_reason"] == "llm_timeout"
+    assert metadata["source"] in ("intent", "retrieval")
+    assert response != slow_model["answer"]
+    assert chatbot.answer_cache.get(question, metadata["language"])["answer"] == slow_model["answer"]
+
+    # The next visitor asking the same question gets the model's answer
+    response, metadata = asyncio.run(chatbot._answer(question, [], "", "en", time.monotonic() + 5))
+    assert response == slow_model["answer"]
+    assert metadata["source"] == "answer_cache"
+
+
+def test_late_failure_in_a_conversation_is_collected(slow_model, capsys):
+    slow_model["answer"] = RuntimeError("upstream timed out")
+    history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello!"}]
+
+    _, metadata = answer_then_wait("And what do you charge for a workshop?", history, "", "en")
+
+    assert metadata["degraded_reason"] == "llm_timeout"
+    assert "Late Groq API call failed: upstream timed out" in capsys.readouterr().out
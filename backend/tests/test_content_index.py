@@ -0,0 +1,118 @@
+import sqlite3
+
+import pytest
+
+from app.utils.content_index import ContentIndex, chunk_text
+
+
+def add_post(db_path, title, content, published=1):
+    conn = sqlite3.connect(db_path)
+    post_id = conn.execute(
+        "INSERT INTO blog_posts (title, excerpt, content, category, published) VALUES (?, '', ?, 'AI', ?)",
+        (title, content, published)
+    ).lastrowid
+    conn.commit()
+    conn.close()
+    return post_id
+
+
+def update_post(db_path, post_id, **fields):
+    conn = sqlite3.connect(db_path)
+    for column, value in fields.items():
+        conn.execute(f"UPDATE blog_posts SET {column} = ? WHERE id = ?", (value, post_id))
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "content.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE blog_posts (id INTEGER PRIMARY KEY, title TEXT, excerpt TEXT, content TEXT, category TEXT, published INTEGER)"
+    )
+    conn.execute("CREATE TABLE testimonials (id INTEGER PRIMARY KEY, name TEXT, company TEXT, position TEXT, content TEXT)")
+    conn.execute(
+        "INSERT INTO testimonials (name, company, position, content) VALUES "
+        "('Amina', 'Mzuri Foods', 'CEO', 'Their demand forecasting cut our food waste in half.')"
+    )
+    conn.commit()
+    conn.close()
+    add_post(path, "Mobile money fraud", "Detecting mobile money fraud with anomaly detection models.")
+    add_post(path, "Draft", "Unpublished thoughts on crop yield prediction.", published=0)
+    return path
+
+
+def test_chunk_text_keeps_paragraphs_together():
+    text = "one two three\n\nfour five six seven\n\n**eight**"
+    assert chunk_text(text, chunk_words=5) == ["one two three", "four five six seven eight"]
+    assert chunk_text("a b c d e f g", chunk_words=3) == ["a b c", "d e f", "g"]
+    assert chunk_text("") == []
+
+
+def test_search_finds_published_content_only(db_path):
+    index = ContentIndex(db_path)
+
+    results = index.search("how do you detect mobile money fraud?")
+    assert results[0]["source"] == "blog_post"
+    assert results[0]["title"] == "Mobile money fraud"
+    assert 0 < results[0]["score"] <= 1
+
+    assert index.search("forecasting food waste")[0]["source"] == "testimonial"
+    assert index.search("crop yield prediction") == []
+    assert index.get_stats()["documents"] == 2
+
+
+def test_sync_replaces_and_removes_documents(db_path):
+    index = ContentIndex(db_path)
+    post_id = add_post(db_path, "Language products", "Building Swahili chatbots for customer support.")
+    index.sync_blog_post(post_id)
+    assert index.search("swahili chatbots")[0]["source_id"] == post_id
+
+    update_post(db_path, post_id, content="Building Chichewa voice assistants.")
+    index.sync_blog_post(post_id)
+    assert index.search("swahili chatbots") == []
+    assert index.search("chichewa voice assistants")[0]["source_id"] == post_id
+
+    update_post(db_path, post_id, published=0)
+    index.sync_blog_post(post_id)
+    assert index.search("chichewa voice assistants") == []
+
+
+def test_other_processes_pick_up_changes_from_the_log(db_path):
+    reader = ContentIndex(db_path)
+    writer = ContentIndex(db_path)
+
+    post_id = add_post(db_path, "Logistics", "Route optimisation for delivery fleets.")
+    writer.sync_blog_post(post_id)
+    reader.refresh(force=True)
+    assert reader.search("route optimisation delivery")[0]["source_id"] == post_id
+
+    writer.rebuild()
+    update_post(db_path, post_id, published=0)
+    writer.sync_blog_post(post_id)
+    reader.refresh(force=True)
+    assert reader.search("route optimisation delivery") == []
+
+
+def test_compaction_keeps_results(db_path):
+    index = ContentIndex(db_path)
+    post_id = add_post(db_path, "Vision", "Computer vision for quality inspection.")
+    index.sync_blog_post(post_id)
+    before = index.search("computer vision quality inspection")
+    with index._lock:
+        index._compact()
+    assert index.search("computer vision quality inspection") == before
+    assert index.get_stats()["delta_rows"] == 0
+
+
+def test_build_context_respects_the_token_budget(db_path):
+    index = ContentIndex(db_path)
+    results = [{"text": "word " * 200}, {"text": "short"}]
+
+    context, used = index.build_context(results, max_tokens=100)
+    assert used == results[:1]
+    assert len(context) < len(results[0]["text"])
+
+    context, used = index.build_context(results, max_tokens=10)
+    assert context == "" and used == []
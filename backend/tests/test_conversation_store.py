@@ -0,0 +1,169 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.conversation_store import SUMMARY_HEADER, ConversationStore
+
+
+def turn(role, content):
+    return {"role": role, "content": content}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "conversations.db")
+
+
+def test_append_creates_and_extends(db_path):
+    store = ConversationStore(db_path=db_path)
+    conversation_id = store.new_id()
+
+    first = store.append(conversation_id, [turn("user", "Hi"), turn("assistant", "Hello!")])
+    assert first["turns"] == [turn("user", "Hi"), turn("assistant", "Hello!")]
+    assert first["summary"] == ""
+
+    second = store.append(conversation_id, [turn("user", "Pricing?"), turn("assistant", "")])
+    assert [item["content"] for item in second["turns"]] == ["Hi", "Hello!", "Pricing?"]
+    assert second["created_at"] == first["created_at"]
+    assert store.get(conversation_id) == second
+    assert store.get("unknown") is None
+
+
+def test_returned_conversations_are_copies(db_path):
+    store = ConversationStore(db_path=db_path)
+    snapshot = store.append("c1", [turn("user", "Hi")])
+    snapshot["turns"].append(turn("user", "injected"))
+    store.get("c1")["turns"].append(turn("user", "injected"))
+    assert len(store.get("c1")["turns"]) == 1
+
+
+def test_old_turns_are_folded_into_a_summary(db_path):
+    store = ConversationStore(db_path=db_path, max_turns=4, summary_tokens=200)
+    for index in range(5):
+        conversation = store.append("c1", [turn("user", f"question {index}")])
+
+    assert len(conversation["turns"]) == 2
+    assert conversation["turns"][-1]["content"] == "question 4"
+    assert conversation["summary"].startswith(SUMMARY_HEADER)
+    assert "question 0" in conversation["summary"]
+    assert store.get_stats()["summarized_turns"] == 3
+
+
+def test_summary_stays_within_its_token_cap(db_path):
+    store = ConversationStore(db_path=db_path, max_turns=2, summary_tokens=60)
+    for index in range(40):
+        conversation = store.append("c1", [turn("user", f"message number {index} " + "detail " * 10)])
+    assert len(conversation["summary"]) // 4 + 1 <= 60
+    # The most recent folded turns are the ones kept
+    assert "message number 37" in conversation["summary"]
+    assert "message number 0 " not in conversation["summary"]
+
+
+def test_conversations_survive_a_restart(db_path):
+    ConversationStore(db_path=db_path).append("c1", [turn("user", "Hi")])
+    restarted = ConversationStore(db_path=db_path)
+    assert restarted.get("c1")["turns"] == [turn("user", "Hi")]
+    assert restarted.get_stats()["cache_misses"] == 1
+
+
+def test_idle_conversations_expire(db_path):
+    store = ConversationStore(db_path=db_path, ttl_seconds=0.2)
+    store.append("c1", [turn("user", "Hi")])
+    time.sleep(0.3)
+
+    assert store.get("c1") is None
+    assert store.append("c1", [turn("user", "Again")])["turns"] == [turn("user", "Again")]
+    assert ConversationStore(db_path=db_path, ttl_seconds=0.2).purge_expired() == 0
+    time.sleep(0.3)
+    assert store.purge_expired() == 1
+
+
+def test_lru_evicts_by_count(db_path):
+    store = ConversationStore(db_path=db_path, capacity=2)
+    for conversation_id in ("a", "b", "c"):
+        store.append(conversation_id, [turn("user", conversation_id)])
+    assert store.get_stats()["cached"] == 2
+    assert store.get_stats()["evictions"] == 1
+    # Evicted conversations are reloaded from disk
+    assert store.get("a")["turns"] == [turn("user", "a")]
+
+
+def test_delete(db_path):
+    store = ConversationStore(db_path=db_path)
+    store.append("c1", [turn("user", "Hi")])
+    assert store.delete("c1")
+    assert store.get("c1") is None
+    assert not store.delete("c1")
+
+
+def test_tables_are_independent(db_path):
+    chat = ConversationStore(db_path=db_path)
+    whatsapp = ConversationStore(db_path=db_path, table="whatsapp_conversations")
+    chat.append("same-id", [turn("user", "web")])
+    whatsapp.append("same-id", [turn("user", "whatsapp")])
+    assert chat.get("same-id")["turns"] == [turn("user", "web")]
+    assert whatsapp.get("same-id")["turns"] == [turn("user", "whatsapp")]
+
+
+def test_instances_sharing_a_database_never_lose_turns(db_path):
+    # Each store stands in for a separate API process with its own cache
+    stores = [ConversationStore(db_path=db_path, max_turns=1000) for _ in range(4)]
+    for store in stores:
+        store.get("shared")
+    barrier = threading.Barrier(len(stores))
+
+    def worker(number, store):
+        barrier.wait()
+        for index in range(25):
+            store.append("shared", [turn("user", f"{number}-{index}")])
+
+    threads = [threading.Thread(target=worker, args=(number, store)) for number, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    turns = ConversationStore(db_path=db_path, max_turns=1000).get("shared")["turns"]
+    assert len(turns) == 100
+    assert len({item["content"] for item in turns}) == 100
+
+
+def test_long_turns_are_clipped(db_path):
+    store = ConversationStore(db_path=db_path, turn_max_chars=50)
+    conversation = store.append("c1", [turn("user", "x" * 500), turn("assistant", "short")])
+    assert len(conversation["turns"][0]["content"]) == 50
+    assert conversation["turns"][0]["content"].endswith("…")
+    assert conversation["turns"][1]["content"] == "short"
+
+
+def test_cache_is_bounded_by_characters(db_path):
+    store = ConversationStore(db_path=db_path, capacity=100, cache_max_chars=1000)
+    for number in range(5):
+        store.append(f"c{number}", [turn("user", "y" * 300)])
+
+    stats = store.get_stats()
+    assert stats["cached"] == 3
+    assert stats["cached_chars"] == 900
+    assert stats["evictions"] == 2
+    # Evicted conversations are still on disk
+    assert store.get("c0")["turns"][0]["content"] == "y" * 300
+
+
+def test_cache_character_count_stays_consistent(db_path):
+    store = ConversationStore(db_path=db_path, capacity=3, max_turns=4, cache_max_chars=5000)
+    for number in range(30):
+        store.append(f"c{number % 5}", [turn("user", "z" * (number * 7 % 120))])
+        if number % 4 == 0:
+            store.delete(f"c{(number + 2) % 5}")
+
+    with store._lock:
+        expected = sum(store._size(conversation) for conversation in store._cache.values())
+    assert store.get_stats()["cached_chars"] == expected
+    assert expected <= 5000
+
+
+def test_single_oversized_conversation_stays_cached(db_path):
+    store = ConversationStore(db_path=db_path, cache_max_chars=100, turn_max_chars=1000)
+    store.append("c1", [turn("user", "w" * 500)])
+    assert store.get_stats()["cached"] == 1
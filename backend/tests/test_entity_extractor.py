@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from app.utils.entity_extractor import EntityExtractor, entity_extractor
+
+
+def spans(text, extractor=entity_extractor):
+    return [(entity["text"], entity["type"]) for entity in extractor.extract(text)]
+
+
+def test_given_name_before_a_known_surname_is_one_person():
+    assert spans("John Kamau called") == [("John Kamau", "PERSON")]
+
+
+def test_adjacent_name_parts_merge_and_longest_entry_wins():
+    assert spans("John Kamau met Kwame Mensah at Standard Bank in Nairobi.") == [
+        ("John Kamau", "PERSON"),
+        ("Kwame Mensah", "PERSON"),
+        ("Standard Bank", "ORGANIZATION"),
+        ("Nairobi", "LOCATION"),
+    ]
+    assert spans("Flights to Guinea-Bissau") == [("Guinea-Bissau", "LOCATION")]
+
+
+def test_listed_words_are_not_taken_as_given_names():
+    assert spans("Yesterday Kamau called") == [("Kamau", "PERSON")]
+    assert spans("We met Mr Kamau") == [("Kamau", "PERSON")]
+
+
+def test_offsets_point_into_the_original_text():
+    text = "Offices in  Nairobi and Lagos"
+    for entity in entity_extractor.extract(text):
+        assert text[entity["start"]:entity["end"]] == entity["text"]
+
+
+def test_relevance_favours_repeated_and_early_entities():
+    entities = entity_extractor.extract("Nairobi is busy. Safaricom, Safaricom and Safaricom again.")
+    relevance = {entity["text"]: entity["relevance"] for entity in entities}
+    assert relevance["Safaricom"] > relevance["Nairobi"]
+    assert all(0 <= value <= 1 for value in relevance.values())
+
+    single = entity_extractor.extract("Nairobi")[0]
+    assert single["relevance"] == 1.0
+
+
+def test_empty_text():
+    assert entity_extractor.extract("") == []
+    assert entity_extractor.extract_batch(["", "Nairobi"])[1][0]["text"] == "Nairobi"
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    (tmp_path / "people.txt").write_text("Amina\n")
+    (tmp_path / "surnames.txt").write_text("Banda\n")
+    (tmp_path / "places.txt").write_text("Blantyre\n# comment\n")
+    (tmp_path / "gazetteer.json").write_text(json.dumps({
+        "sources": [
+            {"file": "places.txt", "type": "LOCATION"},
+            {"file": "people.txt", "type": "PERSON", "case_sensitive": True},
+            {"file": "surnames.txt", "type": "PERSON", "case_sensitive": True, "takes_given_name": True},
+            {"file": "missing.txt", "type": "LOCATION"},
+        ],
+        "merge_adjacent": ["PERSON"],
+        "not_given_names": ["Dear"],
+    }))
+    return EntityExtractor(tmp_path)
+
+
+def test_case_sensitive_sources_only_match_capitalised_words(extractor):
+    assert spans("Amina Banda lives in blantyre", extractor) == [
+        ("Amina Banda", "PERSON"),
+        ("blantyre", "LOCATION"),
+    ]
+    assert spans("amina banda", extractor) == []
+
+
+def test_runtime_entries(extractor):
+    extractor.add_entries(["Zomba Plateau"], "LOCATION")
+    extractor.add_entries(["Phiri"], "PERSON", case_sensitive=True, takes_given_name=True)
+    assert spans("Dear Phiri, Grace Phiri visited Zomba Plateau", extractor) == [
+        ("Phiri", "PERSON"),
+        ("Grace Phiri", "PERSON"),
+        ("Zomba Plateau", "LOCATION"),
+    ]
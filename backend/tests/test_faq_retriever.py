@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from app.utils.faq_retriever import FAQRetriever, faq_retriever
+
+ENTRIES = [
+    {
+        "id": "pricing",
+        "question": "How much do your services cost?",
+        "alternates": ["What is your pricing?"],
+        "answer": "Pricing depends on scope.",
+    },
+    {
+        "id": "languages",
+        "question": "Which African languages do you support?",
+        "alternates": ["Do you support Swahili?"],
+        "answer": "Swahili, Chichewa and more.",
+    },
+    {
+        "id": "bei",
+        "question": "Huduma zenu zinagharimu kiasi gani?",
+        "answer": "Bei inategemea mradi.",
+        "language": "sw",
+    },
+    {"id": "no-answer", "question": "Unanswered question"},
+]
+
+
+@pytest.fixture
+def retriever():
+    retriever = FAQRetriever(faq_path=None, threshold=0.5)
+    retriever.load_entries(ENTRIES)
+    return retriever
+
+
+def test_matches_alternate_phrasings_and_typos(retriever):
+    assert retriever.lookup("what's your pricing")["id"] == "pricing"
+    assert retriever.lookup("which african langauges do you support")["id"] == "languages"
+
+
+def test_unrelated_message_misses(retriever):
+    assert retriever.lookup("Can you build me a rocket?") is None
+    assert retriever.lookup("") is None
+
+
+def test_language_filter(retriever):
+    assert retriever.search("gharimu kiasi gani", language="sw")[0]["id"] == "bei"
+    assert all(result["language"] == "en" for result in retriever.search("pricing", language="en"))
+
+
+def test_search_ranks_best_entry_first(retriever):
+    results = retriever.search("How much does it cost?", top_k=3)
+    assert results[0]["id"] == "pricing"
+    assert [result["score"] for result in results] == sorted((result["score"] for result in results), reverse=True)
+
+
+def test_entries_without_answers_are_skipped(retriever):
+    assert all(result["id"] != "no-answer" for result in retriever.search("Unanswered question", top_k=5))
+    assert retriever.get_stats()["questions"] == 5
+
+
+def test_failed_reload_keeps_the_current_index(retriever):
+    with pytest.raises(ValueError):
+        retriever.load_entries([{"question": "No answer"}])
+    assert retriever.lookup("What is your pricing?")["id"] == "pricing"
+
+
+def test_clear_and_stats(retriever):
+    retriever.lookup("What is your pricing?")
+    retriever.lookup("rocket science")
+    stats = retriever.get_stats()
+    assert stats["lookups"] == 2
+    assert stats["hit_rate"] == 0.5
+
+    retriever.clear()
+    assert retriever.lookup("What is your pricing?") is None
+    assert retriever.get_stats()["entries"] == 0
+
+
+def test_reload_from_file(tmp_path):
+    faq_path = tmp_path / "faq.json"
+    faq_path.write_text(json.dumps({"entries": ENTRIES[:1]}))
+    retriever = FAQRetriever(faq_path=faq_path)
+    assert retriever.get_stats()["entries"] == 1
+
+    faq_path.write_text(json.dumps({"entries": ENTRIES[:2]}))
+    assert retriever.reload()["entries"] == 2
+
+
+def test_missing_file_leaves_the_index_empty(tmp_path):
+    assert FAQRetriever(faq_path=tmp_path / "missing.json").lookup("pricing") is None
+
+
+def test_shipped_faq_answers_the_services_question():
+    assert faq_retriever.lookup("What services do you provide?")["id"] == "services-overview"
@@ -0,0 +1,142 @@
+import json
+import re
+
+import pytest
+
+from app.utils.groq_client import GroqAIClient, groq_client
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Make the API look available and answer every routed completion from replies"""
+    calls = []
+    replies = []
+
+    def complete_routed(operation, messages, temperature, deadline=None, model=None, max_tokens=None, language=None):
+        calls.append(messages[-1]["content"])
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply(messages[-1]["content"]) if callable(reply) else reply
+
+    monkeypatch.setattr(GroqAIClient, "api_available", property(lambda self: True))
+    monkeypatch.setattr(groq_client, "_complete_routed", complete_routed)
+    return calls, replies
+
+
+def test_pack_texts_respects_token_budget_and_max_items(monkeypatch):
+    # Each text costs its length plus 4 tokens of per-item overhead
+    monkeypatch.setattr(groq_client, "estimate_tokens", len)
+
+    assert groq_client.pack_texts(["a" * 6] * 5, token_budget=25) == [[0, 1], [2, 3], [4]]
+    assert groq_client.pack_texts(["a"] * 5, token_budget=1000, max_items=2) == [[0, 1], [2, 3], [4]]
+    # A text over the budget still gets a pack of its own
+    assert groq_client.pack_texts(["a", "a" * 100, "a"], token_budget=20) == [[0], [1], [2]]
+    assert groq_client.pack_texts([]) == []
+
+
+def test_analyze_text_pack_keys_results_by_the_callers_index(model):
+    calls, replies = model
+    replies.append(json.dumps({"results": [
+        {"index": 1, "sentiment": "negative", "confidence": 0.8},
+        {"index": 0, "sentiment": "positive", "confidence": 0.9},
+    ]}))
+
+    results = groq_client.analyze_text_pack([(7, "Great service"), (9, "Slow replies")])
+
+    assert results == {
+        7: {"sentiment": "positive", "confidence": 0.9},
+        9: {"sentiment": "negative", "confidence": 0.8},
+    }
+    # One prompt for the whole pack, numbered locally
+    assert len(calls) == 1
+    assert "[0] Great service" in calls[0] and "[1] Slow replies" in calls[0]
+
+
+def test_analyze_text_pack_falls_back_locally_for_mangled_or_missing_items(model):
+    _, replies = model
+    replies.append(json.dumps({"results": [
+        {"index": 0, "sentiment": "positive", "confidence": 0.9},
+        {"index": "first", "sentiment": "negative"},
+        {"index": 5, "sentiment": "negative"},
+        "neutral",
+    ]}))
+
+    results = groq_client.analyze_text_pack([(0, "Great service"), (1, "Terrible, slow and rude"), (2, "ok")])
+
+    assert results[0] == {"sentiment": "positive", "confidence": 0.9}
+    for index in (1, 2):
+        assert results[index]["note"] == "Fallback analysis due to API unavailability"
+        assert results[index]["sentiment"] in ("positive", "negative", "neutral")
+    assert results[1]["sentiment"] == "negative"
+
+
+def test_analyze_text_pack_falls_back_locally_when_the_call_fails(model):
+    _, replies = model
+    replies.append(RuntimeError("boom"))
+
+    results = groq_client.analyze_text_pack([(0, "Great service"), (1, "Slow replies")])
+
+    assert sorted(results) == [0, 1]
+    assert all(result["note"] == "Fallback analysis due to API unavailability" for result in results.values())
+
+
+SEGMENT = re.compile(r'<seg id="(\d+)">(.*?)</seg>')
+
+
+def unreliable_translator(dropped=(), flaky=()):
+    """Reply that upper-cases segments in reverse order, never returns dropped texts
+    and mangles each flaky text the first time it is sent"""
+    seen = set()
+
+    def reply(prompt):
+        lines = []
+        for position, text in SEGMENT.findall(prompt):
+            if text in dropped:
+                continue
+            if text in flaky and text not in seen:
+                seen.add(text)
+                lines.append(f"<seg id='{position}'>{text.upper()}</seg>" if len(seen) % 2 else f'<seg id="{position}"> </seg>')
+                continue
+            lines.append(f'<seg id="{position}">{text.upper()}</seg>')
+        return "\n".join(reversed(lines))
+
+    return reply
+
+
+def test_translate_pack_matches_reordered_segments_to_keys(model):
+    calls, replies = model
+    replies.append(unreliable_translator(dropped={"bye"}, flaky={"thanks"}))
+
+    result = groq_client.translate_pack([("a", "hello"), ("b", "bye"), ("c", "thanks"), ("d", "welcome")], "en", "sw")
+
+    assert result == {"a": "HELLO", "d": "WELCOME"}
+    assert len(calls) == 1
+
+
+def test_translate_strings_retries_missing_keys_in_smaller_packs(model):
+    calls, replies = model
+    translate = unreliable_translator(dropped={"never"}, flaky={"thanks", "later"})
+    replies.extend([translate] * 10)
+    strings = {"a": "hello", "b": "thanks", "c": "never", "d": "later", "e": "", "f": "welcome"}
+
+    result = groq_client.translate_strings(strings, "en", "sw", max_items=4, retries=2, concurrency=1)
+
+    assert result["translations"] == {"a": "HELLO", "b": "THANKS", "d": "LATER", "e": "", "f": "WELCOME"}
+    assert result["missing"] == ["c"]
+    pack_sizes = [len(SEGMENT.findall(prompt)) for prompt in calls]
+    # Five strings in packs of 4, then the three misses in packs of 2, then "never" alone
+    assert pack_sizes == [4, 1, 2, 1, 1]
+    assert result["calls"] == 5
+    assert result["retried"] == 3 + 1
+
+
+def test_translate_strings_reports_everything_missing_when_calls_fail(model):
+    _, replies = model
+    replies.extend([RuntimeError("boom")] * 3)
+
+    result = groq_client.translate_strings({"a": "hello"}, "en", "sw", retries=2)
+
+    assert result["translations"] == {}
+    assert result["missing"] == ["a"]
+    assert result["calls"] == 3
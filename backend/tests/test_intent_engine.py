@@ -0,0 +1,77 @@
+import json
+import re
+
+import pytest
+
+from app.utils.intent_engine import IntentEngine, build_trie_pattern, intent_engine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    intents = tmp_path / "intents.json"
+    intents.write_text(json.dumps({
+        "default_intent": "default",
+        "intents": {
+            "pricing": {"priority": 2, "keywords": {"en": ["price", "how much"], "sw": ["bei"]}, "responses": ["Pricing"]},
+            "contact": {"priority": 1, "keywords": ["reach", "reaching", "call", "demo"], "responses": ["Contact"]},
+            "default": {"priority": 0, "keywords": [], "responses": ["Hello"]},
+        },
+    }))
+    return IntentEngine(intents)
+
+
+def test_trie_pattern_matches_exactly_the_keywords():
+    keywords = ["car", "card", "care", "cat", "dog"]
+    pattern = re.compile(build_trie_pattern(keywords))
+    for keyword in keywords:
+        assert pattern.fullmatch(keyword)
+    assert not pattern.fullmatch("ca")
+    # Longer keywords win over their prefixes
+    assert pattern.match("cards").group(0) == "card"
+
+
+def test_classifies_across_languages(engine):
+    assert engine.classify("What is the price?")["intent"] == "pricing"
+    assert engine.classify("Bei gani?")["intent"] == "pricing"
+    assert engine.classify("How   MUCH is it")["matches"] == ["how much"]
+
+
+def test_keywords_match_whole_words_only(engine):
+    assert engine.classify("I do research")["intent"] == "default"
+    assert engine.classify("democracy in Malawi")["intent"] == "default"
+    assert engine.classify("That sounds pricey")["intent"] == "default"
+    assert engine.classify("reaching out")["matches"] == ["reaching"]
+    assert engine.classify("Book a demo, please")["intent"] == "contact"
+
+
+def test_higher_priority_wins(engine):
+    result = engine.classify("call me about the price")
+    assert result["intent"] == "pricing"
+    assert set(result["matches"]) == {"call", "price"}
+    assert 0 < result["confidence"] < 1
+
+
+def test_no_match_uses_the_default_intent(engine):
+    assert engine.classify("good morning") == {"intent": "default", "confidence": 0.0, "matches": []}
+    assert engine.classify("")["intent"] == "default"
+
+
+def test_register_intent_recompiles(engine):
+    engine.register_intent("jobs", {"en": ["vacancy"]}, ["Careers"], priority=5)
+    result = engine.respond("any vacancy? what price?")
+    assert result["intent"] == "jobs"
+    assert result["response"] == "Careers"
+
+
+def test_intent_without_responses_falls_back_to_the_default_reply(engine):
+    engine.register_intent("silent", ["hush"], [], priority=9)
+    assert engine.respond("hush")["response"] == "Hello"
+
+
+def test_shipped_intents():
+    assert intent_engine.classify("What services do you offer?")["intent"] == "services"
+    assert intent_engine.classify("Combien coûte le devis ?")["intent"] == "pricing"
+    assert intent_engine.classify("What are the fees for your packages?")["intent"] == "pricing"
+    assert intent_engine.classify("Can we schedule demos?")["intent"] == "contact"
+    assert intent_engine.classify("AI for democracy")["intent"] == "default"
+    assert intent_engine.respond("hello there")["response"]
@@ -0,0 +1,247 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils import job_queue as job_queue_module
+from app.utils.job_queue import JobQueue, PermanentJobError, check_callback_url
+
+
+def add(a, b):
+    return a + b
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.db"), max_attempts=2)
+    queue.register("add", add)
+    return queue
+
+
+def run_next(queue, allow_bulk=True):
+    """Claim and run one job the way a worker would; returns the claimed row (or None)"""
+    job = queue._claim(allow_bulk)
+    if job is not None:
+        asyncio.run(queue._run(job))
+    return job
+
+
+def test_submit_validates_the_request(queue):
+    with pytest.raises(ValueError, match="Unknown operation"):
+        queue.submit("missing")
+    with pytest.raises(ValueError, match="Unknown priority"):
+        queue.submit("add", {"a": 1, "b": 2}, priority="urgent")
+    with pytest.raises(ValueError, match="Invalid params"):
+        queue.submit("add", {"a": 1})
+    with pytest.raises(ValueError, match="set by the queue"):
+        queue.submit("add", {"a": 1, "b": 2, "deadline": 5})
+
+
+def test_job_runs_to_completion(queue):
+    job = queue.submit("add", {"a": 1, "b": 2})
+    assert job["status"] == "queued"
+
+    run_next(queue)
+
+    finished = queue.get(job["id"])
+    assert finished["status"] == "succeeded"
+    assert finished["result"] == 3
+    assert finished["attempts"] == 1
+    assert queue.get_stats()["succeeded"] == 1
+
+
+def test_claims_follow_priority_then_age(queue):
+    bulk = queue.submit("add", {"a": 0, "b": 0}, priority="bulk")
+    normal = queue.submit("add", {"a": 0, "b": 1})
+    high = queue.submit("add", {"a": 0, "b": 2}, priority="high")
+
+    assert run_next(queue, allow_bulk=False)["id"] == high["id"]
+    assert run_next(queue, allow_bulk=False)["id"] == normal["id"]
+    # A worker at its bulk limit leaves bulk jobs for the others
+    assert run_next(queue, allow_bulk=False) is None
+    assert run_next(queue)["id"] == bulk["id"]
+
+
+def test_scheduled_job_waits_until_available(queue):
+    job = queue.submit("add", {"a": 1, "b": 1}, available_at=time.time() + 60)
+    assert queue._claim(True) is None
+    assert queue.pending("add") == 1
+    assert queue.cancel(job["id"])
+    assert queue.get(job["id"])["status"] == "cancelled"
+    assert not queue.cancel(job["id"])
+
+
+def test_failed_attempt_is_retried_then_failed(queue):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        raise RuntimeError("upstream down")
+
+    queue.register("flaky", flaky)
+    job = queue.submit("flaky")
+
+    run_next(queue)
+    retrying = queue.get(job["id"])
+    assert retrying["status"] == "queued"
+    assert "upstream down" in retrying["error"]
+
+    # Skip the backoff
+    conn = queue._connect()
+    conn.execute("UPDATE jobs SET available_at = 0 WHERE id = ?", (job["id"],))
+    conn.commit()
+    conn.close()
+    run_next(queue)
+
+    assert queue.get(job["id"])["status"] == "failed"
+    assert len(calls) == 2
+    assert queue.get_stats()["retried"] == 1
+
+
+def test_permanent_error_is_not_retried(queue):
+    def rejected():
+        raise PermanentJobError("invalid recipient")
+
+    queue.register("rejected", rejected)
+    job = queue.submit("rejected")
+    run_next(queue)
+
+    failed = queue.get(job["id"])
+    assert failed["status"] == "failed"
+    assert failed["attempts"] == 1
+    assert "invalid recipient" in failed["error"]
+
+
+def test_expired_lease_is_recovered_by_another_worker(queue, tmp_path):
+    job = queue.submit("add", {"a": 2, "b": 2})
+    assert queue._claim(True)["id"] == job["id"]
+    # The first worker dies without finishing; its lease runs out
+    conn = queue._connect()
+    conn.execute("UPDATE jobs SET lease_until = 0 WHERE id = ?", (job["id"],))
+    conn.commit()
+    conn.close()
+
+    other = JobQueue(db_path=queue.db_path, max_attempts=2)
+    other.register("add", add)
+    recovered = run_next(other)
+
+    assert recovered["id"] == job["id"]
+    assert other.get(job["id"])["status"] == "succeeded"
+    assert other.get(job["id"])["attempts"] == 2
+    assert other.get_stats()["recovered"] == 1
+
+
+def test_async_handler_gets_a_deadline(queue):
+    async def timed(deadline=None):
+        return deadline is not None
+
+    queue.register("timed", timed)
+    job = queue.submit("timed")
+    run_next(queue)
+    assert queue.get(job["id"])["result"] is True
+
+
+def test_callback_url_checks(monkeypatch):
+    for url in (
+        "ftp://example.com/done",
+        "http://127.0.0.1/done",
+        "http://10.0.0.5/done",
+        "http://169.254.169.254/latest/meta-data",
+        "http://[::1]/done",
+    ):
+        with pytest.raises(ValueError):
+            check_callback_url(url)
+    check_callback_url("https://93.184.216.34/done")
+
+    monkeypatch.setattr(job_queue_module, "JOB_CALLBACK_HOSTS", ["hooks.example.com", ".partner.io"])
+    check_callback_url("https://hooks.example.com/done")
+    check_callback_url("https://api.partner.io/done")
+    with pytest.raises(ValueError, match="not allowed"):
+        check_callback_url("https://93.184.216.34/done")
+
+
+def test_submit_rejects_internal_callback(queue):
+    with pytest.raises(ValueError):
+        queue.submit("add", {"a": 1, "b": 2}, callback_url="http://localhost:8000/admin")
+
+
+def test_blocked_callback_is_recorded_not_sent(queue, monkeypatch):
+    job = queue.submit("add", {"a": 1, "b": 2}, callback_url="https://93.184.216.34/done")
+    # The host now resolves somewhere internal
+    monkeypatch.setattr(job_queue_module, "JOB_CALLBACK_HOSTS", ["elsewhere.example.com"])
+    run_next(queue)
+
+    finished = queue.get(job["id"])
+    assert finished["status"] == "succeeded"
+    assert finished["callback_status"].startswith("blocked")
+
+
+def test_jobs_endpoint_only_accepts_public_operations(monkeypatch, queue):
+    from app.routers import jobs
+
+    monkeypatch.setattr(jobs, "job_queue", queue)
+    queue.register("chat_completion", jobs.chat_completion_job)
+    queue.register("send_internal", add)
+    app = FastAPI()
+    app.include_router(jobs.router, prefix="/jobs")
+    client = TestClient(app)
+
+    response = client.post("/jobs", json={"operation": "send_internal", "params": {"a": 1, "b": 2}})
+    assert response.status_code == 400
+
+    response = client.post("/jobs", json={
+        "operation": "chat_completion",
+        "params": {"messages": [{"role": "user", "content": "hi"}]},
+        "callback_url": "http://127.0.0.1:9000/hook",
+    })
+    assert response.status_code == 400
+
+    response = client.post("/jobs", json={"operation": "chat_completion", "params": {"messages": []}})
+    assert response.status_code == 202
+    assert queue.get(response.json()["id"])["status"] == "queued"
+
+
+def test_dedupe_returns_the_waiting_job(queue):
+    first = queue.submit("add", {"a": 1, "b": 2}, dedupe={"a": 1})
+    assert queue.submit("add", {"a": 1, "b": 5}, dedupe={"a": 1})["id"] == first["id"]
+    assert queue.submit("add", {"a": 2, "b": 2}, dedupe={"a": 2})["id"] != first["id"]
+    assert queue.get_stats()["deduplicated"] == 1
+
+    # Once the job has finished, the same work can be queued again
+    while run_next(queue):
+        pass
+    assert queue.submit("add", {"a": 1, "b": 2}, dedupe={"a": 1})["id"] != first["id"]
+
+
+def test_chat_completion_job_fails_instead_of_returning_a_canned_reply(queue):
+    from app.routers import jobs
+
+    # conftest disables the LLM backends, so the API is unavailable
+    queue.register("chat_completion", jobs.chat_completion_job)
+    job = queue.submit("chat_completion", {"messages": [{"role": "user", "content": "What are your prices?"}]})
+    run_next(queue)
+
+    retried = queue.get(job["id"])
+    assert retried["status"] == "queued"
+    assert retried["result"] is None
+    assert "not available" in retried["error"]
+
+
+def test_analyze_batch_job_sends_one_prompt_per_pack(monkeypatch):
+    from app.routers import jobs
+
+    calls = []
+
+    def analyze_text_pack(items, analysis_type, model=None, deadline=None):
+        calls.append([index for index, _ in items])
+        return {index: {"text": text} for index, text in reversed(items)}
+
+    monkeypatch.setattr(jobs.groq_client, "pack_texts", lambda texts: [[0, 1], [2]])
+    monkeypatch.setattr(jobs.groq_client, "analyze_text_pack", analyze_text_pack)
+
+    results = jobs.analyze_batch_job(["a", "b", "c"])
+
+    assert calls == [[0, 1], [2]]
+    assert results == [{"text": "a"}, {"text": "b"}, {"text": "c"}]
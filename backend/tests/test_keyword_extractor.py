@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+
+from app.utils.keyword_extractor import KeywordExtractor, keyword_extractor, load_corpus
+
+
+@pytest.fixture
+def corpus_db(tmp_path):
+    db_path = str(tmp_path / "corpus.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE blog_posts (title TEXT, excerpt TEXT, content TEXT, published INTEGER)")
+    conn.execute("CREATE TABLE testimonials (content TEXT)")
+    conn.executemany("INSERT INTO blog_posts VALUES (?, ?, ?, ?)", [
+        ("Business analytics", "Business insight", "<p>Business dashboards for business teams</p>", 1),
+        ("Business automation", "Business workflows", "<b>Business</b> process automation", 1),
+        ("Draft", "Unpublished", "mobile money fraud", 0),
+    ])
+    conn.execute("INSERT INTO testimonials VALUES ('Great business partner for our retail chain')")
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def test_load_corpus_reads_published_posts_and_testimonials(corpus_db):
+    documents = load_corpus(corpus_db)
+    assert len(documents) == 3
+    assert not any("<p>" in document for document in documents)
+    assert not any("fraud" in document for document in documents)
+
+
+def test_load_corpus_falls_back_to_the_seed_testimonials(tmp_path):
+    assert load_corpus(str(tmp_path / "empty.db"))
+
+
+def test_stopwords_split_candidate_phrases():
+    phrases = keyword_extractor.candidate_phrases("We train machine learning models for the retail sector.")
+    # Runs are capped at MAX_PHRASE_WORDS words
+    assert phrases == [["train", "machine", "learning"], ["models"], ["retail", "sector"]]
+    assert not any("the" in phrase or "for" in phrase for phrase in phrases)
+
+
+def test_extract_ranks_multiword_phrases_first():
+    keywords = keyword_extractor.extract("Predictive maintenance analytics cut downtime. Downtime is costly.")
+    assert keywords[0]["text"] == "predictive maintenance analytics"
+    assert keywords[0]["relevance"] == 1.0
+    assert all(0 < keyword["relevance"] <= 1 for keyword in keywords)
+    assert len({keyword["text"] for keyword in keywords}) == len(keywords)
+
+
+def test_extract_handles_empty_and_stopword_only_text():
+    assert keyword_extractor.extract("") == []
+    assert keyword_extractor.extract("the and of") == []
+    assert keyword_extractor.extract_batch(["", "fraud detection"])[1][0]["text"] == "fraud detection"
+
+
+def test_top_n_limits_results():
+    text = "alpha beta. gamma delta. epsilon zeta. eta theta."
+    assert len(keyword_extractor.extract(text, top_n=2)) == 2
+
+
+def test_corpus_wide_words_rank_below_distinctive_ones(tmp_path, corpus_db):
+    extractor = KeywordExtractor(model_path=tmp_path / "model.json")
+    extractor.refit(corpus_db)
+
+    assert extractor.documents == 3
+    assert extractor.idf["business"] < extractor.idf["retail"]
+    ranked = [keyword["text"] for keyword in extractor.extract("business. fraud.")]
+    assert ranked == ["fraud", "business"]
+
+
+def test_fitted_vocabulary_round_trips(tmp_path, corpus_db):
+    model_path = tmp_path / "model.json"
+    extractor = KeywordExtractor(model_path=model_path)
+    extractor.refit(corpus_db)
+
+    reloaded = KeywordExtractor(model_path=model_path)
+    assert reloaded.documents == 3
+    assert reloaded.idf == pytest.approx(extractor.idf, abs=1e-6)
+    assert reloaded.default_idf == pytest.approx(extractor.default_idf)
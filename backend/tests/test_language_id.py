@@ -0,0 +1,49 @@
+from app.utils.language_id import LANGUAGE_NAMES, language_identifier, language_name
+
+SENTENCES = {
+    "en": "We would like to know more about your data analysis services for our company",
+    "fr": "Nous aimerions en savoir plus sur vos services d'analyse de données pour notre entreprise",
+    "sw": "Tungependa kujua zaidi kuhusu huduma zenu za uchambuzi wa data kwa kampuni yetu",
+    "ny": "Tikufuna kudziwa zambiri za ntchito zanu zosanthula deta pa kampani yathu",
+    "ar": "نود أن نعرف المزيد عن خدمات تحليل البيانات لشركتنا",
+    "am": "ስለ ድርጅታችን የመረጃ ትንተና አገልግሎቶች የበለጠ ማወቅ እንፈልጋለን",
+}
+
+
+def test_detects_supported_languages():
+    for language, sentence in SENTENCES.items():
+        result = language_identifier.detect(sentence)
+        assert result["language"] == language, (language, result)
+        assert result["name"] == LANGUAGE_NAMES[language]
+        assert result["reliable"]
+
+
+def test_batch_matches_single_calls():
+    texts = list(SENTENCES.values()) + ["", "ok"]
+    assert language_identifier.detect_batch(texts) == [language_identifier.detect(text) for text in texts]
+
+
+def test_too_short_text_is_undetermined():
+    for text in ("", "?", "12345"):
+        result = language_identifier.detect(text)
+        assert result["language"] == language_identifier.default_language
+        assert result["confidence"] == 0.0
+        assert not result["reliable"]
+
+
+def test_scores_are_a_distribution():
+    scores = language_identifier.detect(SENTENCES["sw"], include_scores=True)["scores"]
+    assert set(scores) == set(language_identifier.languages)
+    assert abs(sum(scores.values()) - 1) < 0.01
+    assert max(scores, key=scores.get) == "sw"
+
+
+def test_short_texts_are_less_confident_than_long_ones():
+    short = language_identifier.detect("merci")["confidence"]
+    long = language_identifier.detect(SENTENCES["fr"])["confidence"]
+    assert short < long
+
+
+def test_language_name_falls_back_to_the_code():
+    assert language_name("sw") == "Swahili"
+    assert language_name("xx") == "xx"
@@ -0,0 +1,102 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.utils import admin_auth
+from app.utils.llm_metrics import LatencyHistogram, LLMMetrics, fallback_reason
+from app.utils.rate_limiter import RateLimitExceeded
+
+
+class APIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+def test_percentile_interpolates_within_its_bucket():
+    histogram = LatencyHistogram(buckets=[1.0, 2.0])
+    for seconds in (0.5, 1.5, 1.5, 1.5):
+        histogram.observe(seconds)
+
+    assert histogram.counts == [1, 3, 0]
+    assert histogram.percentile(0.25) == pytest.approx(1.0)
+    assert histogram.percentile(0.5) == pytest.approx(1 + 1 / 3)
+    # Estimates never exceed the slowest observation
+    assert histogram.percentile(1.0) == 1.5
+    assert LatencyHistogram().percentile(0.99) == 0.0
+
+
+def test_percentile_in_the_open_bucket_is_capped_by_the_maximum():
+    histogram = LatencyHistogram(buckets=[1.0])
+    histogram.observe(0.5)
+    histogram.observe(7.0)
+
+    assert histogram.percentile(0.75) == pytest.approx(1.0 + (7.0 - 1.0) * 0.5)
+    assert histogram.to_dict()["buckets"] == {"le_1": 1, "inf": 1}
+
+
+@pytest.mark.parametrize("error, reason", [
+    (None, "unavailable"),
+    (RateLimitExceeded("model", 3.0), "rate_limited"),
+    (APIError(429), "rate_limited"),
+    (APIError(503), "http_503"),
+    (TimeoutError(), "timeout"),
+    (APITimeoutError(), "timeout"),
+    (ValueError("bad json"), "error"),
+])
+def test_fallback_reason(error, reason):
+    assert fallback_reason(error) == reason
+
+
+def wait_for_traces(metrics, count):
+    for _ in range(100):
+        if metrics.get_stats()["trace"]["written"] >= count:
+            return
+        time.sleep(0.02)
+
+
+def test_trace_writer_keeps_failures_and_samples_successes(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    metrics = LLMMetrics(trace_path=str(path), sample_rate=0.0)
+
+    metrics.record_call("chat", "model-a", 0.2, True, prompt_tokens=10, completion_tokens=5)
+    metrics.record_call("chat", "model-a", 1.5, False, error=APIError(503))
+    metrics.record_fallback("chat", "llm_timeout")
+    wait_for_traces(metrics, 2)
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["type"] for record in records] == ["call", "fallback"]
+    assert records[0]["success"] is False
+    assert records[0]["error"] == "APIError: HTTP 503"
+    assert records[1]["reason"] == "llm_timeout"
+
+    stats = metrics.get_stats()
+    assert stats["calls"]["chat"]["model-a"]["calls"] == 2
+    assert stats["calls"]["chat"]["model-a"]["error_reasons"] == {"http_503": 1}
+    assert stats["fallbacks"] == {"chat": {"llm_timeout": 1}}
+    assert stats["trace"]["written"] == 2
+
+
+def test_trace_is_off_without_a_path():
+    metrics = LLMMetrics(trace_path="")
+    metrics.record_call("chat", "model-a", 0.2, False, error=APIError(500))
+
+    assert metrics.get_stats()["trace"]["enabled"] is False
+    assert metrics.get_stats()["trace"]["queued"] == 0
+
+
+def test_metrics_endpoint_requires_the_admin_key(monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(admin_auth, "ADMIN_API_KEY", "secret")
+    client = TestClient(app)
+
+    assert client.get("/metrics/llm").status_code == 401
+    assert client.get("/metrics/llm", headers={"X-Admin-Key": "wrong"}).status_code == 401
+    assert client.get("/metrics/llm", headers={"X-Admin-Key": "secret"}).status_code == 200
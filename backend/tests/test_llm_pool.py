@@ -0,0 +1,106 @@
+import httpx
+import pytest
+
+from app.utils import llm_pool as llm_pool_module
+from app.utils.llm_pool import BackendError, LLMPool
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def completion(text):
+    return {"choices": [{"message": {"role": "assistant", "content": text}}], "usage": {"total_tokens": 3}}
+
+
+def pool_of(*handlers, **config):
+    """Pool of OpenAI-compatible backends whose HTTP traffic goes to the given handlers"""
+    pool = LLMPool([dict(config, name=f"backend-{index}", base_url=f"http://backend-{index}") for index in range(len(handlers))])
+    calls = {backend.name: [] for backend in pool.backends}
+    for backend, handler in zip(pool.backends, handlers):
+        def transport(request, backend=backend, handler=handler):
+            calls[backend.name].append(request)
+            return handler(request)
+        backend.client = httpx.Client(base_url=backend.base_url, transport=httpx.MockTransport(transport))
+    return pool, calls
+
+
+def ok(text):
+    return lambda request: httpx.Response(200, json=completion(text))
+
+
+def status(code):
+    return lambda request: httpx.Response(code, json={"error": {"message": f"status {code}"}})
+
+
+def test_response_has_the_sdk_shape():
+    pool, _ = pool_of(ok("hello"))
+    response = pool.create_completion("model", MESSAGES)
+    assert response.choices[0].message.content == "hello"
+    assert response.usage.total_tokens == 3
+
+
+def test_fails_over_to_the_next_backend():
+    pool, calls = pool_of(status(503), ok("from backup"))
+    pool.backends[1].latency = 1.0
+
+    response = pool.create_completion("model", MESSAGES)
+
+    assert response.choices[0].message.content == "from backup"
+    assert len(calls["backend-0"]) == 1
+    assert pool.get_stats()["failovers"] == 1
+    assert pool.backends[0].consecutive_failures == 1
+
+
+def test_request_errors_are_not_failed_over():
+    pool, calls = pool_of(status(400), ok("unused"))
+    with pytest.raises(BackendError) as excinfo:
+        pool.create_completion("model", MESSAGES)
+    assert excinfo.value.status_code == 400
+    assert calls["backend-1"] == []
+
+
+def test_last_error_is_raised_when_every_backend_fails():
+    pool, _ = pool_of(status(500), status(502))
+    with pytest.raises(BackendError) as excinfo:
+        pool.create_completion("model", MESSAGES)
+    assert excinfo.value.status_code in (500, 502)
+
+
+def test_repeated_failures_take_a_backend_out_of_rotation(monkeypatch):
+    monkeypatch.setattr(llm_pool_module, "FAILURE_THRESHOLD", 2)
+    pool, _ = pool_of(status(503))
+
+    for _ in range(2):
+        with pytest.raises(BackendError):
+            pool.create_completion("model", MESSAGES)
+    assert not pool.backends[0].healthy()
+    assert not pool.available()
+    # With nothing else left, the backend is still tried rather than failing outright
+    assert pool.candidates("model") == pool.backends
+
+
+def test_rejected_credentials_sit_out_immediately():
+    pool, _ = pool_of(status(401), ok("backup"))
+    pool.backends[1].latency = 1.0
+    pool.create_completion("model", MESSAGES)
+    assert not pool.backends[0].healthy()
+
+
+def test_model_routing_and_mapping():
+    pool = LLMPool([
+        {"name": "small", "base_url": "http://small", "models": ["fast"]},
+        {"name": "local", "base_url": "http://local", "model_map": {"*": "llama3"}},
+    ])
+    assert [backend.name for backend in pool.candidates("large")] == ["local"]
+    assert pool.backends[1].backend_model("large") == "llama3"
+    with pytest.raises(RuntimeError):
+        LLMPool([]).create_completion("large", MESSAGES)
+
+
+def test_busy_backends_are_skipped_for_free_ones():
+    pool, calls = pool_of(ok("first"), ok("second"), max_concurrency=1)
+    assert pool.backends[0].acquire()
+    try:
+        assert pool.create_completion("model", MESSAGES).choices[0].message.content == "second"
+    finally:
+        pool.backends[0].release()
+    assert calls["backend-0"] == []
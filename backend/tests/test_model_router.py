@@ -0,0 +1,67 @@
+import json
+
+from app.utils.model_router import DEFAULT_ROUTES, FAST_MODEL, LARGE_MODEL, ModelRouter, load_routes
+
+
+def test_operation_gets_its_model_then_fallbacks():
+    route = ModelRouter(routes=DEFAULT_ROUTES).route("chat")
+    assert route["operation"] == "chat"
+    assert route["models"] == [LARGE_MODEL, FAST_MODEL]
+    assert route["max_tokens"] == 1024
+    assert route["timeout"] == 10.0
+
+
+def test_unknown_operation_uses_the_default_route():
+    router = ModelRouter(routes=DEFAULT_ROUTES)
+    route = router.route("something-new")
+    assert route["operation"] == "chat"
+    assert route["models"] == router.route("chat")["models"]
+
+
+def test_short_input_goes_to_the_small_model_first():
+    router = ModelRouter(routes=DEFAULT_ROUTES)
+    assert router.route("entities", input_tokens=50)["models"] == [FAST_MODEL, LARGE_MODEL]
+    assert router.route("entities", input_tokens=5000)["models"] == [LARGE_MODEL, FAST_MODEL]
+
+
+def test_short_input_routing_is_limited_to_supported_languages():
+    router = ModelRouter(routes=DEFAULT_ROUTES)
+    assert router.route("analysis", input_tokens=50, language="fr")["models"][0] == FAST_MODEL
+    assert router.route("analysis", input_tokens=50, language="sw")["models"][0] == LARGE_MODEL
+    assert router.route("analysis", input_tokens=50, language=None)["models"][0] == FAST_MODEL
+
+
+def test_overrides_are_merged_into_the_defaults(monkeypatch, tmp_path):
+    routes_file = tmp_path / "routes.json"
+    routes_file.write_text(json.dumps({"chat": {"timeout": 3}, "summaries": {"model": FAST_MODEL}}))
+    monkeypatch.setenv("GROQ_MODEL_ROUTES_FILE", str(routes_file))
+    monkeypatch.setenv("GROQ_MODEL_ROUTES", json.dumps({"chat": {"max_tokens": 256}}))
+
+    routes = load_routes()
+
+    assert routes["chat"]["timeout"] == 3
+    assert routes["chat"]["max_tokens"] == 256
+    assert routes["chat"]["model"] == LARGE_MODEL
+    assert routes["summaries"]["model"] == FAST_MODEL
+    assert DEFAULT_ROUTES["chat"]["timeout"] == 10.0
+
+
+def test_invalid_override_json_is_ignored(monkeypatch):
+    monkeypatch.delenv("GROQ_MODEL_ROUTES_FILE", raising=False)
+    monkeypatch.setenv("GROQ_MODEL_ROUTES", "{not json")
+    assert load_routes() == DEFAULT_ROUTES
+
+
+def test_record_aggregates_per_route_and_model():
+    router = ModelRouter(routes=DEFAULT_ROUTES)
+    router.record("chat", LARGE_MODEL, 0.4, True, prompt_tokens=100, completion_tokens=20)
+    router.record("chat", LARGE_MODEL, 0.2, False)
+    router.record("chat", FAST_MODEL, 0.1, True, completion_tokens=10, fallback=True)
+
+    usage = router.get_stats()["usage"]["chat"]
+    assert usage[LARGE_MODEL]["calls"] == 2
+    assert usage[LARGE_MODEL]["errors"] == 1
+    assert abs(usage[LARGE_MODEL]["average_latency"] - 0.3) < 1e-9
+    assert usage[LARGE_MODEL]["max_latency"] == 0.4
+    assert usage[LARGE_MODEL]["average_completion_tokens"] == 20
+    assert usage[FAST_MODEL]["fallback_calls"] == 1
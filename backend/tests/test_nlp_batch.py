@@ -0,0 +1,66 @@
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import nlp
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(nlp.router, prefix="/nlp")
+    return TestClient(app)
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_stream_keeps_input_order_when_later_packs_finish_first(client, monkeypatch):
+    monkeypatch.setattr(nlp, "BATCH_PACK_MAX_ITEMS", 2)
+
+    def analyze_text_pack(items, analysis_type, deadline=None):
+        # The first pack is the slowest
+        time.sleep(0.2 if items[0][0] == 0 else 0.0)
+        return {index: {"sentiment": "neutral", "text": text} for index, text in reversed(items)}
+
+    monkeypatch.setattr(nlp.groq_client, "analyze_text_pack", analyze_text_pack)
+    texts = [f"text number {i}" for i in range(5)]
+
+    response = client.post("/nlp/analyze/batch", json={"texts": texts})
+
+    assert response.status_code == 200
+    lines = read_ndjson(response)
+    assert [line["index"] for line in lines[:-1]] == [0, 1, 2, 3, 4]
+    assert [line["result"]["text"] for line in lines[:-1]] == texts
+    assert lines[-1]["summary"]["total"] == 5
+    assert lines[-1]["summary"]["packs"] == 3
+
+
+def test_fast_mode_scores_locally(client, monkeypatch):
+    monkeypatch.setattr(nlp.groq_client, "analyze_text_pack", lambda *args, **kwargs: pytest.fail("model called"))
+
+    response = client.post("/nlp/analyze/batch", json={"texts": ["I love it", "I hate it"], "mode": "fast"})
+
+    lines = read_ndjson(response)
+    assert [line["result"]["sentiment"] for line in lines[:-1]] == ["positive", "negative"]
+
+
+def test_unknown_mode_is_rejected(client):
+    response = client.post("/nlp/analyze/batch", json={"texts": ["hello"], "mode": "turbo"})
+    assert response.status_code == 422
+
+
+def test_language_hint_applies_only_to_undetectable_texts(client):
+    response = client.post("/nlp/analyze/batch", json={
+        "texts": ["ok", "Habari za asubuhi, tunashukuru sana kwa huduma nzuri ya wateja wenu"],
+        "language": "ny",
+        "mode": "fast",
+    })
+
+    lines = read_ndjson(response)
+    assert lines[0]["language"] == "ny"
+    assert lines[1]["language"] == "sw"
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from app.utils.rate_limiter import ModelRateLimiter, RateLimitExceeded, TokenBucket
+
+MODEL = "test-model"
+
+
+def limiter(requests_per_minute=6000, tokens_per_minute=120):
+    # 120 tokens/min refills at 2 tokens/s with a 60 token burst
+    return ModelRateLimiter({MODEL: {"requests_per_minute": requests_per_minute, "tokens_per_minute": tokens_per_minute}})
+
+
+def test_bucket_reserves_on_credit_and_reports_wait():
+    bucket = TokenBucket(rate_per_second=10, capacity=10)
+    now = bucket.updated
+
+    assert bucket.reserve(10, now) == 0
+    assert bucket.reserve(5, now) == pytest.approx(0.5)
+    assert bucket.expected_wait(5, now) == pytest.approx(1.0)
+    assert bucket.expected_wait(5, now + 1.0) == pytest.approx(0.0)
+
+
+def test_bucket_refund_is_capped_at_capacity():
+    bucket = TokenBucket(rate_per_second=1, capacity=10)
+    bucket.refund(100)
+    assert bucket.tokens == 10
+
+
+def test_burst_is_granted_without_waiting():
+    rate_limiter = limiter()
+    assert rate_limiter.acquire(MODEL, 30) == 0
+    assert rate_limiter.acquire(MODEL, 30) == 0
+    assert rate_limiter.get_stats()[MODEL]["granted"] == 2
+
+
+def test_rejects_without_consuming_quota_when_deadline_is_too_close():
+    rate_limiter = limiter()
+    rate_limiter.acquire(MODEL, 60)
+
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        rate_limiter.acquire(MODEL, 20, deadline=time.monotonic() + 1)
+    assert excinfo.value.expected_wait > 1
+
+    stats = rate_limiter.get_stats()[MODEL]
+    assert stats["rejected"] == 1
+    assert stats["granted"] == 1
+    assert stats["tokens_reserved"] == 60
+
+
+def test_waits_for_quota_within_the_deadline():
+    rate_limiter = limiter()
+    rate_limiter.acquire(MODEL, 60)
+
+    started = time.monotonic()
+    wait = rate_limiter.acquire(MODEL, 1, deadline=started + 5)
+
+    assert 0 < wait <= 1
+    assert time.monotonic() - started >= wait * 0.9
+    assert rate_limiter.get_stats()[MODEL]["max_wait"] == pytest.approx(wait)
+
+
+def test_oversized_request_is_clamped_to_the_burst():
+    rate_limiter = limiter()
+    assert rate_limiter.acquire(MODEL, 10_000) == 0
+    assert rate_limiter.get_stats()[MODEL]["tokens_reserved"] == 60
+
+
+def test_settle_refunds_unused_tokens():
+    rate_limiter = limiter()
+    rate_limiter.acquire(MODEL, 60)
+    rate_limiter.settle(MODEL, reserved_tokens=60, used_tokens=20)
+
+    stats = rate_limiter.get_stats()[MODEL]
+    assert stats["tokens_refunded"] == 40
+    assert stats["tokens_available"] >= 40
+    # The refunded tokens can be spent straight away
+    assert rate_limiter.acquire(MODEL, 40, deadline=time.monotonic() + 0.05) == 0
+
+
+def test_settle_ignores_unknown_or_larger_usage():
+    rate_limiter = limiter()
+    rate_limiter.acquire(MODEL, 30)
+    rate_limiter.settle(MODEL, reserved_tokens=30, used_tokens=None)
+    rate_limiter.settle(MODEL, reserved_tokens=30, used_tokens=50)
+    assert rate_limiter.get_stats()[MODEL]["tokens_refunded"] == 0
+
+
+def test_models_have_separate_quotas():
+    rate_limiter = limiter()
+    rate_limiter.acquire(MODEL, 60)
+    assert rate_limiter.acquire("other-model", 10, deadline=time.monotonic() + 0.05) == 0
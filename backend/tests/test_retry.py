@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+from app.utils.retry import RetryPolicy, deadline_after, is_connect_error, twilio_retry_policy
+
+
+class StatusError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+
+class ConnectError(Exception):
+    """Named like httpx.ConnectError"""
+
+
+class ReadTimeout(Exception):
+    """Named like httpx.ReadTimeout"""
+
+
+def flaky(errors, result="ok"):
+    """fn for RetryPolicy.call that raises each error in turn, then returns result"""
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return fn, calls
+
+
+def fast_policy(**kwargs):
+    kwargs.setdefault("base_delay", 0.001)
+    kwargs.setdefault("max_delay", 0.002)
+    return RetryPolicy(**kwargs)
+
+
+def test_transient_status_is_retried_until_success():
+    fn, calls = flaky([StatusError(503), StatusError(429)])
+    assert fast_policy(max_attempts=3).call(fn) == "ok"
+    assert len(calls) == 3
+
+
+def test_permanent_status_is_not_retried():
+    fn, calls = flaky([StatusError(400)])
+    with pytest.raises(StatusError):
+        fast_policy().call(fn)
+    assert len(calls) == 1
+
+
+def test_attempts_are_capped():
+    fn, calls = flaky([StatusError(500)] * 5)
+    with pytest.raises(StatusError):
+        fast_policy(max_attempts=2).call(fn)
+    assert len(calls) == 2
+
+
+def test_backoff_is_jittered_within_the_capped_exponential():
+    policy = RetryPolicy(base_delay=0.5, max_delay=2.0)
+    for attempt, ceiling in ((1, 0.5), (2, 1.0), (3, 2.0), (6, 2.0)):
+        assert all(0 <= policy.backoff(attempt) <= ceiling for _ in range(50))
+
+
+def test_no_retry_when_the_backoff_would_pass_the_deadline():
+    fn, calls = flaky([StatusError(503, headers={"retry-after": "10"})])
+    started = time.monotonic()
+    with pytest.raises(StatusError):
+        fast_policy().call(fn, deadline=deadline_after(1))
+    assert len(calls) == 1
+    assert time.monotonic() - started < 0.5
+
+
+def test_fn_receives_the_time_left():
+    fn, calls = flaky([])
+    fast_policy().call(fn, deadline=deadline_after(5))
+    fast_policy().call(fn)
+    assert 4 < calls[0] <= 5
+    assert calls[1] is None
+
+
+def test_connection_errors_are_retried_by_default():
+    policy = fast_policy()
+    assert policy.is_retryable(ConnectionResetError())
+    assert policy.is_retryable(TimeoutError())
+    assert not fast_policy(retry_connection_errors=False).is_retryable(ConnectionResetError())
+
+
+def test_is_connect_error_follows_wrapped_causes():
+    assert is_connect_error(ConnectionRefusedError())
+    assert is_connect_error(ConnectError())
+    wrapped = RuntimeError("send failed")
+    wrapped.__cause__ = ConnectionRefusedError()
+    assert is_connect_error(wrapped)
+    assert is_connect_error(RuntimeError(ConnectError()))
+    assert not is_connect_error(ReadTimeout())
+    assert not is_connect_error(ConnectionResetError())
+
+
+def test_twilio_policy_only_retries_errors_before_the_request_was_sent():
+    # Message creation isn't idempotent: a dropped or timed-out request may have sent it
+    assert twilio_retry_policy.is_retryable(ConnectError())
+    assert twilio_retry_policy.is_retryable(StatusError(429))
+    assert not twilio_retry_policy.is_retryable(ConnectionResetError())
+    assert not twilio_retry_policy.is_retryable(ReadTimeout())
+    assert not twilio_retry_policy.is_retryable(StatusError(500))
@@ -0,0 +1,62 @@
+import json
+
+from app.utils.sentiment_engine import SentimentEngine, sentiment_engine
+
+
+def labels(texts):
+    return [result["sentiment"] for result in sentiment_engine.analyze_batch(texts)]
+
+
+def test_polarity_across_languages():
+    assert labels([
+        "The service was great",
+        "Huduma ilikuwa nzuri sana",
+        "C'est excellent",
+        "Zikomo, zabwino",
+    ]) == ["positive"] * 4
+
+
+def test_text_without_lexicon_words_is_neutral():
+    result = sentiment_engine.analyze("The meeting is on Tuesday at 10")
+    assert result == {"sentiment": "neutral", "confidence": 0.5, "score": 0.0, "matched_terms": 0}
+
+
+def test_negation_flips_and_softens():
+    good = sentiment_engine.analyze("this is good")
+    not_good = sentiment_engine.analyze("this is not good")
+    assert not_good["sentiment"] == "negative"
+    assert abs(not_good["score"]) < good["score"]
+
+
+def test_intensifier_strengthens_the_next_word():
+    assert sentiment_engine.analyze("very good")["score"] > sentiment_engine.analyze("good")["score"]
+
+
+def test_negation_does_not_reach_into_the_next_text():
+    # "not" ends the first text; the second text must not be negated by it
+    batch = sentiment_engine.analyze_batch(["I do not", "good"])
+    assert batch[1] == sentiment_engine.analyze("good")
+
+
+def test_batch_matches_single_calls():
+    texts = ["great work", "", "not great", "terrible, very bad", "ok"]
+    assert sentiment_engine.analyze_batch(texts) == [sentiment_engine.analyze(text) for text in texts]
+
+
+def test_empty_batch():
+    assert sentiment_engine.analyze_batch([]) == []
+
+
+def test_custom_lexicon(tmp_path):
+    lexicon = tmp_path / "lexicon.json"
+    lexicon.write_text(json.dumps({
+        "languages": {"xx": {"zuri": 2, "baya": -2}},
+        "negators": ["si"],
+        "intensifiers": {"sana": 2.0},
+    }))
+    engine = SentimentEngine(lexicon)
+
+    assert engine.analyze("zuri sana")["sentiment"] == "positive"
+    assert engine.analyze("baya")["sentiment"] == "negative"
+    assert engine.analyze("si zuri")["sentiment"] == "negative"
+    assert engine.analyze("sana zuri")["score"] > engine.analyze("zuri")["score"]
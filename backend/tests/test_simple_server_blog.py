@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import simple_server
+
+AUTH = {"Authorization": "Bearer test-token"}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "synapseiq.db")
+
+    def get_db_connection():
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    monkeypatch.setattr(simple_server, "get_db_connection", get_db_connection)
+    monkeypatch.setattr(simple_server, "verify_token", lambda token: {"sub": "admin"}, raising=False)
+    conn = get_db_connection()
+    conn.execute(
+        "CREATE TABLE blog_posts (id INTEGER PRIMARY KEY, title TEXT, slug TEXT, excerpt TEXT, content TEXT, author TEXT, "
+        "author_role TEXT, category TEXT, tags TEXT, featured_image TEXT, published BOOLEAN, published_at TEXT, updated_at TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO blog_posts (id, title, slug, excerpt, content, author, author_role, category, featured_image, published, updated_at) "
+        "VALUES (1, 'Chatbots', 'chatbots', 'Why chatbots', 'Chatbots answer questions.', 'Admin', 'Editor', 'AI', '', 1, '2024-01-01')"
+    )
+    conn.commit()
+    conn.close()
+    return TestClient(simple_server.app)
+
+
+def test_update_without_fields_returns_the_post(client):
+    response = client.put("/blog/posts/1", json={}, headers=AUTH)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["id"] == 1
+    assert body["title"] == "Chatbots"
+    assert "translation_available" not in body
+
+
+def test_update_of_missing_post_is_404(client):
+    assert client.put("/blog/posts/99", json={}, headers=AUTH).status_code == 404
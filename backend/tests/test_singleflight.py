@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+def run_concurrently(count, target):
+    """Start count threads on target at once and wait for them"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = target()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    executions = []
+
+    def slow():
+        executions.append(1)
+        time.sleep(0.2)
+        return "answer"
+
+    results = run_concurrently(8, lambda: flight.do("same question", slow))
+
+    assert results == ["answer"] * 8
+    assert len(executions) == 1
+    stats = flight.get_stats()
+    assert stats["executions"] == 1
+    assert stats["coalesced"] == 7
+    assert stats["in_flight"] == 0
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.get_stats()["executions"] == 2
+
+
+def test_key_is_released_after_the_call():
+    flight = SingleFlight()
+    counter = iter(range(10))
+    assert flight.do("key", lambda: next(counter)) == 0
+    assert flight.do("key", lambda: next(counter)) == 1
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.2)
+        raise ValueError("upstream down")
+
+    results = run_concurrently(4, lambda: flight.do("key", failing))
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.get_stats()["executions"] == 1
+    assert flight.in_flight() == 0
+
+
+def test_follower_timeout():
+    from concurrent.futures import TimeoutError as FutureTimeout
+
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def leader():
+        started.set()
+        time.sleep(0.5)
+        return "late"
+
+    thread = threading.Thread(target=lambda: flight.do("key", leader))
+    thread.start()
+    started.wait()
+    with pytest.raises(FutureTimeout):
+        flight.do("key", lambda: "unused", timeout=0.05)
+    thread.join()
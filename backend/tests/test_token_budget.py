@@ -0,0 +1,71 @@
+from app.utils.token_budget import TokenBudgetManager, count_tokens, truncate_to_tokens
+
+
+def conversation(turns, words_per_turn=40):
+    return [
+        {"role": "user" if index % 2 == 0 else "assistant", "content": f"turn {index} " + "word " * words_per_turn}
+        for index in range(turns)
+    ]
+
+
+def test_short_history_is_kept_whole():
+    manager = TokenBudgetManager()
+    messages = conversation(4, words_per_turn=5)
+
+    fitted, report = manager.fit_messages(messages, system_prompt="Be brief.", budget=2000)
+
+    assert fitted[0] == {"role": "system", "content": "Be brief."}
+    assert fitted[1:] == messages
+    assert report["kept_turns"] == 4
+    assert report["condensed_turns"] == report["dropped_turns"] == 0
+
+
+def test_long_history_fits_the_budget_and_keeps_the_latest_turns():
+    manager = TokenBudgetManager()
+    messages = conversation(40)
+
+    fitted, report = manager.fit_messages(messages, system_prompt="Be brief.", budget=600)
+
+    assert report["prompt_tokens"] <= 600
+    assert fitted[-1] == messages[-1]
+    assert report["kept_turns"] < 40
+    # Older turns are condensed into a summary rather than silently lost
+    assert report["condensed_turns"] > 0
+    assert fitted[1]["role"] == "system"
+    assert fitted[1]["content"].startswith("Summary of earlier conversation:")
+
+
+def test_oversized_latest_turn_is_truncated_not_dropped():
+    manager = TokenBudgetManager()
+    messages = [{"role": "user", "content": "word " * 5000}]
+
+    fitted, report = manager.fit_messages(messages, budget=300)
+
+    assert report["kept_turns"] == 1
+    assert fitted[-1]["role"] == "user"
+    assert report["prompt_tokens"] <= 300
+
+
+def test_system_messages_in_the_history_are_ignored():
+    manager = TokenBudgetManager()
+    messages = [{"role": "system", "content": "old prompt"}, {"role": "user", "content": "hi"}]
+
+    fitted, _ = manager.fit_messages(messages, system_prompt="new prompt", budget=500)
+
+    assert [msg["content"] for msg in fitted] == ["new prompt", "hi"]
+
+
+def test_condense_respects_its_limit_and_prefers_recent_turns():
+    manager = TokenBudgetManager()
+    summary = manager.condense(conversation(30), 120)
+
+    assert count_tokens(summary) <= 120
+    assert "turn 29" in summary
+    assert "turn 0 " not in summary
+
+
+def test_truncate_to_tokens():
+    text = "word " * 500
+    assert count_tokens(truncate_to_tokens(text, 50)) <= 50
+    assert truncate_to_tokens("short", 50) == "short"
+    assert truncate_to_tokens(text, 0) == ""
@@ -0,0 +1,83 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.routers.whatsapp import BULK_SEND_OPERATION
+from app.utils.job_queue import job_queue
+from app.utils.rate_limiter import TokenBucket
+from app.utils.twilio_client import twilio_client
+
+
+class TwilioError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+@pytest.fixture
+def twilio_api(monkeypatch):
+    """Fake Twilio API recording sends; behaviour maps a number to a delay or an error"""
+    sent = []
+    lock = threading.Lock()
+    behaviour = {}
+
+    def create(**message):
+        number = message["to"].removeprefix("whatsapp:")
+        with lock:
+            sent.append((time.monotonic(), number))
+        outcome = behaviour.get(number)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome:
+            time.sleep(outcome)
+        return SimpleNamespace(sid=f"SM-{number}")
+
+    monkeypatch.setattr(twilio_client, "is_configured", True)
+    monkeypatch.setattr(twilio_client, "whatsapp_number", "+10000000000")
+    monkeypatch.setattr(twilio_client, "client", SimpleNamespace(messages=SimpleNamespace(create=create)), raising=False)
+    monkeypatch.setattr(twilio_client, "send_limiter", TokenBucket(1000, 1000))
+    return SimpleNamespace(sent=sent, behaviour=behaviour)
+
+
+def test_sends_are_paced_by_the_account_rate(twilio_api, monkeypatch):
+    monkeypatch.setattr(twilio_client, "send_limiter", TokenBucket(20, 1))
+    numbers = [f"+26599900{i:04d}" for i in range(6)]
+
+    summary = twilio_client.send_bulk_whatsapp_messages(numbers, "hello", concurrency=6)
+
+    # One message in the burst, then one every 1/20 s
+    assert summary["elapsed_seconds"] >= 0.9 * (len(numbers) - 1) / 20
+    times = sorted(at for at, _ in twilio_api.sent)
+    assert times[-1] - times[0] >= 0.9 * (len(numbers) - 1) / 20
+
+
+def test_results_keep_input_order_when_sends_finish_out_of_order(twilio_api):
+    numbers = ["+265999000001", "+265999000002", "+265999000003"]
+    twilio_api.behaviour.update({numbers[0]: 0.2, numbers[1]: 0.1})
+    finished = []
+
+    summary = twilio_client.send_bulk_whatsapp_messages(numbers, "hello", concurrency=3, on_result=finished.append)
+
+    assert [entry["number"] for entry in summary["results"]] == numbers
+    assert [entry["result"]["sid"] for entry in summary["results"]] == [f"SM-{n}" for n in numbers]
+    # on_result fires once per recipient, as each message finishes
+    assert [entry["number"] for entry in finished] == list(reversed(numbers))
+
+
+def test_summary_counts_successes_and_failures(twilio_api):
+    numbers = ["+265999000001", "+265999000002", "+265999000003", "+265999000004"]
+    twilio_api.behaviour.update({numbers[1]: TwilioError(400), numbers[3]: TwilioError(400)})
+
+    summary = twilio_client.send_bulk_whatsapp_messages(numbers, "hello")
+
+    assert summary["total"] == 4
+    assert summary["successful"] == 2
+    assert summary["failed"] == 2
+    assert [entry["result"]["status"] for entry in summary["results"]] == ["success", "error", "success", "error"]
+    assert not summary["results"][1]["result"]["retryable"]
+
+
+def test_bulk_send_job_is_never_rerun():
+    assert job_queue._max_attempts[BULK_SEND_OPERATION] == 1
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import whatsapp_queue as whatsapp_queue_module
+from app.utils.job_queue import JobQueue, PermanentJobError
+from app.utils.twilio_client import twilio_client
+from app.utils.whatsapp_queue import SEND_OPERATION, WhatsAppQueue
+
+
+class TwilioError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    jobs = JobQueue(db_path=str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(whatsapp_queue_module, "job_queue", jobs)
+    return jobs
+
+
+@pytest.fixture
+def whatsapp(tmp_path, jobs):
+    whatsapp = WhatsAppQueue(db_path=str(tmp_path / "whatsapp.db"))
+    jobs.register(SEND_OPERATION, whatsapp.send, max_attempts=3)
+    return whatsapp
+
+
+def twilio_raises(monkeypatch, error=None):
+    """Configure the Twilio client with a fake API that raises error (or accepts the message)"""
+    sent = []
+
+    def create(**message):
+        sent.append(message)
+        if error is not None:
+            raise error
+        return SimpleNamespace(sid=f"SM{len(sent)}")
+
+    monkeypatch.setattr(twilio_client, "is_configured", True)
+    monkeypatch.setattr(twilio_client, "whatsapp_number", "+10000000000")
+    monkeypatch.setattr(twilio_client, "client", SimpleNamespace(messages=SimpleNamespace(create=create)), raising=False)
+    return sent
+
+
+def test_first_delivery_is_once_per_message_sid(tmp_path):
+    db_path = str(tmp_path / "whatsapp.db")
+    worker_a, worker_b = WhatsAppQueue(db_path=db_path), WhatsAppQueue(db_path=db_path)
+
+    assert worker_a.first_delivery("SM1", "+265999000111")
+    assert not worker_a.first_delivery("SM1", "+265999000111")
+    assert not worker_b.first_delivery("SM1")
+    assert worker_b.first_delivery("SM2")
+    assert worker_a.get_stats()["duplicates"] == 1
+
+
+def test_concurrent_webhook_retries_process_once(tmp_path):
+    db_path = str(tmp_path / "whatsapp.db")
+    workers = [WhatsAppQueue(db_path=db_path) for _ in range(8)]
+    barrier = threading.Barrier(len(workers))
+    results = []
+
+    def deliver(worker):
+        barrier.wait()
+        results.append(worker.first_delivery("SM-retried"))
+
+    threads = [threading.Thread(target=deliver, args=(worker,)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [False] * 7 + [True]
+
+
+def test_one_reply_per_inbound_message(whatsapp, jobs):
+    assert not whatsapp.replied("SM1")
+    first = whatsapp.enqueue("+265999000111", "Hello", inbound_sid="SM1")
+    again = whatsapp.enqueue("+265999000111", "Hello again", inbound_sid="SM1")
+
+    assert again["id"] == first["id"]
+    assert again["params"]["body"] == "Hello"
+    assert whatsapp.replied("SM1")
+    assert jobs.pending(SEND_OPERATION) == 1
+    # Messages that answer nothing are never merged
+    whatsapp.enqueue("+265999000111", "Broadcast")
+    whatsapp.enqueue("+265999000111", "Broadcast")
+    assert jobs.pending(SEND_OPERATION) == 3
+
+
+def test_send_delivers(whatsapp, monkeypatch):
+    sent = twilio_raises(monkeypatch)
+    result = whatsapp.send("+265999000111", "Hello", queued_at=0.0, inbound_sid="SM1")
+    assert result["sid"] == "SM1"
+    assert sent[0]["to"] == "whatsapp:+265999000111"
+    assert whatsapp.get_stats()["sent"] == 1
+
+
+def test_rejected_number_fails_without_retrying(whatsapp, jobs, monkeypatch):
+    sent = twilio_raises(monkeypatch, TwilioError(400))
+    job = whatsapp.enqueue("+000", "Hello", inbound_sid="SM1")
+
+    asyncio.run(jobs._run(jobs._claim(True)))
+
+    failed = jobs.get(job["id"])
+    assert failed["status"] == "failed"
+    assert failed["attempts"] == 1
+    assert len(sent) == 1
+    assert whatsapp.get_stats()["undeliverable"] == 1
+
+
+def test_errors_after_the_request_was_sent_are_not_retried(whatsapp, monkeypatch):
+    # A dropped connection or 5xx may already have delivered the message
+    for error in (ConnectionResetError("reset by peer"), TwilioError(500)):
+        twilio_raises(monkeypatch, error)
+        with pytest.raises(PermanentJobError):
+            whatsapp.send("+265999000111", "Hello", queued_at=0.0)
+
+
+def test_rate_limited_send_is_retried(whatsapp, jobs, monkeypatch):
+    monkeypatch.setattr(twilio_client, "send_whatsapp_message", lambda to, body, deadline=None: {
+        "status": "error", "message": "429 Too Many Requests", "retryable": True,
+    })
+    job = whatsapp.enqueue("+265999000111", "Hello", inbound_sid="SM1")
+
+    asyncio.run(jobs._run(jobs._claim(True)))
+
+    assert jobs.get(job["id"])["status"] == "queued"
+    assert whatsapp.get_stats()["send_errors"] == 1
+
+
+def test_rerun_reply_job_answers_once(whatsapp, jobs, tmp_path, monkeypatch):
+    from app.routers import whatsapp as whatsapp_router
+    from app.utils.conversation_store import ConversationStore
+
+    store = ConversationStore(db_path=str(tmp_path / "conversations.db"), table="whatsapp_conversations")
+    monkeypatch.setattr(whatsapp_router, "whatsapp_queue", whatsapp)
+    monkeypatch.setattr(whatsapp_router, "whatsapp_conversation_store", store)
+    completions = []
+
+    def chat_completion(messages, deadline=None):
+        completions.append(messages)
+        return "We build chatbots."
+
+    monkeypatch.setattr(whatsapp_router.groq_client, "chat_completion", chat_completion)
+
+    for _ in range(2):
+        asyncio.run(whatsapp_router.process_incoming_message("+265999000111", "What do you do?", message_sid="SM1"))
+
+    assert len(completions) == 1
+    assert jobs.pending(SEND_OPERATION) == 1
+    turns = store.get("whatsapp:+265999000111")["turns"]
+    assert [turn["content"] for turn in turns] == ["What do you do?", "We build chatbots."]